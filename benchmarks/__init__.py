@@ -0,0 +1,8 @@
+"""Benchmarks for the DFIR Glossary on synthetic large glossaries.
+
+Run from the repository root:
+
+    python -m benchmarks generate --sizes 10k 100k 1M
+    python -m benchmarks run --sizes 10k 100k -o results.json
+    python -m benchmarks compare baseline.json results.json
+"""
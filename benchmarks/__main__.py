@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Command line entry point: python -m benchmarks {generate,run,compare}."""
+
+import argparse
+import json
+import sys
+from .generate import DATA_DIR, SIZES, database_path, generate, parse_size
+from .runner import (
+    DEFAULT_REPEAT,
+    DEFAULT_TOLERANCE,
+    compare,
+    format_comparison,
+    load_results,
+    run,
+)
+
+
+def cmd_generate(args):
+    for size in args.sizes:
+        count = parse_size(size)
+        path = generate(database_path(count, args.data_dir), count, args.seed)
+        print(f"{path}: {count} terms")
+    return 0
+
+
+def cmd_run(args):
+    results = run(
+        args.sizes,
+        args.repeat,
+        args.data_dir,
+        progress=lambda message: print(message, file=sys.stderr),
+    )
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(text + "\n")
+    else:
+        print(text)
+    if args.baseline:
+        rows = compare(load_results(args.baseline), results, args.tolerance)
+        print(format_comparison(rows), file=sys.stderr)
+    return 0
+
+
+def cmd_compare(args):
+    rows = compare(
+        load_results(args.baseline), load_results(args.current), args.tolerance
+    )
+    print(format_comparison(rows))
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+def cmd_worker(args):
+    from .cases import run as run_cases
+
+    print(json.dumps(run_cases(args.database)))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark the DFIR Glossary against synthetic glossaries",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate_parser = commands.add_parser(
+        "generate", help="Create synthetic glossary databases"
+    )
+    generate_parser.add_argument(
+        "--sizes", nargs="+", default=list(SIZES), help="10k, 100k, 1M or a count"
+    )
+    generate_parser.add_argument("-d", "--data-dir", default=DATA_DIR)
+    generate_parser.add_argument("--seed", type=int, default=0)
+    generate_parser.set_defaults(func=cmd_generate)
+
+    run_parser = commands.add_parser("run", help="Time every scenario and write JSON")
+    run_parser.add_argument("--sizes", nargs="+", default=["10k", "100k"])
+    run_parser.add_argument("-d", "--data-dir", default=DATA_DIR)
+    run_parser.add_argument("-r", "--repeat", type=int, default=DEFAULT_REPEAT)
+    run_parser.add_argument("-o", "--output", help="Results file (default: stdout)")
+    run_parser.add_argument("--baseline", help="Earlier results to compare against")
+    run_parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    run_parser.set_defaults(func=cmd_run)
+
+    compare_parser = commands.add_parser(
+        "compare", help="Compare two results files; exit 1 on a regression"
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    compare_parser.set_defaults(func=cmd_compare)
+
+    worker_parser = commands.add_parser("worker", help=argparse.SUPPRESS)
+    worker_parser.add_argument("database")
+    worker_parser.set_defaults(func=cmd_worker)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
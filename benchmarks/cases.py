@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""Timed scenarios run against the Qt application in a fresh process.
+
+Every scenario drives the same GlossaryApp handlers a user would trigger.
+Dialogs are replaced by stand-ins that answer immediately, so the timings
+cover the application code and the database rather than user input. Qt
+runs on the offscreen platform unless QT_QPA_PLATFORM is already set.
+"""
+
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+QUERIES = ("registry", "kerberos", "hash algorithm", "memory")
+FUZZY_QUERIES = ("registyr", "kerbros", "hash algoritm", "memroy")
+MUTATION_TERMS = 200
+IMPORT_TERMS = 10_000
+MARKER = "zqxbench"
+
+
+class Timings:
+    """Collects named timings in seconds"""
+
+    def __init__(self):
+        self.metrics = {}
+
+    @contextmanager
+    def measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        self.metrics.setdefault(name, []).append(seconds)
+
+
+def _stub_dialogs(gui, answers):
+    """Replace the modal dialogs of the GUI module with immediate answers"""
+
+    class Dialog:
+        def __init__(self, parent=None):
+            pass
+
+        def exec(self):
+            return gui.QDialog.DialogCode.Accepted
+
+        def get_term_data(self):
+            return answers.pop(0)
+
+    gui.AddTermDialog = Dialog
+    gui.EditDialog = Dialog
+    gui.QFileDialog.getSaveFileName = staticmethod(
+        lambda *args, **kwargs: (answers.pop(0), "")
+    )
+    gui.QMessageBox.warning = staticmethod(
+        lambda *args, **kwargs: gui.QMessageBox.StandardButton.Yes
+    )
+    gui.QMessageBox.information = staticmethod(lambda *args, **kwargs: None)
+
+
+def _write_import_file(path, count):
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("Term,Definition,Source\n")
+        for number in range(count):
+            handle.write(f"{MARKER} import {number},Imported definition {number},\n")
+
+
+def wait_loaded(app, window, first_rows=False):
+    """Process events until the loader has delivered every row, or the first"""
+    from PyQt6.QtCore import QEventLoop
+
+    while window.term_loader.loading:
+        if first_rows and window.model.visible_count():
+            break
+        app.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+    app.processEvents()
+
+
+def wait_completions(app, window):
+    """Process events until the completion index has been built"""
+    from PyQt6.QtCore import QEventLoop
+
+    while window.completion_builder.building:
+        app.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+
+
+def wait_refs(app, window):
+    """Process events until the cross references have been built and stored"""
+    from PyQt6.QtCore import QEventLoop
+
+    while window.refs_builder.building:
+        app.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+    app.processEvents()
+
+
+def run(db_path):
+    """Run every scenario once against db_path and return the results dict"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    timings = Timings()
+    start = time.perf_counter()
+    from dfir_glossary.core import DB_ENV
+
+    os.environ[DB_ENV] = db_path
+    from dfir_glossary import dfir_glossary as gui
+    from PyQt6.QtCore import Qt
+
+    app = gui.QApplication([gui.__appname__])
+    window = gui.GlossaryApp()
+    window.show()
+    app.processEvents()
+    timings.record("cold_start", time.perf_counter() - start)
+    wait_loaded(app, window, first_rows=True)
+    timings.record("cold_start_first_rows", time.perf_counter() - start)
+    wait_loaded(app, window)
+    timings.record("cold_start_loaded", time.perf_counter() - start)
+    terms = window.model.visible_count()
+
+    with timings.measure("full_load"):
+        window.load_data()
+        wait_loaded(app, window)
+
+    with timings.measure("completion_index"):
+        wait_completions(app, window)
+    with timings.measure("cross_references"):
+        wait_refs(app, window)
+    with timings.measure("complete"):
+        for query in QUERIES:
+            for length in range(1, len(query) + 1):
+                window.completion_index.complete(query[:length])
+
+    for query in QUERIES:
+        name = "search_" + query.replace(" ", "_")
+        with timings.measure(name):
+            for length in range(1, len(query) + 1):
+                window.search(query[:length])
+                app.processEvents()
+        window.search("")
+
+    with timings.measure("search_retype"):
+        for query in QUERIES:
+            for length in range(len(query) - 1, 0, -1):
+                window.search(query[:length])
+                app.processEvents()
+            for length in range(2, len(query) + 1):
+                window.search(query[:length])
+                app.processEvents()
+    window.search("")
+
+    shown = []
+    window.search_scheduler.results.connect(lambda text, *results: shown.append(text))
+    with timings.measure("search_typing"):
+        for query in QUERIES:
+            for length in range(1, len(query) + 1):
+                window.search_bar.setText(query[:length])
+                app.processEvents()
+            while not shown or shown[-1] != query:
+                app.processEvents()
+    window.search_bar.clear()
+
+    with timings.measure("sort_columns"):
+        for column in (0, 2, 1):
+            for order in (Qt.SortOrder.DescendingOrder, Qt.SortOrder.AscendingOrder):
+                window.table_view.sortByColumn(column, order)
+                app.processEvents()
+        window.table_view.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+
+    window.fuzzy_checkbox.setChecked(True)
+    window.search_scheduler.cancel()
+    with timings.measure("fuzzy_index"):
+        window.glossary.fuzzy_index()
+    with timings.measure("search_fuzzy"):
+        for query in FUZZY_QUERIES:
+            window.search(query)
+            app.processEvents()
+    window.fuzzy_checkbox.setChecked(False)
+    window.search_scheduler.cancel()
+    window.search("")
+
+    with timings.measure("select_all"):
+        window.select_all()
+        app.processEvents()
+    with timings.measure("deselect_all"):
+        window.deselect_all()
+        app.processEvents()
+
+    answers = []
+    _stub_dialogs(gui, answers)
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in gui.FORMATS:
+            answers.append(os.path.join(tmp, f"all.{fmt}"))
+            with timings.measure(f"export_all_{fmt}"):
+                window.export_all()
+        window.select_all()
+        answers.append(os.path.join(tmp, "selected.csv"))
+        with timings.measure("export_selected_csv"):
+            window.export_selected()
+        window.deselect_all()
+
+        answers.extend(
+            (f"{MARKER} {number}", "Benchmark definition", "Benchmark source")
+            for number in range(MUTATION_TERMS)
+        )
+        with timings.measure("add_terms"):
+            for _ in range(MUTATION_TERMS):
+                window.add_term()
+        window.search(MARKER)
+        answers.extend(f"Edited definition {row}" for row in range(MUTATION_TERMS))
+        with timings.measure("edit_terms"):
+            for row in range(window.model.visible_count()):
+                window.table_view.setCurrentIndex(window.model.index(row, 1))
+                window.edit_term()
+        window.select_all()
+        with timings.measure("remove_terms"):
+            window.remove_term()
+        window.search("")
+
+        import_path = os.path.join(tmp, "import.csv")
+        _write_import_file(import_path, IMPORT_TERMS)
+        with timings.measure("import_terms"):
+            window.glossary.import_file(import_path)
+            window.load_data()
+            wait_loaded(app, window)
+        wait_refs(app, window)
+        window.search(MARKER)
+        window.select_all()
+        with timings.measure("remove_imported"):
+            window.remove_term()
+        with timings.measure("undo_remove"):
+            window.undo()
+        with timings.measure("redo_remove"):
+            window.redo()
+        window.search("")
+
+    window.close()
+    app.processEvents()
+    return {"terms": terms, "metrics": timings.metrics}
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Generate synthetic glossary.sqlite files of any size.
+
+Words are drawn from the glossary shipped with the application so that
+search and annotation see realistic text. Definition lengths follow the
+shipped data: about half of the terms have no definition and the rest
+have a long-tailed length with a few very long entries. Sources are
+NIST-style glossary URLs, sometimes followed by a publication line.
+"""
+
+import os
+import random
+import re
+import sqlite3
+import string
+from dfir_glossary.core import default_db_path
+from dfir_glossary.search import build_search_index
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+EMPTY_DEFINITION_RATIO = 0.5
+NO_SOURCE_RATIO = 0.04
+EXPANSION_RATIO = 0.66
+BATCH_SIZE = 10_000
+WORD_RE = re.compile(r"[A-Za-z][a-z]{2,}")
+FALLBACK_WORDS = (
+    "access acquisition algorithm analysis artifact attack authentication "
+    "binary certificate cipher collection command compromise control "
+    "cryptographic data device digital disk encryption evidence examination "
+    "file forensic hash identity image incident indicator integrity key "
+    "kerberos log malware memory network process protocol registry response "
+    "security signature storage system timeline token user volume"
+).split()
+PUBLICATIONS = (
+    "NIST SP 800-53 Rev. 5: https://doi.org/10.6028/NIST.SP.800-53r5",
+    "NIST SP 800-86: https://doi.org/10.6028/NIST.SP.800-86",
+    "NIST SP 800-61 Rev. 2: https://doi.org/10.6028/NIST.SP.800-61r2",
+    "FIPS 203: https://doi.org/10.6028/NIST.FIPS.203",
+    "CNSSI 4009-2015",
+)
+
+SCHEMA_SQL = """CREATE TABLE IF NOT EXISTS "glossary" (
+	"id"	INTEGER NOT NULL UNIQUE,
+	"term"	TEXT NOT NULL UNIQUE,
+	"definition"	TEXT,
+	"source"	TEXT,
+	PRIMARY KEY("id")
+)"""
+INSERT_SQL = (
+    "INSERT OR IGNORE INTO glossary (term, definition, source) VALUES (?, ?, ?)"
+)
+
+
+def parse_size(text):
+    """Accept 10k, 100k, 1M or a plain number of terms"""
+    if text in SIZES:
+        return SIZES[text]
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1:].lower(), 1)
+    number = text[:-1] if multiplier != 1 else text
+    return int(float(number) * multiplier)
+
+
+def size_label(count):
+    for label, size in SIZES.items():
+        if size == count:
+            return label
+    return str(count)
+
+
+def database_path(count, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"glossary-{size_label(count)}.sqlite")
+
+
+def load_vocabulary(db_path=None):
+    """Return the distinct words used in the shipped glossary"""
+    db_path = db_path or default_db_path()
+    words = set()
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            for term, definition in conn.execute(
+                "SELECT term, definition FROM glossary"
+            ):
+                words.update(WORD_RE.findall(term))
+                words.update(WORD_RE.findall(definition or ""))
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        pass
+    return sorted(words) or FALLBACK_WORDS
+
+
+class TermGenerator:
+    """Deterministic source of (term, definition, source) rows"""
+
+    def __init__(self, words, seed=0):
+        self.random = random.Random(seed)
+        self.words = words
+
+    def phrase(self, count):
+        return " ".join(self.random.choice(self.words) for _ in range(count))
+
+    def term(self, number):
+        words = self.phrase(self.random.randint(1, 4)).title()
+        if self.random.random() < EXPANSION_RATIO:
+            acronym = "".join(word[0] for word in words.split()).upper()
+            if len(acronym) < 2:
+                acronym += self.random.choice(string.ascii_uppercase)
+            words = f"{acronym} - {words}"
+        return f"{words} {number:x}"
+
+    def definition(self):
+        if self.random.random() < EMPTY_DEFINITION_RATIO:
+            return ""
+        length = int(self.random.lognormvariate(5.5, 0.9))
+        sentences = []
+        size = 0
+        while size < length:
+            sentence = self.phrase(self.random.randint(6, 20)).capitalize() + "."
+            sentences.append(sentence)
+            size += len(sentence) + 1
+        return " ".join(sentences)
+
+    def source(self, term):
+        if self.random.random() < NO_SOURCE_RATIO:
+            return None
+        slug = re.sub(r"\W+", "_", term.lower()).strip("_")
+        source = f"https://csrc.nist.gov/glossary/term/{slug}"
+        if self.random.random() < 0.3:
+            source += "\n" + self.random.choice(PUBLICATIONS)
+        return source
+
+    def rows(self, count):
+        for number in range(count):
+            term = self.term(number)
+            yield term, self.definition(), self.source(term)
+
+
+def generate(path, count, seed=0, words=None, progress=None):
+    """Write a glossary database with count synthetic terms to path"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    generator = TermGenerator(words or load_vocabulary(), seed)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(SCHEMA_SQL)
+        rows = generator.rows(count)
+        written = 0
+        while written < count:
+            batch = [row for _, row in zip(range(BATCH_SIZE), rows)]
+            with conn:
+                conn.executemany(INSERT_SQL, batch)
+            written += len(batch)
+            if progress is not None:
+                progress(written, count)
+        with conn:
+            build_search_index(conn)
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    return path
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Run the benchmark scenarios, store results as JSON and compare runs."""
+
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from .generate import database_path, generate, parse_size, size_label
+
+RESULTS_VERSION = 1
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.10
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sqlite": sqlite3.sqlite_version,
+        "commit": _git_commit(),
+    }
+
+
+def summarise(runs):
+    return {
+        "runs": runs,
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "mean": statistics.fmean(runs),
+    }
+
+
+def run_worker(db_path):
+    """Run every scenario once in a fresh interpreter so cold start is real"""
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks", "worker", db_path],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(
+            f"Benchmark worker failed for {db_path}:\n{result.stderr.strip()}"
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(sizes, repeat=DEFAULT_REPEAT, data_dir=None, progress=None):
+    """Benchmark each size, generating missing databases, and return the results"""
+    results = {}
+    for size in sizes:
+        count = parse_size(size)
+        path = database_path(count, data_dir) if data_dir else database_path(count)
+        if not os.path.exists(path):
+            if progress is not None:
+                progress(f"Generating {path}")
+            generate(path, count)
+        metrics = {}
+        terms = None
+        for attempt in range(repeat):
+            if progress is not None:
+                progress(f"{size_label(count)}: run {attempt + 1} of {repeat}")
+            worker = run_worker(path)
+            terms = worker["terms"]
+            for name, runs in worker["metrics"].items():
+                metrics.setdefault(name, []).extend(runs)
+        results[size_label(count)] = {
+            "terms": terms,
+            "database": os.path.basename(path),
+            "metrics": {name: summarise(runs) for name, runs in metrics.items()},
+        }
+    return {
+        "version": RESULTS_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "repeat": repeat,
+        "environment": environment(),
+        "results": results,
+    }
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def compare(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """Return (size, metric, old, new, ratio, regressed) for metrics in both runs.
+
+    Medians are compared; a metric regresses when it is slower than the
+    baseline by more than tolerance.
+    """
+    rows = []
+    for size, result in current["results"].items():
+        old_metrics = baseline["results"].get(size, {}).get("metrics", {})
+        for name, summary in result["metrics"].items():
+            if name not in old_metrics:
+                continue
+            old = old_metrics[name]["median"]
+            new = summary["median"]
+            ratio = new / old if old else float("inf")
+            rows.append((size, name, old, new, ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def format_comparison(rows):
+    lines = [
+        f"{'size':<6} {'metric':<24} {'baseline':>10} {'current':>10} {'change':>8}"
+    ]
+    for size, name, old, new, ratio, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        lines.append(
+            f"{size:<6} {name:<24} {old:>10.4f} {new:>10.4f} "
+            f"{(ratio - 1) * 100:>+7.1f}%{flag}"
+        )
+    return "\n".join(lines)
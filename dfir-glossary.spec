@@ -1,17 +1,27 @@
 # -*- mode: python ; coding: utf-8 -*-
 
+import os
+import sys
+
 __version__ = '1.0.0'
 
+# Render the toolbar icons now so the frozen application never has to
+# import pytablericons (and Pillow and pygame) at startup.
+sys.path.insert(0, SPECPATH)
+from dfir_glossary.icons import prerender_icons
+
+icon_dir = prerender_icons(os.path.join(SPECPATH, 'build', 'icons'))
+
 a = Analysis(
-    ['dfir_glossary/dfir_glossary.py'],
+    ['launcher.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[(icon_dir, 'dfir_glossary/icons')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=['pytablericons', 'PIL', 'pygame'],
     noarchive=False,
 )
 pyz = PYZ(a.pure)
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""Find every glossary term mentioned in a piece of text in a single pass."""
+
+import re
+from array import array
+from collections import deque, namedtuple
+
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+PARENS_RE = re.compile(r"\(([^()]*)\)")
+EXPANSION_SEPARATOR = " - "
+CACHE_NAME = "terms"
+TERMS_SQL = "SELECT id, term FROM glossary"
+
+Match = namedtuple("Match", ["start", "end", "term_id", "text"])
+
+
+def tokenize(text):
+    return [token.lower() for token in TOKEN_RE.findall(text)]
+
+
+def term_variants(term):
+    """Return the names a term can appear under in free text.
+
+    "(EC)DH - (Elliptic Curve) Diffie-Hellman" yields the full term, the
+    acronym "(EC)DH" and the expansion "(Elliptic Curve) Diffie-Hellman",
+    plus each of them with the parentheses removed ("ECDH", "Elliptic
+    Curve Diffie-Hellman").
+    """
+    parts = [term]
+    if EXPANSION_SEPARATOR in term:
+        parts.extend(term.split(EXPANSION_SEPARATOR, 1))
+    variants = set()
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        variants.add(part)
+        if "(" in part:
+            variants.add(" ".join(PARENS_RE.sub(r"\1", part).split()))
+    return {variant for variant in variants if len(variant) > 1}
+
+
+def is_acronym(variant):
+    """Single upper-case words such as "DH" only match with the same case"""
+    return variant.isupper() and TOKEN_RE.fullmatch(variant) is not None
+
+
+class TermMatcher:
+    """Aho-Corasick automaton over word tokens of every glossary term.
+
+    Text and terms are split into word and punctuation tokens, so matches
+    always fall on token boundaries and the automaton has one state per
+    distinct token prefix rather than per character. Scanning is linear in
+    the length of the text regardless of the number of terms.
+
+    Terms can be added and removed in place. Removing only retires their
+    patterns; adding extends the trie and leaves the failure links to be
+    recomputed by the next scan. mentions() walks the trie from every token
+    instead, so short texts such as single definitions can be matched
+    straight after an add without that cost.
+    """
+
+    stale_links = False
+
+    def __init__(self, rows):
+        self.goto = [{}]
+        self.outputs = [()]
+        self.patterns = []
+        self.max_tokens = 0
+        for term_id, term in rows:
+            for variant in term_variants(term or ""):
+                tokens = tokenize(variant)
+                if tokens:
+                    self._add(tokens, term_id, variant if is_acronym(variant) else None)
+        self._link()
+
+    @classmethod
+    def for_database(cls, db_path, conn):
+        """Load the matcher from the index cache, building it if the terms changed"""
+        from .indexcache import content_hash, load_index, save_index
+
+        key = content_hash(conn)
+        matcher = load_index(db_path, CACHE_NAME, key, cls.from_state)
+        if matcher is None:
+            matcher = cls(conn.execute(TERMS_SQL))
+            save_index(db_path, CACHE_NAME, key, matcher)
+        return matcher
+
+    def to_state(self):
+        """Return the automaton as flat lists that JSON can hold and load quickly.
+
+        Every node but the root is stored as its parent and the token
+        leading to it; the patterns are split into parallel columns.
+        """
+        if self.stale_links:
+            self._link()
+        parents = [0] * len(self.goto)
+        tokens = [""] * len(self.goto)
+        for node, children in enumerate(self.goto):
+            for token, child in children.items():
+                parents[child] = node
+                tokens[child] = token
+        outputs = []
+        for node, numbers in enumerate(self.outputs):
+            if numbers:
+                outputs.extend((node, len(numbers), *numbers))
+        patterns = [pattern or (0, 0, None) for pattern in self.patterns]
+        return {
+            "parents": parents[1:],
+            "tokens": tokens[1:],
+            "outputs": outputs,
+            "lengths": [pattern[0] for pattern in patterns],
+            "term_ids": [pattern[1] for pattern in patterns],
+            "exacts": [pattern[2] for pattern in patterns],
+            "removed": [
+                number
+                for number, pattern in enumerate(self.patterns)
+                if pattern is None
+            ],
+            "fail": self.fail.tolist(),
+            "output_link": self.output_link.tolist(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a matcher from to_state()"""
+        parents, tokens = state["parents"], state["tokens"]
+        nodes = len(parents) + 1
+        patterns = state["lengths"], state["term_ids"], state["exacts"]
+        if (
+            len(tokens) != len(parents)
+            or not len(state["fail"]) == len(state["output_link"]) == nodes
+            or len(set(map(len, patterns))) != 1
+        ):
+            raise ValueError("inconsistent term matcher cache")
+        matcher = cls.__new__(cls)
+        goto = matcher.goto = [{} for _ in range(nodes)]
+        for child, (parent, token) in enumerate(zip(parents, tokens), 1):
+            goto[parent][token] = child
+        outputs = matcher.outputs = [()] * nodes
+        flat = state["outputs"]
+        position = 0
+        while position < len(flat):
+            node, count = flat[position], flat[position + 1]
+            outputs[node] = tuple(flat[position + 2 : position + 2 + count])
+            position += 2 + count
+        matcher.patterns = list(zip(*patterns))
+        for number in state["removed"]:
+            matcher.patterns[number] = None
+        matcher.max_tokens = max(state["lengths"], default=0)
+        matcher.fail = array("l", state["fail"])
+        matcher.output_link = array("l", state["output_link"])
+        return matcher
+
+    def add(self, term_id, term):
+        """Match a new term too; the failure links are rebuilt on the next scan"""
+        for variant in term_variants(term or ""):
+            tokens = tokenize(variant)
+            if tokens:
+                self._add(tokens, term_id, variant if is_acronym(variant) else None)
+        self.stale_links = True
+
+    def remove_ids(self, term_ids):
+        """Stop matching the terms with these ids"""
+        term_ids = set(term_ids)
+        patterns = self.patterns
+        for number, pattern in enumerate(patterns):
+            if pattern is not None and pattern[1] in term_ids:
+                patterns[number] = None
+
+    def _add(self, tokens, term_id, exact):
+        node = 0
+        for token in tokens:
+            child = self.goto[node].get(token)
+            if child is None:
+                child = len(self.goto)
+                self.goto[node][token] = child
+                self.goto.append({})
+                self.outputs.append(())
+            node = child
+        self.outputs[node] += (len(self.patterns),)
+        self.patterns.append((len(tokens), term_id, exact))
+        self.max_tokens = max(self.max_tokens, len(tokens))
+
+    def _link(self):
+        """Compute failure links and output links breadth first"""
+        self.stale_links = False
+        self.fail = array("l", bytes(array("l").itemsize * len(self.goto)))
+        self.output_link = array("l", self.fail)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self.goto[node].items():
+                queue.append(child)
+                state = self.fail[node]
+                while state and token not in self.goto[state]:
+                    state = self.fail[state]
+                target = self.goto[state].get(token, 0)
+                self.fail[child] = target if target != child else 0
+                fallback = self.fail[child]
+                self.output_link[child] = (
+                    fallback if self.outputs[fallback] else self.output_link[fallback]
+                )
+
+    def iter_matches(self, text, offset=0):
+        """Yield every (possibly overlapping) Match in text.
+
+        offset is added to the reported positions, for scanning a larger
+        document in pieces.
+        """
+        if self.stale_links:
+            self._link()
+        goto, fail, outputs, links = (
+            self.goto,
+            self.fail,
+            self.outputs,
+            self.output_link,
+        )
+        patterns = self.patterns
+        starts = deque(maxlen=max(self.max_tokens, 1))
+        node = 0
+        for token_match in TOKEN_RE.finditer(text):
+            token = token_match.group().lower()
+            starts.append(token_match.start())
+            while node and token not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(token, 0)
+            state = node
+            while state:
+                for pattern in outputs[state]:
+                    if patterns[pattern] is None:
+                        continue
+                    length, term_id, exact = patterns[pattern]
+                    start = starts[-length]
+                    end = token_match.end()
+                    span = text[start:end]
+                    if exact is None or span == exact:
+                        yield Match(start + offset, end + offset, term_id, span)
+                state = links[state]
+
+    def walk_matches(self, text):
+        """Yield the same Matches as iter_matches() by walking the trie.
+
+        Each token starts a walk of at most max_tokens steps, so no failure
+        links are needed.
+        """
+        goto, outputs, patterns = self.goto, self.outputs, self.patterns
+        tokens = [
+            (token.start(), token.end(), token.group().lower())
+            for token in TOKEN_RE.finditer(text)
+        ]
+        for first, (start, _, _) in enumerate(tokens):
+            node = 0
+            for _, end, token in tokens[first : first + self.max_tokens]:
+                node = goto[node].get(token)
+                if node is None:
+                    break
+                for pattern in outputs[node]:
+                    if patterns[pattern] is None:
+                        continue
+                    _, term_id, exact = patterns[pattern]
+                    span = text[start:end]
+                    if exact is None or span == exact:
+                        yield Match(start, end, term_id, span)
+
+    def mentions(self, text):
+        """Return the ids of the terms text mentions, as scan() would find them"""
+        return {match.term_id for match in self.scan(text, walk=True)}
+
+    def scan(self, text, overlapping=False, walk=False):
+        """Return the Matches in text ordered by position.
+
+        Unless overlapping is set, only the leftmost-longest spans are kept;
+        a span that names several terms is reported once per term. walk
+        finds them with walk_matches() rather than the automaton.
+        """
+        found = self.walk_matches(text) if walk else self.iter_matches(text)
+        matches = sorted(found, key=lambda m: (m.start, m.start - m.end))
+        if overlapping:
+            return matches
+        kept = []
+        end = -1
+        span = None
+        for match in matches:
+            if (match.start, match.end) == span:
+                kept.append(match)
+            elif match.start >= end:
+                kept.append(match)
+                span = (match.start, match.end)
+                end = match.end
+        return kept
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Annotate whole folders of evidence files across a process pool."""
+
+import csv
+import json
+import os
+import re
+from fnmatch import fnmatch
+
+CHUNK_CHARS = 1024 * 1024
+OVERLAP_CHARS = 4096
+DEFAULT_MAX_LOCATIONS = 100
+BATCH_FORMATS = ("jsonl", "csv")
+CSV_HEADER = ("file", "term_id", "term", "count", "offsets", "error")
+WHITESPACE_RE = re.compile(r"\s")
+
+_matcher = None
+
+
+def iter_files(paths, pattern=None):
+    """Yield every file under paths, optionally only names matching a glob"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if pattern is None or fnmatch(name, pattern):
+                        yield os.path.join(root, name)
+        elif pattern is None or fnmatch(os.path.basename(path), pattern):
+            yield path
+
+
+def scan_stream(matcher, handle, max_locations=DEFAULT_MAX_LOCATIONS):
+    """Count term hits in a text stream read in bounded chunks.
+
+    Matches are only accepted once they start at least OVERLAP_CHARS before
+    the end of the text read so far, so they are resolved with the full
+    context a single scan of the file would have. The unresolved tail,
+    starting just after a whitespace, is carried into the next chunk, and the
+    leftmost-longest state is kept in absolute offsets across chunks.
+    Returns {term_id: [count, [character offsets...]]}.
+    """
+    hits = {}
+    carry = ""
+    base = 0
+    end = 0
+    span = None
+    while True:
+        data = handle.read(CHUNK_CHARS)
+        text = carry + data
+        if not data:
+            limit = len(text)
+        else:
+            limit = max(len(text) - OVERLAP_CHARS, 0)
+            found = WHITESPACE_RE.search(text, limit)
+            if found:
+                limit = found.end() if limit else 0
+        matches = sorted(
+            matcher.iter_matches(text[: limit + OVERLAP_CHARS], base),
+            key=lambda m: (m.start, m.start - m.end),
+        )
+        for match in matches:
+            if match.start >= base + limit:
+                break
+            if (match.start, match.end) == span:
+                pass
+            elif match.start >= end:
+                span = (match.start, match.end)
+                end = match.end
+            else:
+                continue
+            entry = hits.setdefault(match.term_id, [0, []])
+            entry[0] += 1
+            if len(entry[1]) < max_locations:
+                entry[1].append(match.start)
+        if not data:
+            return hits
+        carry = text[limit:]
+        base += limit
+
+
+def _init_worker(matcher):
+    global _matcher
+    _matcher = matcher
+
+
+def _annotate_file(job):
+    path, max_locations = job
+    try:
+        with open(path, encoding="utf-8", errors="replace") as handle:
+            hits = scan_stream(_matcher, handle, max_locations)
+        return path, hits, None
+    except OSError as exc:
+        return path, {}, str(exc)
+
+
+def annotate_files(matcher, files, processes=None, max_locations=DEFAULT_MAX_LOCATIONS):
+    """Yield (path, hits, error) for each file, scanned in parallel.
+
+    Every worker process receives the precompiled matcher once when it
+    starts. Results arrive in completion order as they are produced.
+    """
+    from multiprocessing import Pool
+
+    jobs = ((path, max_locations) for path in files)
+    if processes == 1:
+        _init_worker(matcher)
+        yield from map(_annotate_file, jobs)
+        return
+    with Pool(processes, initializer=_init_worker, initargs=(matcher,)) as pool:
+        yield from pool.imap_unordered(_annotate_file, jobs, chunksize=4)
+
+
+def write_index(results, handle, term_names, fmt="jsonl"):
+    """Write batch results as a JSONL or CSV index and return (files, hits).
+
+    Every file is listed: in CSV a file without hits, or one that could
+    not be read, gets a single row with empty term columns and its error.
+    """
+    writer = csv.writer(handle) if fmt == "csv" else None
+    if writer:
+        writer.writerow(CSV_HEADER)
+    files = total = 0
+    for path, hits, error in results:
+        files += 1
+        terms = sorted(hits.items(), key=lambda item: -item[1][0])
+        total += sum(count for count, _ in hits.values())
+        if writer:
+            for term_id, (count, offsets) in terms:
+                writer.writerow(
+                    (
+                        path,
+                        term_id,
+                        term_names.get(term_id, ""),
+                        count,
+                        " ".join(map(str, offsets)),
+                        error or "",
+                    )
+                )
+            if not terms:
+                writer.writerow((path, "", "", "", "", error or ""))
+            continue
+        record = {
+            "file": path,
+            "terms": [
+                {
+                    "term_id": term_id,
+                    "term": term_names.get(term_id, ""),
+                    "count": count,
+                    "offsets": offsets,
+                }
+                for term_id, (count, offsets) in terms
+            ],
+        }
+        if error:
+            record["error"] = error
+        handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return files, total
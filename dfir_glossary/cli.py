@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""Command line access to the DFIR glossary without the Qt interface."""
+
+import argparse
+import json
+import sqlite3
+import sys
+from .core import Glossary, GlossaryError, default_read_only
+from .defaults import DEFAULT_HOST, DEFAULT_PORT
+from .batch import BATCH_FORMATS, DEFAULT_MAX_LOCATIONS, write_index
+from .delta import CONFLICT_POLICIES as MERGE_POLICIES
+from .exporter import FORMATS as EXPORT_FORMATS, detect_format
+from .fuzzy import DEFAULT_DISTANCE, MAX_DISTANCE
+from .importer import CONFLICT_POLICIES, DEFAULT_BATCH_SIZE, FORMATS
+
+
+def print_term(term, as_json=False, verbose=True):
+    if as_json:
+        print(json.dumps(term._asdict(), ensure_ascii=False))
+        return
+    print(term.term)
+    if verbose:
+        if term.definition:
+            print(f"    {term.definition}")
+        if term.source:
+            print(f"    Source: {term.source}")
+        print()
+
+
+def cmd_search(glossary, args):
+    for term in glossary.search(args.text, args.limit, args.fuzzy):
+        print_term(term, args.json, args.verbose)
+    return 0
+
+
+def cmd_get(glossary, args):
+    if args.id:
+        term = glossary.get(int(args.term))
+    else:
+        term = glossary.lookup(args.term, ignore_case=True)
+    if term is None:
+        print(f"The term {args.term} was not found", file=sys.stderr)
+        return 1
+    print_term(term, args.json)
+    return 0
+
+
+def cmd_related(glossary, args):
+    if args.id:
+        term = glossary.get(int(args.term))
+    else:
+        term = glossary.lookup(args.term, ignore_case=True)
+    if term is None:
+        print(f"The term {args.term} was not found", file=sys.stderr)
+        return 1
+    references, referenced_by = glossary.related(term.id)
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "term": term.term,
+                    "references": [name for _, name in references],
+                    "referenced_by": [name for _, name in referenced_by],
+                },
+                ensure_ascii=False,
+            )
+        )
+        return 0
+    print(term.term)
+    for heading, rows in (("References", references), ("Referenced by", referenced_by)):
+        if rows:
+            print(f"    {heading}: {', '.join(name for _, name in rows)}")
+    return 0
+
+
+def cmd_export(glossary, args):
+    term_ids = None
+    terms = args.terms or None
+    if args.search is not None:
+        term_ids = glossary.search_ids(args.search)
+    fmt = args.format
+    if args.output:
+        fmt = fmt or detect_format(args.output)
+        with open(args.output, "w", newline="", encoding="utf-8") as output:
+            glossary.export(output, fmt, term_ids, terms)
+    else:
+        glossary.export(sys.stdout, fmt or "csv", term_ids, terms)
+    return 0
+
+
+def cmd_import(glossary, args):
+    def progress(summary):
+        print(f"\r{summary}", end="", file=sys.stderr, flush=True)
+
+    summary = glossary.import_file(
+        args.file,
+        args.format,
+        args.on_conflict,
+        args.batch_size,
+        None if args.quiet else progress,
+    )
+    if not args.quiet:
+        print(file=sys.stderr)
+    if args.json:
+        print(json.dumps(summary.as_dict()))
+    else:
+        print(f"Import complete: {summary}")
+    return 0
+
+
+def cmd_diff(glossary, args):
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            count = glossary.diff(args.other, output)
+        print(f"{count} changes written to {args.output}", file=sys.stderr)
+    else:
+        glossary.diff(args.other, sys.stdout)
+    return 0
+
+
+def report_patch(summary, args):
+    if not args.quiet:
+        print(file=sys.stderr)
+    if args.json:
+        print(json.dumps(summary.as_dict(), ensure_ascii=False))
+        return 0
+    for conflict in summary.conflicts:
+        outcome = "theirs applied" if conflict.applied else "kept ours"
+        print(
+            f"Conflict: {conflict.term} ({conflict.ours} here, "
+            f"{conflict.theirs} there; {outcome})"
+        )
+    print(f"Patch complete: {summary}")
+    return 0
+
+
+def patch_progress(args):
+    if args.quiet:
+        return None
+
+    def progress(summary):
+        print(f"\r{summary}", end="", file=sys.stderr, flush=True)
+
+    return progress
+
+
+def cmd_patch(glossary, args):
+    summary = glossary.patch(args.delta, args.prefer, patch_progress(args))
+    return report_patch(summary, args)
+
+
+def cmd_merge(glossary, args):
+    summary = glossary.merge(args.base, args.theirs, args.prefer, patch_progress(args))
+    return report_patch(summary, args)
+
+
+def cmd_changes(glossary, args):
+    for seq, changed, action, term in glossary.change_log(args.since, args.limit):
+        if args.json:
+            record = {"seq": seq, "changed": changed, "action": action, "term": term}
+            print(json.dumps(record, ensure_ascii=False))
+        else:
+            print(f"{seq}\t{changed}\t{action}\t{term}")
+    return 0
+
+
+def cmd_annotate(glossary, args):
+    sources = args.files or ["-"]
+    for source in sources:
+        if source == "-":
+            matches = glossary.annotate(sys.stdin.read(), args.overlapping)
+        else:
+            matches = glossary.annotate_file(source, args.overlapping)
+        if args.json:
+            for match in matches:
+                record = {"file": source, **match._asdict()}
+                print(json.dumps(record, ensure_ascii=False))
+        elif args.spans:
+            for match in matches:
+                print(
+                    f"{source}:{match.start}-{match.end}\t{match.text}\t{match.term_id}"
+                )
+        else:
+            counts = {}
+            for match in matches:
+                counts[match.term_id] = counts.get(match.term_id, 0) + 1
+            if len(sources) > 1:
+                print(f"==> {source} <==")
+            for term_id, count in counts.items():
+                term = glossary.get(term_id)
+                print(f"[{count}] ", end="")
+                print_term(term, verbose=args.verbose)
+    return 0
+
+
+def cmd_batch(glossary, args):
+    results = glossary.annotate_paths(
+        args.paths, args.jobs, args.pattern, args.max_locations
+    )
+    term_names = glossary.term_names()
+    if args.output:
+        fmt = args.format or ("csv" if args.output.endswith(".csv") else "jsonl")
+        with open(args.output, "w", newline="", encoding="utf-8") as output:
+            files, hits = write_index(results, output, term_names, fmt)
+    else:
+        files, hits = write_index(
+            results, sys.stdout, term_names, args.format or "jsonl"
+        )
+    print(f"{files} files scanned, {hits} term hits", file=sys.stderr)
+    return 0
+
+
+def cmd_stats(glossary, args):
+    stats = glossary.stats()
+    if args.json:
+        print(json.dumps(stats))
+    else:
+        for key, value in stats.items():
+            print(f"{key}: {value}")
+    return 0
+
+
+def cmd_sources(glossary, args):
+    for source, terms in glossary.sources():
+        if args.json:
+            print(json.dumps({"source": source, "terms": terms}, ensure_ascii=False))
+        else:
+            print(f"{terms}\t{source}")
+    return 0
+
+
+def cmd_build_index(glossary, args):
+    for name, path in glossary.build_indexes().items():
+        print(f"{name}: {path or 'not written'}")
+    return 0
+
+
+def cmd_serve(glossary, args):
+    from .server import serve
+
+    def ready(port):
+        print(f"Serving the glossary on http://{args.host}:{port}/", file=sys.stderr)
+
+    serve(glossary, args.host, args.port, ready)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="dfir-glossary-cli",
+        description="DFIR Glossary - A gathering of terms commonly used in DFIR",
+    )
+    parser.add_argument("--db", help="path to the glossary database")
+    parser.add_argument(
+        "--read-only",
+        action="store_const",
+        const=True,
+        help="open the database immutable and read-only, for shared deployments",
+    )
+    parser.set_defaults(writes=False)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    search_parser = subparsers.add_parser(
+        "search", help="search all terms and definitions"
+    )
+    search_parser.add_argument("text")
+    search_parser.add_argument("-n", "--limit", type=int, help="maximum results")
+    search_parser.add_argument(
+        "-v", "--verbose", action="store_true", help="show definitions and sources"
+    )
+    search_parser.add_argument(
+        "-z",
+        "--fuzzy",
+        type=int,
+        nargs="?",
+        const=DEFAULT_DISTANCE,
+        default=0,
+        choices=range(MAX_DISTANCE + 1),
+        metavar="TYPOS",
+        help=f"also list terms within TYPOS typos, after exact matches "
+        f"({DEFAULT_DISTANCE})",
+    )
+    search_parser.add_argument("--json", action="store_true", help="output JSON lines")
+    search_parser.set_defaults(func=cmd_search)
+
+    get_parser = subparsers.add_parser("get", help="show a single term")
+    get_parser.add_argument("term")
+    get_parser.add_argument(
+        "--id", action="store_true", help="look the term up by its id"
+    )
+    get_parser.add_argument("--json", action="store_true", help="output JSON")
+    get_parser.set_defaults(func=cmd_get)
+
+    related_parser = subparsers.add_parser(
+        "related", help="show the terms a term refers to and is referred to by"
+    )
+    related_parser.add_argument("term")
+    related_parser.add_argument(
+        "--id", action="store_true", help="look the term up by its id"
+    )
+    related_parser.add_argument("--json", action="store_true", help="output JSON")
+    related_parser.set_defaults(func=cmd_related)
+
+    export_parser = subparsers.add_parser("export", help="export terms")
+    export_parser.add_argument("terms", nargs="*", help="terms to export (all)")
+    export_parser.add_argument("-o", "--output", help="output file (stdout)")
+    export_parser.add_argument("-s", "--search", help="export the search results")
+    export_parser.add_argument(
+        "-f",
+        "--format",
+        choices=EXPORT_FORMATS,
+        help="output format (from the extension, or csv)",
+    )
+    export_parser.set_defaults(func=cmd_export)
+
+    import_parser = subparsers.add_parser(
+        "import", help="bulk import terms from CSV or JSONL"
+    )
+    import_parser.add_argument("file")
+    import_parser.add_argument(
+        "-f", "--format", choices=FORMATS, help="input format (from the extension)"
+    )
+    import_parser.add_argument(
+        "-c",
+        "--on-conflict",
+        choices=CONFLICT_POLICIES,
+        default="skip",
+        help="what to do with terms that already exist (skip)",
+    )
+    import_parser.add_argument(
+        "-b",
+        "--batch-size",
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f"rows per transaction ({DEFAULT_BATCH_SIZE})",
+    )
+    import_parser.add_argument(
+        "-q", "--quiet", action="store_true", help="do not report progress"
+    )
+    import_parser.add_argument("--json", action="store_true", help="output JSON")
+    import_parser.set_defaults(func=cmd_import, writes=True)
+
+    diff_parser = subparsers.add_parser(
+        "diff", help="write the delta that turns this database into another"
+    )
+    diff_parser.add_argument("other", help="the database to compare with")
+    diff_parser.add_argument("-o", "--output", help="output file (stdout)")
+    diff_parser.set_defaults(func=cmd_diff)
+
+    merge_options = argparse.ArgumentParser(add_help=False)
+    merge_options.add_argument(
+        "-p",
+        "--prefer",
+        choices=MERGE_POLICIES,
+        default="ours",
+        help="how to resolve terms changed on both sides (ours)",
+    )
+    merge_options.add_argument(
+        "-q", "--quiet", action="store_true", help="do not report progress"
+    )
+    merge_options.add_argument("--json", action="store_true", help="output JSON")
+    patch_parser = subparsers.add_parser(
+        "patch", parents=[merge_options], help="apply a delta written by diff"
+    )
+    patch_parser.add_argument("delta")
+    patch_parser.set_defaults(func=cmd_patch, writes=True)
+    merge_parser = subparsers.add_parser(
+        "merge",
+        parents=[merge_options],
+        help="apply the changes made between two other databases",
+    )
+    merge_parser.add_argument("base", help="the database both copies started from")
+    merge_parser.add_argument("theirs", help="the copy whose changes to apply")
+    merge_parser.set_defaults(func=cmd_merge, writes=True)
+
+    changes_parser = subparsers.add_parser("changes", help="show the change log")
+    changes_parser.add_argument(
+        "--since", type=int, default=0, help="only changes after this number"
+    )
+    changes_parser.add_argument(
+        "-n", "--limit", type=int, default=-1, help="maximum changes to show"
+    )
+    changes_parser.add_argument("--json", action="store_true", help="output JSON")
+    changes_parser.set_defaults(func=cmd_changes)
+
+    annotate_parser = subparsers.add_parser(
+        "annotate", help="find the glossary terms used in text files"
+    )
+    annotate_parser.add_argument(
+        "files", nargs="*", help="files to scan (standard input)"
+    )
+    annotate_parser.add_argument(
+        "-v", "--verbose", action="store_true", help="show definitions and sources"
+    )
+    annotate_parser.add_argument(
+        "--spans", action="store_true", help="list every match with its position"
+    )
+    annotate_parser.add_argument(
+        "--overlapping",
+        action="store_true",
+        help="also report terms inside longer matches",
+    )
+    annotate_parser.add_argument(
+        "--json", action="store_true", help="output JSON lines"
+    )
+    annotate_parser.set_defaults(func=cmd_annotate)
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="index glossary terms across files and folders"
+    )
+    batch_parser.add_argument("paths", nargs="+", help="files or folders to scan")
+    batch_parser.add_argument("-o", "--output", help="index file (stdout)")
+    batch_parser.add_argument(
+        "-f", "--format", choices=BATCH_FORMATS, help="index format (jsonl)"
+    )
+    batch_parser.add_argument(
+        "-j", "--jobs", type=int, help="worker processes (one per CPU)"
+    )
+    batch_parser.add_argument(
+        "-p", "--pattern", help="only scan file names matching this glob"
+    )
+    batch_parser.add_argument(
+        "--max-locations",
+        type=int,
+        default=DEFAULT_MAX_LOCATIONS,
+        help=f"offsets kept per term and file ({DEFAULT_MAX_LOCATIONS})",
+    )
+    batch_parser.set_defaults(func=cmd_batch)
+
+    stats_parser = subparsers.add_parser("stats", help="show database statistics")
+    stats_parser.add_argument("--json", action="store_true", help="output JSON")
+    stats_parser.set_defaults(func=cmd_stats)
+
+    sources_parser = subparsers.add_parser(
+        "sources", help="list the sources cited, most cited first"
+    )
+    sources_parser.add_argument("--json", action="store_true", help="output JSON")
+    sources_parser.set_defaults(func=cmd_sources)
+
+    build_index_parser = subparsers.add_parser(
+        "build-index",
+        help="build the search index, cross references and index sidecars for "
+        "read-only deployment",
+    )
+    build_index_parser.set_defaults(func=cmd_build_index, writes=True)
+
+    serve_parser = subparsers.add_parser(
+        "serve", help="answer lookups over HTTP/JSON on a local port"
+    )
+    serve_parser.add_argument(
+        "--host", default=DEFAULT_HOST, help=f"loopback address ({DEFAULT_HOST})"
+    )
+    serve_parser.add_argument(
+        "-p", "--port", type=int, default=DEFAULT_PORT, help=f"port ({DEFAULT_PORT})"
+    )
+    serve_parser.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        # Commands that only read never migrate or index the database, so
+        # looking terms up leaves the file as it was
+        read_only = args.read_only or default_read_only()
+        with Glossary(
+            args.db, read_only or not args.writes, immutable=read_only
+        ) as glossary:
+            return args.func(glossary, args)
+    except (GlossaryError, sqlite3.Error, OSError, ValueError) as exc:
+        print(f"dfir-glossary-cli: {exc}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
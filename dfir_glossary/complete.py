@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Prefix index over term names for instant search suggestions."""
+
+from array import array
+from bisect import bisect_left
+from itertools import compress
+from .annotate import EXPANSION_SEPARATOR, PARENS_RE
+
+DEFAULT_LIMIT = 10
+BULK_REMOVE = 100
+
+
+def completion_keys(term):
+    """Return the casefolded names a term can be completed from.
+
+    The whole term is always a key. For "ACRONYM - Expansion" terms the part
+    after the separator is a key of its own (the part before it is already
+    a prefix of the whole term), and names containing parentheses are also
+    indexed without them, so "(EC", "ECDH", "Elliptic" and "(Elliptic" all
+    reach "(EC)DH - (Elliptic Curve) Diffie-Hellman".
+    """
+    term = term.strip()
+    names = [term]
+    if EXPANSION_SEPARATOR in term:
+        names.extend(part.strip() for part in term.split(EXPANSION_SEPARATOR)[1:])
+    if "(" in term:
+        names.extend([" ".join(PARENS_RE.sub(r"\1", name).split()) for name in names])
+    return {name.casefold() for name in names if name}
+
+
+def word_keys(term, names=None):
+    """Return the keys completing an "ACRONYM - Expansion" term from a later word.
+
+    The term is split into words at spaces and brackets, and every word
+    after the first is a key, so "DH", "Curve" and "Diffie" reach
+    "(EC)DH - (Elliptic Curve) Diffie-Hellman" too. Hyphenated words stay
+    whole. Keys that are already among names, completion_keys(term) by
+    default, are left out.
+    """
+    if EXPANSION_SEPARATOR not in term:
+        return set()
+    words = term.casefold().replace("(", " ").replace(")", " ").split()
+    keys = set(words[1:])
+    keys.discard("-")
+    return keys - (completion_keys(term) if names is None else names)
+
+
+class SortedKeys:
+    """Casefolded sorted array of keys with a parallel array of term ids.
+
+    keys[i] is a key of the term ids[i]. A lookup is a binary search for
+    the prefix followed by a short forward scan, so it does not depend on
+    the number of terms. Keys are inserted and deleted in place.
+    """
+
+    def __init__(self, keys=(), ids=()):
+        keys = list(keys)
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys = [keys[pos] for pos in order]
+        self.ids = array("q", (ids[pos] for pos in order))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def scan(self, prefix, limit, found, seen):
+        """Append the ids of keys starting with prefix to found, up to limit"""
+        keys, ids = self.keys, self.ids
+        pos = bisect_left(keys, prefix)
+        while pos < len(keys) and len(found) < limit:
+            if not keys[pos].startswith(prefix):
+                break
+            term_id = ids[pos]
+            if term_id not in seen:
+                seen.add(term_id)
+                found.append(term_id)
+            pos += 1
+
+    def insert(self, key, term_id):
+        pos = bisect_left(self.keys, key)
+        self.keys.insert(pos, key)
+        self.ids.insert(pos, term_id)
+
+    def delete(self, key, term_id):
+        pos = bisect_left(self.keys, key)
+        while pos < len(self.keys) and self.keys[pos] == key:
+            if self.ids[pos] == term_id:
+                del self.keys[pos]
+                del self.ids[pos]
+                return
+            pos += 1
+
+    def compact(self, removed):
+        """Drop every key of the ids in removed in one pass"""
+        keep = [term_id not in removed for term_id in self.ids]
+        self.keys = list(compress(self.keys, keep))
+        self.ids = array("q", compress(self.ids, keep))
+
+
+class CompletionIndex:
+    """Prefix index over the names of every term, searched with bisect.
+
+    Names are the keys of completion_keys(); the later words of expansion
+    terms, from word_keys(), are kept in a second SortedKeys and only offered
+    once no more names match, so a term starting with the prefix always
+    comes before one that merely has a word starting with it. Adding or
+    removing a term inserts or deletes its few keys in place.
+    """
+
+    def __init__(self, rows=()):
+        self.names = {}
+        keys = ([], [])
+        ids = ([], [])
+        for term_id, term in rows:
+            self.names[term_id] = term
+            for tier_keys, tier_ids, new in zip(keys, ids, self._keys(term)):
+                tier_keys.extend(new)
+                tier_ids.extend([term_id] * len(new))
+        self.tiers = tuple(map(SortedKeys, keys, ids))
+
+    def __len__(self):
+        return len(self.names)
+
+    def complete(self, prefix, limit=DEFAULT_LIMIT):
+        """Return up to limit (id, term) pairs with a name starting with prefix"""
+        prefix = prefix.strip().casefold()
+        if not prefix:
+            return []
+        found = []
+        seen = set()
+        for tier in self.tiers:
+            tier.scan(prefix, limit, found, seen)
+        return [(term_id, self.names[term_id]) for term_id in found]
+
+    @staticmethod
+    def _keys(term):
+        names = completion_keys(term)
+        return names, word_keys(term, names)
+
+    def add(self, term_id, term):
+        """Index a new term, replacing any earlier name it had"""
+        if term_id in self.names:
+            self.remove(term_id)
+        self.names[term_id] = term
+        for tier, keys in zip(self.tiers, self._keys(term)):
+            for key in keys:
+                tier.insert(key, term_id)
+
+    def remove(self, term_id):
+        term = self.names.pop(term_id, None)
+        if term is None:
+            return
+        self._remove_keys(term_id, term)
+
+    def remove_ids(self, term_ids):
+        """Remove many terms, compacting the arrays once if that is cheaper"""
+        removed = {
+            term_id: self.names.pop(term_id)
+            for term_id in term_ids
+            if term_id in self.names
+        }
+        if len(removed) < BULK_REMOVE:
+            for term_id, term in removed.items():
+                self._remove_keys(term_id, term)
+            return
+        for tier in self.tiers:
+            tier.compact(removed)
+
+    def _remove_keys(self, term_id, term):
+        for tier, keys in zip(self.tiers, self._keys(term)):
+            for key in keys:
+                tier.delete(key, term_id)
+
+    def update(self, term_id, term):
+        self.add(term_id, term)
@@ -0,0 +1,514 @@
+#!/usr/bin/env python3
+"""GUI-free access to the glossary, shared by the CLI and the Qt application."""
+
+import os
+import sqlite3
+import sys
+import threading
+from collections import namedtuple
+from .database import GlossaryDatabase
+from .search import ensure_search_index
+from .xref import RELATED_LIMIT
+
+# The modules for importing, exporting, annotating, diffing and the
+# in-memory indexes are imported inside the methods that use them, so a
+# lookup does not pay for loading multiprocessing and the rest.
+
+DB_NAME = "glossary.sqlite"
+DB_ENV = "DFIR_GLOSSARY_DB"
+READ_ONLY_ENV = "DFIR_GLOSSARY_READ_ONLY"
+EDITABLE_COLUMNS = ("definition", "source")
+
+Term = namedtuple("Term", ["id", "term", "definition", "source"])
+
+
+class GlossaryError(Exception):
+    """Raised when a glossary operation cannot be carried out"""
+
+
+def default_db_path():
+    """Return the path of the glossary database shipped with the application.
+
+    Setting DFIR_GLOSSARY_DB points the application at another database.
+    """
+    if os.environ.get(DB_ENV):
+        return os.environ[DB_ENV]
+    if getattr(sys, "frozen", False):
+        base_path = os.path.dirname(sys.executable)
+    else:
+        base_path = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_path, DB_NAME)
+
+
+def default_read_only():
+    """Setting DFIR_GLOSSARY_READ_ONLY to anything but 0 opens databases read-only"""
+    return os.environ.get(READ_ONLY_ENV, "0") not in ("", "0")
+
+
+class Glossary:
+    """Lookup, search, editing and export over a glossary database.
+
+    A read-only glossary opens its database immutable and memory-mapped for
+    deployments shared between many processes; every method that would
+    change it raises GlossaryError. With immutable False it is opened
+    read-only without those guarantees, for reading a database that other
+    processes may be writing, and nothing is migrated or indexed in it.
+    """
+
+    def __init__(self, db_path=None, read_only=None, immutable=True):
+        self.db_path = db_path or default_db_path()
+        if not os.path.exists(self.db_path):
+            raise GlossaryError(f"The database cannot be found at {self.db_path}")
+        if read_only is None:
+            read_only = default_read_only()
+        self.read_only = read_only
+        self.db = GlossaryDatabase(
+            self.db_path, read_only=read_only, immutable=immutable
+        )
+        self._matcher = None
+        self._fuzzy = None
+        self._fuzzy_generation = 0
+        self._fuzzy_lock = threading.Lock()
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def all_terms(self):
+        return [Term(*row) for row in self.db.all_terms()]
+
+    def exists(self, term):
+        return self.db.term_exists(term)
+
+    def lookup(self, term, ignore_case=False):
+        """Return the Term with exactly this name, or None.
+
+        With ignore_case a term differing only in the case of ASCII letters
+        is returned when there is no exact match.
+        """
+        if ignore_case:
+            row = self.db.find_term_row(term)
+        else:
+            row = self.db.get_term_row(term)
+        return Term(*row) if row else None
+
+    def get(self, term_id):
+        """Return the Term with this id, or None"""
+        row = self.db.get_term_by_id(term_id)
+        return Term(*row) if row else None
+
+    def search_ids(self, text):
+        return self.db.search_ids(text)
+
+    def search_matches(self, text):
+        """Return ranked ids and the matched spans of each term and definition"""
+        return self.db.search_matches(text)
+
+    def search(self, text, limit=None, fuzzy=0):
+        """Return the Terms whose term or definition contains text.
+
+        With fuzzy set, terms within that many typos of text are returned
+        after every exact match.
+        """
+        term_ids = self.search_ids(text)
+        if fuzzy:
+            term_ids += self.approximate_ids(text, term_ids, fuzzy)
+        if limit is not None:
+            term_ids = term_ids[:limit]
+        return [Term(*row) for row in self.db.rows(term_ids)]
+
+    def _check_writable(self):
+        if self.read_only:
+            raise GlossaryError("The glossary is open read-only")
+
+    def add(self, term, definition="", source=""):
+        """Add a new term and return its id"""
+        self._check_writable()
+        if not term:
+            raise GlossaryError("The 'Term' field cannot be empty")
+        if self.exists(term):
+            raise GlossaryError(f"The term {term} already exists in the database")
+        term_id = self.db.add_term(term, definition, source)
+        if self._matcher is not None:
+            self._matcher.add(term_id, term)
+        with self._fuzzy_lock:
+            self._fuzzy_generation += 1
+            if self._fuzzy is not None:
+                self._fuzzy.add(term_id, term)
+        if self.db.refs_built():
+            self.db.add_term_refs(self.matcher, term_id, term, definition)
+        return term_id
+
+    def edit(self, term, **values):
+        """Change the definition and/or source of an existing term"""
+        row = self.db.get_term_row(term)
+        if row is None:
+            raise GlossaryError(f"The term {term} does not exist in the database")
+        self.edit_id(row[0], **values)
+
+    def edit_id(self, term_id, **values):
+        """Change the definition and/or source of the term with this id"""
+        self._check_writable()
+        row = self.db.get_term_by_id(term_id)
+        if row is None:
+            raise GlossaryError(f"There is no term with the id {term_id}")
+        for column, value in values.items():
+            if column not in EDITABLE_COLUMNS:
+                raise GlossaryError(f"Unable to edit the {column} of a term")
+            self.db.update_values(
+                column, {term_id: value}, f"Edit the {column} of {row[1]}"
+            )
+        if "definition" in values and self.db.refs_built():
+            self.db.set_references(self.matcher, [(term_id, values["definition"])])
+
+    def remove(self, terms):
+        """Remove the named terms as one undoable batch"""
+        return self.remove_ids(self.db.term_ids(terms))
+
+    def remove_ids(self, term_ids):
+        """Remove the terms with these ids as one undoable batch"""
+        self._check_writable()
+        with self._fuzzy_lock:
+            self._fuzzy_generation += 1
+            if self._fuzzy is not None:
+                self._fuzzy.remove_ids(term_ids)
+            removed = self.db.remove_ids(term_ids)
+        if self._matcher is not None:
+            self._matcher.remove_ids(term_ids)
+        return removed
+
+    def _replay(self, change):
+        """Apply what an undo or redo changed to the indexes and cross references.
+
+        Edges are kept while their terms are deleted, so only restored terms
+        that were given a new id need theirs found again.
+        """
+        if change is None:
+            return change
+        if change.removed or change.restored:
+            with self._fuzzy_lock:
+                self._fuzzy_generation += 1
+                if self._fuzzy is not None:
+                    self._fuzzy.remove_ids(change.removed)
+                    for term_id, term, _, _ in change.restored:
+                        self._fuzzy.add(term_id, term)
+            if self._matcher is not None:
+                self._matcher.remove_ids(change.removed)
+                for term_id, term, _, _ in change.restored:
+                    self._matcher.add(term_id, term)
+        if self.db.refs_built():
+            definitions = [
+                (term_id, value)
+                for term_id, column, value in change.updated
+                if column == "definition"
+            ]
+            if definitions:
+                self.db.set_references(self.matcher, definitions)
+            restored = {row[0]: row for row in change.restored}
+            for term_id in change.renumbered:
+                _, term, definition, _ = restored[term_id]
+                self.db.add_term_refs(self.matcher, term_id, term, definition)
+        return change
+
+    def undo(self):
+        """Revert the latest delete or edit and return its JournalChange.
+
+        Returns None when there is nothing to undo. Raises GlossaryError if
+        a deleted term has been added again since.
+        """
+        self._check_writable()
+        try:
+            return self._replay(self.db.undo())
+        except sqlite3.IntegrityError as exc:
+            raise GlossaryError(f"Unable to undo: {exc}") from exc
+
+    def redo(self):
+        """Apply the latest undone delete or edit again and return its JournalChange"""
+        self._check_writable()
+        return self._replay(self.db.redo())
+
+    def can_undo(self):
+        return self.db.can_undo()
+
+    def can_redo(self):
+        return self.db.can_redo()
+
+    def import_file(
+        self,
+        path,
+        fmt=None,
+        policy="skip",
+        batch_size=None,
+        progress=None,
+    ):
+        """Bulk import a CSV or JSONL file and return its ImportSummary.
+
+        batch_size defaults to importer.DEFAULT_BATCH_SIZE.
+        """
+        from .importer import DEFAULT_BATCH_SIZE, import_file
+
+        self._check_writable()
+        self._bulk_changed()
+        return import_file(
+            self.db, path, fmt, policy, batch_size or DEFAULT_BATCH_SIZE, progress
+        )
+
+    def _bulk_changed(self):
+        """Drop the in-memory indexes ahead of a bulk write"""
+        self._matcher = None
+        with self._fuzzy_lock:
+            self._fuzzy_generation += 1
+            self._fuzzy = None
+        self.db.mark_refs_stale()
+
+    def diff(self, other_path, output):
+        """Write the delta that turns this glossary into the one at other_path.
+
+        output is an open text file; returns how many changes were written.
+        """
+        from .delta import diff, open_snapshot, write_delta
+
+        if self.db.writable:
+            self.db.refresh_hashes()
+        other = open_snapshot(other_path)
+        try:
+            return write_delta(diff(self.db.conn, other), output)
+        finally:
+            other.close()
+
+    def patch(self, path, prefer="ours", progress=None):
+        """Apply a delta written by diff() and return its PatchSummary.
+
+        The whole delta is applied in one transaction. Terms changed here
+        since the delta was made are conflicts, resolved by prefer (one of
+        delta.CONFLICT_POLICIES). Patches are not journaled for undo.
+        """
+        from .delta import read_delta
+
+        self._check_writable()
+        self._bulk_changed()
+        with open(path, encoding="utf-8") as handle:
+            return self.db.apply_changes(read_delta(handle), prefer, progress)
+
+    def merge(self, base_path, theirs_path, prefer="ours", progress=None):
+        """Apply the changes made between base_path and theirs_path here.
+
+        This is a three-way merge: a term changed both here and there since
+        base, in different ways, is a conflict resolved by prefer.
+        """
+        from .delta import diff, open_snapshot
+
+        self._check_writable()
+        self._bulk_changed()
+        base = open_snapshot(base_path)
+        try:
+            theirs = open_snapshot(theirs_path)
+            try:
+                return self.db.apply_changes(diff(base, theirs), prefer, progress)
+            finally:
+                theirs.close()
+        finally:
+            base.close()
+
+    def change_log(self, since=0, limit=-1):
+        """Return (seq, changed, action, term) of the changes logged after since"""
+        return self.db.change_log(since, limit)
+
+    def export(self, output, fmt="csv", term_ids=None, terms=None):
+        """Stream terms to an open text file and return how many were written.
+
+        With neither term_ids nor terms every term is exported. fmt is one
+        of exporter.FORMATS.
+        """
+        from .exporter import export_rows
+
+        return export_rows(self.db.conn, output, fmt, term_ids, terms)
+
+    @property
+    def matcher(self):
+        """The TermMatcher for the current terms, loaded from cache when possible"""
+        if self._matcher is None:
+            from .annotate import TermMatcher
+
+            self._matcher = TermMatcher.for_database(self.db_path, self.db.conn)
+        return self._matcher
+
+    def refs_built(self):
+        """True when related() reflects every definition"""
+        return self.db.refs_built()
+
+    def build_refs(self, matcher=None):
+        """Scan every definition for mentions of terms and store the edges.
+
+        Returns how many were found.
+        """
+        self._check_writable()
+        edges = self.db.compute_refs(matcher or self.matcher)
+        self.db.store_refs(edges)
+        return len(edges)
+
+    def store_refs(self, edges, generation, matcher=None):
+        """Store edges computed elsewhere unless the glossary changed since.
+
+        generation is the database's query_cache generation when they were
+        computed; False is returned if something has been written since.
+        The matcher they were computed with is kept if none is loaded. With
+        edges None only the matcher is taken, and True is returned if one
+        is loaded either way.
+        """
+        self._check_writable()
+        if edges is not None and not self.db.store_refs(edges, generation):
+            return False
+        if self._matcher is None:
+            if edges is None and generation != self.db.query_cache.generation:
+                return False
+            self._matcher = matcher
+        return True
+
+    def related(self, term_id, limit=RELATED_LIMIT):
+        """Return ([(id, term)] the term refers to, [(id, term)] referring to it).
+
+        Until the cross references are built the two lists are found by
+        scanning the definitions that could mention the term.
+        """
+        if not self.refs_built():
+            return self.db.scan_related(self.matcher, term_id, limit)
+        return self.db.related(term_id, limit)
+
+    def fuzzy_index(self, conn=None):
+        """The FuzzyIndex for the current terms, loaded from cache when possible.
+
+        Safe to call from worker threads with their own conn. The index is
+        built without holding the lock, and is only kept if no term was
+        added or removed in the meantime.
+        """
+        with self._fuzzy_lock:
+            index, generation = self._fuzzy, self._fuzzy_generation
+        if index is None:
+            from .fuzzy import FuzzyIndex
+
+            index = FuzzyIndex.for_database(self.db_path, conn or self.db.conn)
+            with self._fuzzy_lock:
+                if generation == self._fuzzy_generation:
+                    self._fuzzy = index
+        return index
+
+    def search_fuzzy(self, text, distance=None, limit=None, conn=None):
+        """Return [(edits, id)] of terms within distance typos of text.
+
+        distance defaults to fuzzy.DEFAULT_DISTANCE.
+        """
+        from .fuzzy import DEFAULT_DISTANCE
+
+        index = self.fuzzy_index(conn)
+        if distance is None:
+            distance = DEFAULT_DISTANCE
+        with self._fuzzy_lock:
+            return index.search(text, distance, limit)
+
+    def approximate_ids(self, text, exact_ids, distance=None, conn=None):
+        """Return the ids search_fuzzy finds that are not already in exact_ids"""
+        exact_ids = set(exact_ids)
+        return [
+            term_id
+            for _, term_id in self.search_fuzzy(text, distance, conn=conn)
+            if term_id not in exact_ids
+        ]
+
+    def annotate(self, text, overlapping=False):
+        """Return a Match for every glossary term mentioned in text"""
+        return self.matcher.scan(text, overlapping)
+
+    def annotate_file(self, path, overlapping=False, encoding="utf-8"):
+        with open(path, encoding=encoding, errors="replace") as handle:
+            return self.annotate(handle.read(), overlapping)
+
+    def annotate_paths(
+        self,
+        paths,
+        processes=None,
+        pattern=None,
+        max_locations=None,
+    ):
+        """Yield (path, hits, error) for every file under paths.
+
+        Files are scanned by a pool of processes (one per CPU by default);
+        hits maps each term id to [count, offsets]. max_locations defaults to
+        batch.DEFAULT_MAX_LOCATIONS.
+        """
+        from .batch import DEFAULT_MAX_LOCATIONS, annotate_files, iter_files
+
+        files = iter_files(paths, pattern)
+        return annotate_files(
+            self.matcher, files, processes, max_locations or DEFAULT_MAX_LOCATIONS
+        )
+
+    def build_indexes(self):
+        """Prepare the database for read-only deployment.
+
+        Builds the FTS search index if it is missing and the cross
+        references if they are stale, and writes the term matcher and fuzzy
+        index caches as sidecars next to the database, where read-only
+        instances load them instead of building their own. Returns
+        {cache name: path written, or None}.
+        """
+        from .annotate import CACHE_NAME as MATCHER_CACHE_NAME, TermMatcher
+        from .fuzzy import CACHE_NAME as FUZZY_CACHE_NAME, FuzzyIndex
+        from .indexcache import content_hash, save_index
+
+        self._check_writable()
+        self.db.search_index = ensure_search_index(self.db.conn)
+        key = content_hash(self.db.conn)
+        indexes = {
+            MATCHER_CACHE_NAME: TermMatcher(self.db.term_names()),
+            FUZZY_CACHE_NAME: FuzzyIndex(self.db.term_names()),
+        }
+        if self.db.refs and not self.db.refs_built():
+            self.build_refs(indexes[MATCHER_CACHE_NAME])
+        return {
+            name: save_index(self.db_path, name, key, index)
+            for name, index in indexes.items()
+        }
+
+    def sources(self):
+        """Return (source, number of terms citing it), most cited first"""
+        return self.db.sources_in_use()
+
+    def term_names(self):
+        return dict(self.db.conn.execute("SELECT id, term FROM glossary"))
+
+    def refresh(self):
+        """Drop cached results and indexes if another process changed the database.
+
+        Returns True when it had. Changes made through this glossary keep
+        them up to date on their own.
+        """
+        if not self.db.changed_elsewhere():
+            return False
+        self._matcher = None
+        with self._fuzzy_lock:
+            self._fuzzy_generation += 1
+            self._fuzzy = None
+        return True
+
+    def query_cache_stats(self):
+        """Hit, miss and size counters of the search result cache"""
+        return self.db.query_cache.stats()
+
+    def stats(self):
+        return {
+            "database": self.db_path,
+            "size": os.path.getsize(self.db_path),
+            "terms": self.db.count_terms(),
+            "undefined": self.db.count_undefined(),
+            "sources": self.db.count_sources(),
+            "schema_version": self.db.schema_version,
+            "search_index": self.db.search_index,
+            "read_only": self.read_only,
+            "cross_references": self.db.refs_built(),
+        }
@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""Long-lived, tuned SQLite access for the glossary database."""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+from . import delta, journal, migrations, xref
+from .querycache import DEFAULT_MAX_BYTES, QueryCache
+from .search import (
+    HIGHLIGHT_ROWS,
+    TRIGRAM_LENGTH,
+    ensure_search_index,
+    has_search_index,
+    match_highlights,
+    refine_rows,
+    rows_highlights,
+    search_ids,
+    search_rows,
+)
+
+MMAP_SIZE = 256 * 1024 * 1024
+MAX_MMAP_SIZE = 2 * 1024 * 1024 * 1024 - 64 * 1024
+CACHE_SIZE_KIB = 16 * 1024
+READ_ONLY_CACHE_SIZE_KIB = 1024
+CACHED_STATEMENTS = 256
+MAX_READERS = 4
+INSTANT_ROWS = 5000
+
+ALL_TERMS_SQL = "SELECT id, term, definition, source FROM glossary"
+LOAD_COLUMNS = {
+    True: "id, term, definition, source",
+    False: "id, term, NULL, source",
+}
+# Keyset pages in term order, keyed by whether the NOCASE term index exists.
+# Without it the order is binary, which the UNIQUE index on term answers.
+# With it terms differing only in case are ordered by id, and the page
+# after (term, id) is a range seek on term followed by that tie-break.
+LOAD_FIRST_SQL = {
+    True: "SELECT {columns} FROM glossary ORDER BY term COLLATE NOCASE, id "
+    "LIMIT :limit",
+    False: "SELECT {columns} FROM glossary ORDER BY term LIMIT :limit",
+}
+LOAD_NEXT_SQL = {
+    True: "SELECT {columns} FROM glossary WHERE term >= :term COLLATE NOCASE "
+    "AND (term > :term COLLATE NOCASE OR id > :id) "
+    "ORDER BY term COLLATE NOCASE, id LIMIT :limit",
+    False: "SELECT {columns} FROM glossary WHERE term > :term "
+    "ORDER BY term LIMIT :limit",
+}
+DEFINITIONS_SQL = "SELECT id, definition FROM glossary WHERE id IN ({placeholders})"
+ROWS_SQL = (
+    "SELECT id, term, definition, source FROM glossary WHERE id IN ({placeholders})"
+)
+LOOKUP_CHUNK = 500
+TERM_NAMES_SQL = "SELECT id, term FROM glossary"
+TERM_IDS_SQL = "SELECT id FROM glossary WHERE term IN ({placeholders})"
+TERM_EXISTS_SQL = "SELECT 1 FROM glossary WHERE term = ? LIMIT 1"
+GET_TERM_ROW_SQL = "SELECT id, term, definition, source FROM glossary WHERE term = ?"
+FIND_TERM_ROW_SQL = (
+    "SELECT id, term, definition, source FROM glossary "
+    "WHERE term = ? COLLATE NOCASE ORDER BY term LIMIT 1"
+)
+GET_ID_SQL = "SELECT id, term, definition, source FROM glossary WHERE id = ?"
+COUNT_SQL = "SELECT count(*) FROM glossary"
+COUNT_UNDEFINED_SQL = (
+    "SELECT count(*) FROM glossary WHERE definition IS NULL OR definition = ''"
+)
+COUNT_SOURCES_SQL = {
+    True: "SELECT count(*) FROM glossary_source_counts",
+    False: "SELECT count(DISTINCT source) FROM glossary WHERE source IS NOT NULL "
+    "AND source != ''",
+}
+SOURCES_SQL = {
+    True: "SELECT source, terms FROM glossary_source_counts ORDER BY terms DESC, source",
+    False: "SELECT source, count(*) FROM glossary WHERE source IS NOT NULL "
+    "AND source != '' GROUP BY source ORDER BY count(*) DESC, source",
+}
+DATA_VERSION_SQL = "PRAGMA data_version"
+INSERT_TERM_SQL = "INSERT INTO glossary (term, definition, source) VALUES (?, ?, ?)"
+
+
+class GlossaryDatabase:
+    """Repository for the glossary table.
+
+    One connection is kept open for the thread that created the object and
+    is used for all writes. Worker threads borrow connections from a small
+    pool of query-only readers through reader(). Statements are plain
+    module-level SQL strings so sqlite3's per-connection statement cache
+    prepares each of them only once.
+
+    search_matches() results are kept in a QueryCache, which every write
+    made through transaction() invalidates. Deletes and edits are set-based
+    journal batches that undo() and redo() step through. Cross references
+    between terms are kept in an edge table; see xref. Triggers keep a
+    content hash and modification time for every row and log each change,
+    for computing deltas against other databases; see delta. Writable
+    databases are brought up to the current schema version when opened;
+    see migrations.
+
+    With read_only set nothing is created in the database and transaction()
+    refuses to start. The file is then opened as an immutable URI: SQLite
+    takes no locks, never looks for a journal or WAL and reads every page
+    through a memory map of the whole file, so any number of processes
+    share the operating system's page cache for it. With immutable False
+    it is opened read-only but still sees what other connections write,
+    for reading a database that may be in use.
+    """
+
+    def __init__(
+        self,
+        path,
+        max_readers=MAX_READERS,
+        cache_bytes=DEFAULT_MAX_BYTES,
+        read_only=False,
+        immutable=True,
+    ):
+        self.path = path
+        self.read_only = read_only
+        self.immutable = immutable
+        self.writable = (
+            not read_only
+            and os.access(path, os.W_OK)
+            and os.access(os.path.dirname(os.path.abspath(path)), os.W_OK)
+        )
+        self.conn = self._connect()
+        if self.writable:
+            self.conn.execute("PRAGMA journal_mode = WAL")
+            self.conn.execute("PRAGMA synchronous = NORMAL")
+            self.schema_version = migrations.migrate(self.conn)
+        else:
+            self.schema_version = migrations.schema_version(self.conn)
+        if read_only:
+            self.search_index = has_search_index(self.conn)
+        else:
+            self.search_index = ensure_search_index(self.conn)
+        self.journal = self.writable and journal.has_journal(self.conn)
+        self.refs = xref.has_refs(self.conn)
+        self.sync = delta.has_sync(self.conn)
+        self.source_counts = migrations.has_source_counts(self.conn)
+        self.term_index = migrations.has_term_index(self.conn)
+        self.readers = queue.LifoQueue()
+        self.reader_slots = threading.BoundedSemaphore(max_readers)
+        self.all_readers = []
+        self.lock = threading.Lock()
+        self.query_cache = QueryCache(cache_bytes)
+        self.data_version = self.conn.execute(DATA_VERSION_SQL).fetchone()[0]
+
+    def _connect(self):
+        if self.read_only:
+            uri = "file:" + quote(os.path.abspath(self.path)) + "?mode=ro"
+            if self.immutable:
+                uri += "&immutable=1"
+            conn = sqlite3.connect(
+                uri,
+                uri=True,
+                check_same_thread=False,
+                cached_statements=CACHED_STATEMENTS,
+            )
+            mmap_size = min(max(MMAP_SIZE, os.path.getsize(self.path)), MAX_MMAP_SIZE)
+            cache_size = READ_ONLY_CACHE_SIZE_KIB
+        else:
+            conn = sqlite3.connect(
+                self.path, check_same_thread=False, cached_statements=CACHED_STATEMENTS
+            )
+            mmap_size, cache_size = MMAP_SIZE, CACHE_SIZE_KIB
+        conn.execute(f"PRAGMA mmap_size = {mmap_size}")
+        conn.execute(f"PRAGMA cache_size = -{cache_size}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    @contextmanager
+    def reader(self):
+        """Borrow a query-only pooled connection for use on the current thread"""
+        self.reader_slots.acquire()
+        try:
+            conn = self.readers.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+            conn.execute("PRAGMA query_only = ON")
+            with self.lock:
+                self.all_readers.append(conn)
+        try:
+            yield conn
+        finally:
+            self.readers.put(conn)
+            self.reader_slots.release()
+
+    @contextmanager
+    def transaction(self):
+        """Run the enclosed statements in one write transaction.
+
+        Nested use joins the outer transaction. Any exception rolls the
+        whole transaction back and is re-raised.
+        """
+        if self.read_only:
+            raise sqlite3.OperationalError("The database is open read-only")
+        conn = self.conn
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        self.query_cache.invalidate()
+
+    def close(self):
+        with self.lock:
+            for conn in self.all_readers:
+                conn.close()
+            self.all_readers.clear()
+        if self.writable:
+            self.conn.execute("PRAGMA optimize")
+        self.conn.close()
+
+    def changed_elsewhere(self):
+        """Return True if another connection has committed since the last call.
+
+        The query cache is emptied when it has, as writes made elsewhere do
+        not go through transaction().
+        """
+        data_version = self.conn.execute(DATA_VERSION_SQL).fetchone()[0]
+        if data_version == self.data_version:
+            return False
+        self.data_version = data_version
+        self.query_cache.invalidate()
+        return True
+
+    def all_terms(self):
+        return self.conn.execute(ALL_TERMS_SQL).fetchall()
+
+    def iter_terms(self, first_batch, batch_size, conn=None, definitions=True):
+        """Yield lists of every row in term order, first_batch rows then batch_size.
+
+        Terms are ordered ignoring the case of ASCII letters when the
+        database has the NOCASE term index. Each batch is a keyset query
+        for the rows after the last one before, answered by a seek on a
+        term index, so no read transaction is held open between batches.
+        Without definitions the definition column of every row is None.
+        """
+        conn = conn or self.conn
+        columns = LOAD_COLUMNS[definitions]
+        first_sql = LOAD_FIRST_SQL[self.term_index].format(columns=columns)
+        next_sql = LOAD_NEXT_SQL[self.term_index].format(columns=columns)
+        size = first_batch
+        batch = conn.execute(first_sql, {"limit": size}).fetchall()
+        while batch:
+            yield batch
+            if len(batch) < size:
+                break
+            size = batch_size
+            last = {"term": batch[-1][1], "id": batch[-1][0], "limit": size}
+            batch = conn.execute(next_sql, last).fetchall()
+
+    def definitions(self, term_ids, conn=None):
+        """Return {id: definition} for the given ids"""
+        conn = conn or self.conn
+        term_ids = list(term_ids)
+        found = {}
+        for start in range(0, len(term_ids), LOOKUP_CHUNK):
+            chunk = term_ids[start : start + LOOKUP_CHUNK]
+            sql = DEFINITIONS_SQL.format(placeholders=",".join("?" * len(chunk)))
+            found.update(conn.execute(sql, chunk))
+        return found
+
+    def rows(self, term_ids, conn=None):
+        """Return (id, term, definition, source) for the given ids, in their order.
+
+        Ids that do not exist are left out.
+        """
+        conn = conn or self.conn
+        term_ids = list(term_ids)
+        found = {}
+        for start in range(0, len(term_ids), LOOKUP_CHUNK):
+            chunk = term_ids[start : start + LOOKUP_CHUNK]
+            sql = ROWS_SQL.format(placeholders=",".join("?" * len(chunk)))
+            found.update((row[0], row) for row in conn.execute(sql, chunk))
+        return [found[term_id] for term_id in term_ids if term_id in found]
+
+    def term_names(self, conn=None):
+        """Return (id, term) for every row"""
+        return (conn or self.conn).execute(TERM_NAMES_SQL).fetchall()
+
+    def search_ids(self, text, conn=None):
+        return search_ids(conn or self.conn, text, self.search_index)
+
+    def _cached_rows(self, text, generation, max_rows=None):
+        """Return the SearchRows for text if the query cache can answer it, or None.
+
+        A query not in the cache is answered by filtering the cached rows of
+        its longest cached prefix, unless that holds more than max_rows.
+        """
+        cache = self.query_cache
+        key = text.lower()
+        rows = cache.get(key)
+        if rows is not None:
+            cache.record("hits")
+            return rows
+        for length in range(len(key) - 1, TRIGRAM_LENGTH - 1, -1):
+            prefix_rows = cache.get(key[:length])
+            if prefix_rows is not None and prefix_rows.terms is not None:
+                if max_rows is not None and len(prefix_rows.ids) > max_rows:
+                    return None
+                cache.record("refined")
+                rows = refine_rows(prefix_rows, text)
+                cache.put(key, rows, generation)
+                return rows
+        return None
+
+    def search_rows(self, text, conn=None):
+        """Return the SearchRows for text from the query cache when possible.
+
+        Only queries the cache cannot answer, directly or from a prefix,
+        run against the database. Texts are fetched for queries long enough
+        to be refined further; shorter ones, which match too many rows to
+        be worth it, keep only their ids.
+        """
+        cache = self.query_cache
+        generation = cache.generation
+        rows = self._cached_rows(text, generation)
+        if rows is None:
+            cache.record("misses")
+            refinable = len(text) >= TRIGRAM_LENGTH
+            rows = search_rows(
+                conn or self.conn, text, self.search_index, with_text=refinable
+            )
+            cache.put(text.lower(), rows, generation)
+        return rows
+
+    def search_matches(self, text, conn=None):
+        """Return (ids, highlights of the first rows) for a search"""
+        rows = self.search_rows(text, conn)
+        if rows.terms is not None:
+            highlights = rows_highlights(rows, text)
+        else:
+            first = rows.ids[:HIGHLIGHT_ROWS].tolist()
+            highlights = match_highlights(conn or self.conn, first, text)
+        return rows.ids.tolist(), highlights
+
+    def cached_matches(self, text, max_rows=INSTANT_ROWS):
+        """Return (ids, highlights of every row) if no query is needed, or None.
+
+        This is search_matches() for a query the cache holds with its texts,
+        or can refine from the cached rows of a prefix, and that has at most
+        max_rows rows. It is cheap enough to call while the user types.
+        """
+        rows = self._cached_rows(text, self.query_cache.generation, max_rows)
+        if rows is None or rows.terms is None or len(rows.ids) > max_rows:
+            return None
+        return rows.ids.tolist(), rows_highlights(rows, text, len(rows.ids))
+
+    def match_highlights(self, term_ids, text, conn=None):
+        return match_highlights(conn or self.conn, term_ids, text)
+
+    def term_exists(self, term):
+        return self.conn.execute(TERM_EXISTS_SQL, (term,)).fetchone() is not None
+
+    def get_term_row(self, term):
+        """Return (id, term, definition, source) for term, or None"""
+        return self.conn.execute(GET_TERM_ROW_SQL, (term,)).fetchone()
+
+    def find_term_row(self, term):
+        """Return the row named term, ignoring the case of ASCII letters, or None.
+
+        An exact match is preferred; otherwise the lookup is a seek on the
+        NOCASE term index.
+        """
+        row = self.get_term_row(term)
+        if row is None:
+            row = self.conn.execute(FIND_TERM_ROW_SQL, (term,)).fetchone()
+        return row
+
+    def term_ids(self, terms):
+        """Return the ids of those of terms that exist"""
+        terms = list(terms)
+        ids = []
+        for start in range(0, len(terms), LOOKUP_CHUNK):
+            chunk = terms[start : start + LOOKUP_CHUNK]
+            sql = TERM_IDS_SQL.format(placeholders=",".join("?" * len(chunk)))
+            ids.extend(term_id for term_id, in self.conn.execute(sql, chunk))
+        return ids
+
+    def get_term_by_id(self, term_id):
+        return self.conn.execute(GET_ID_SQL, (term_id,)).fetchone()
+
+    def count_terms(self):
+        return self.conn.execute(COUNT_SQL).fetchone()[0]
+
+    def count_undefined(self):
+        return self.conn.execute(COUNT_UNDEFINED_SQL).fetchone()[0]
+
+    def count_sources(self):
+        return self.conn.execute(COUNT_SOURCES_SQL[self.source_counts]).fetchone()[0]
+
+    def sources_in_use(self):
+        """Return (source, number of terms citing it), most cited first"""
+        return self.conn.execute(SOURCES_SQL[self.source_counts]).fetchall()
+
+    def add_term(self, term, definition, source):
+        """Insert a new term and return its id"""
+        with self.transaction() as conn:
+            cursor = conn.execute(INSERT_TERM_SQL, (term, definition, source))
+        return cursor.lastrowid
+
+    def remove_terms(self, terms):
+        self.remove_ids(self.term_ids(terms))
+
+    def remove_ids(self, term_ids, description=None):
+        """Delete terms as one undoable batch and return how many were deleted"""
+        term_ids = list(term_ids)
+        if description is None:
+            description = f"Delete {len(term_ids)} terms"
+        with self.transaction() as conn:
+            return journal.delete_ids(conn, term_ids, description)
+
+    def update_values(self, column, values, description=None):
+        """Set the definition or source of each id in {id: value} as one batch"""
+        if description is None:
+            description = f"Edit the {column} of {len(values)} terms"
+        with self.transaction() as conn:
+            return journal.update_values(conn, column, values, description)
+
+    def undo(self):
+        """Revert the latest batch and return its JournalChange, or None"""
+        with self.transaction() as conn:
+            return journal.undo(conn)
+
+    def redo(self):
+        """Apply the latest undone batch again and return its JournalChange, or None"""
+        with self.transaction() as conn:
+            return journal.redo(conn)
+
+    def can_undo(self):
+        return self.journal and journal.can_undo(self.conn)
+
+    def can_redo(self):
+        return self.journal and journal.can_redo(self.conn)
+
+    def refs_built(self, conn=None):
+        """True when the cross reference table covers every definition"""
+        return self.refs and xref.refs_built(conn or self.conn)
+
+    def related(self, term_id, limit=xref.RELATED_LIMIT, conn=None):
+        """Return ([(id, term)] term_id refers to, [(id, term)] referring to it)"""
+        if not self.refs:
+            return [], []
+        return xref.related(conn or self.conn, term_id, limit)
+
+    def scan_related(self, matcher, term_id, limit=xref.RELATED_LIMIT):
+        """related() for a database whose cross references are not built"""
+        references, referenced_by = xref.scan_related(
+            self.conn, matcher, term_id, self.search_index
+        )
+        return tuple(
+            sorted(
+                ((row[0], row[1]) for row in self.rows(ids)),
+                key=lambda row: row[1].casefold(),
+            )[:limit]
+            for ids in (references, referenced_by)
+        )
+
+    def compute_refs(self, matcher, conn=None, cancelled=None):
+        return xref.compute_refs(conn or self.conn, matcher, cancelled)
+
+    def store_refs(self, edges, generation=None):
+        """Replace the cross references with edges computed by compute_refs().
+
+        With generation, a query_cache generation read before they were
+        computed, nothing is stored and False is returned if anything has
+        been written since.
+        """
+        with self.transaction() as conn:
+            if generation is not None and generation != self.query_cache.generation:
+                return False
+            xref.store_refs(conn, edges)
+        return True
+
+    def set_references(self, matcher, rows):
+        """Recompute the terms each (id, definition) in rows refers to"""
+        with self.transaction() as conn:
+            xref.set_references(conn, matcher, rows)
+
+    def add_term_refs(self, matcher, term_id, term, definition):
+        with self.transaction() as conn:
+            xref.add_term_refs(
+                conn, matcher, term_id, term, definition, self.search_index
+            )
+
+    def mark_refs_stale(self):
+        if self.refs:
+            with self.transaction() as conn:
+                xref.mark_stale(conn)
+
+    def refresh_hashes(self):
+        """Hash the rows changed since the last refresh and return how many"""
+        if not self.sync or not delta.has_pending(self.conn):
+            return 0
+        with self.transaction() as conn:
+            return delta.refresh_hashes(conn)
+
+    def apply_changes(self, changes, prefer="ours", progress=None):
+        """Apply delta Changes in one transaction and return a PatchSummary"""
+        with self.transaction() as conn:
+            return delta.apply_changes(
+                conn, changes, prefer, self.search_index, progress
+            )
+
+    def change_log(self, since=0, limit=-1):
+        """Return (seq, changed, action, term) of the changes logged after since"""
+        if not self.sync:
+            return []
+        return delta.change_log(self.conn, since, limit)
@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+"""Settings shared by modules that must not import each other.
+
+The command line only imports the server for the serve command, so the
+address the server listens on by default is kept here for both of them.
+"""
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8742
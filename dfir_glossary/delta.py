@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""Row hashes, a change log and deltas between glossary databases."""
+
+import hashlib
+import json
+import os
+import sqlite3
+from collections import namedtuple
+from itertools import islice
+from urllib.parse import quote
+from .search import build_search_index, suspend_search_index
+
+DELTA_FORMAT = "dfir-glossary-delta"
+DELTA_VERSION = 1
+CONFLICT_POLICIES = ("ours", "theirs", "newer")
+OPERATIONS = ("add", "edit", "remove")
+HASH_SIZE = 16
+HASH_CHUNK = 5000
+LOOKUP_CHUNK = 500
+PATCH_BATCH = 5000
+NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+SYNC_TABLES_SQL = (
+    """CREATE TABLE IF NOT EXISTS glossary_hashes (
+    term TEXT PRIMARY KEY,
+    hash BLOB,
+    modified TEXT NOT NULL
+) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS glossary_hashes_pending "
+    "ON glossary_hashes (term) WHERE hash IS NULL",
+    f"""CREATE TABLE IF NOT EXISTS glossary_changes (
+    seq INTEGER PRIMARY KEY,
+    changed TEXT NOT NULL DEFAULT ({NOW}),
+    action TEXT NOT NULL,
+    term TEXT NOT NULL
+)""",
+)
+# A changed row loses its hash until refresh_hashes() computes it again, so
+# the triggers need nothing but SQL and fire for every writer of the file.
+SYNC_TRIGGERS = {
+    "glossary_sync_ai": f"""CREATE TRIGGER IF NOT EXISTS glossary_sync_ai
+    AFTER INSERT ON glossary BEGIN
+        INSERT OR REPLACE INTO glossary_hashes (term, hash, modified)
+        VALUES (new.term, NULL, {NOW});
+        INSERT INTO glossary_changes (action, term) VALUES ('add', new.term);
+    END""",
+    "glossary_sync_ad": """CREATE TRIGGER IF NOT EXISTS glossary_sync_ad
+    AFTER DELETE ON glossary BEGIN
+        DELETE FROM glossary_hashes WHERE term = old.term;
+        INSERT INTO glossary_changes (action, term) VALUES ('remove', old.term);
+    END""",
+    "glossary_sync_au": f"""CREATE TRIGGER IF NOT EXISTS glossary_sync_au
+    AFTER UPDATE OF term, definition, source ON glossary
+    WHEN old.term IS NOT new.term OR old.definition IS NOT new.definition
+        OR old.source IS NOT new.source BEGIN
+        DELETE FROM glossary_hashes WHERE term = old.term;
+        INSERT OR REPLACE INTO glossary_hashes (term, hash, modified)
+        VALUES (new.term, NULL, {NOW});
+        INSERT INTO glossary_changes (action, term) VALUES ('edit', new.term);
+    END""",
+}
+HAS_SYNC_SQL = (
+    "SELECT count(*) FROM sqlite_master WHERE name IN "
+    "('glossary_hashes', 'glossary_changes', "
+    "'glossary_sync_ai', 'glossary_sync_ad', 'glossary_sync_au')"
+)
+SEED_HASHES_SQL = (
+    "INSERT OR IGNORE INTO glossary_hashes (term, hash, modified) "
+    f"SELECT term, NULL, {NOW} FROM glossary"
+)
+PENDING_SQL = (
+    "SELECT g.term, g.definition, g.source FROM glossary_hashes AS h "
+    "JOIN glossary AS g ON g.term = h.term WHERE h.hash IS NULL LIMIT ?"
+)
+HAS_PENDING_SQL = "SELECT 1 FROM glossary_hashes WHERE hash IS NULL LIMIT 1"
+SET_HASH_SQL = "UPDATE glossary_hashes SET hash = ? WHERE term = ?"
+STORED_HASHES_SQL = "SELECT term, hash, modified FROM glossary_hashes ORDER BY term"
+ROWS_IN_ORDER_SQL = "SELECT term, definition, source FROM glossary ORDER BY term"
+ROW_SQL = "SELECT term, definition, source FROM glossary WHERE term = ?"
+CURRENT_ROWS_SQL = {
+    True: "SELECT g.term, g.definition, g.source, h.modified FROM glossary AS g "
+    "LEFT JOIN glossary_hashes AS h ON h.term = g.term "
+    "WHERE g.term IN ({placeholders})",
+    False: "SELECT term, definition, source, NULL FROM glossary "
+    "WHERE term IN ({placeholders})",
+}
+UPSERT_SQL = (
+    "INSERT INTO glossary (term, definition, source) VALUES (?, ?, ?) "
+    "ON CONFLICT(term) DO UPDATE SET "
+    "definition = excluded.definition, source = excluded.source"
+)
+REMOVE_SQL = "DELETE FROM glossary WHERE term = ?"
+CHANGE_LOG_SQL = (
+    "SELECT seq, changed, action, term FROM glossary_changes "
+    "WHERE seq > ? ORDER BY seq LIMIT ?"
+)
+
+Change = namedtuple(
+    "Change", ["op", "term", "definition", "source", "base", "hash", "modified"]
+)
+Change.__doc__ = """One row of a delta.
+
+op is one of OPERATIONS. base is the hash of the row the change was made
+against, None for an add; hash is the hash of the row it leaves, None for a
+remove. modified is when that row last changed, when known.
+"""
+
+Conflict = namedtuple("Conflict", ["term", "ours", "theirs", "applied"])
+Conflict.__doc__ = """A term changed on both sides in different ways.
+
+ours and theirs say how ("added", "edited" or "removed"); applied is True
+when their change was applied anyway.
+"""
+
+
+class PatchSummary:
+    """Running totals for applying a delta"""
+
+    def __init__(self):
+        self.read = 0
+        self.added = 0
+        self.edited = 0
+        self.removed = 0
+        self.unchanged = 0
+        self.conflicts = []
+
+    def as_dict(self):
+        return {
+            "read": self.read,
+            "added": self.added,
+            "edited": self.edited,
+            "removed": self.removed,
+            "unchanged": self.unchanged,
+            "conflicts": [conflict._asdict() for conflict in self.conflicts],
+        }
+
+    def __str__(self):
+        return (
+            f"{self.read} read, {self.added} added, {self.edited} edited, "
+            f"{self.removed} removed, {self.unchanged} unchanged, "
+            f"{len(self.conflicts)} conflicts"
+        )
+
+
+def row_hash(term, definition, source):
+    """Hash the content of a row; a missing definition or source counts as empty"""
+    content = "\0".join((term, definition or "", source or ""))
+    return hashlib.blake2b(content.encode(), digest_size=HASH_SIZE).digest()
+
+
+def has_sync(conn):
+    return conn.execute(HAS_SYNC_SQL).fetchone()[0] == 2 + len(SYNC_TRIGGERS)
+
+
+def create_sync(conn):
+    """Create the hash and change log tables and their triggers.
+
+    Rows already in the glossary are given a modification time of now and
+    hashed by the next refresh_hashes(). Must be called inside a
+    transaction.
+    """
+    for statement in SYNC_TABLES_SQL:
+        conn.execute(statement)
+    for statement in SYNC_TRIGGERS.values():
+        conn.execute(statement)
+    conn.execute(SEED_HASHES_SQL)
+
+
+def has_pending(conn):
+    """True when some rows have changed since the hashes were last refreshed"""
+    return conn.execute(HAS_PENDING_SQL).fetchone() is not None
+
+
+def refresh_hashes(conn):
+    """Hash the rows changed since the last refresh and return how many.
+
+    Must be called inside a transaction.
+    """
+    count = 0
+    while True:
+        rows = conn.execute(PENDING_SQL, (HASH_CHUNK,)).fetchall()
+        if not rows:
+            return count
+        count += len(rows)
+        conn.executemany(SET_HASH_SQL, [(row_hash(*row), row[0]) for row in rows])
+
+
+def open_snapshot(path):
+    """Open another glossary database read-only, for diffing against"""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"The database cannot be found at {path}")
+    uri = "file:" + quote(os.path.abspath(path)) + "?mode=ro"
+    return sqlite3.connect(uri, uri=True)
+
+
+def iter_hashes(conn):
+    """Yield (term, hash, modified) for every row in term order.
+
+    The stored hashes are read when the database has them, so definitions
+    are only read for rows changed since they were last refreshed. Other
+    databases are hashed as they are read, with no modification times.
+    """
+    if not has_sync(conn):
+        for term, definition, source in conn.execute(ROWS_IN_ORDER_SQL):
+            yield term, row_hash(term, definition, source), None
+        return
+    for term, stored, modified in conn.execute(STORED_HASHES_SQL):
+        if stored is None:
+            stored = row_hash(*conn.execute(ROW_SQL, (term,)).fetchone())
+        yield term, stored, modified
+
+
+def diff(old, new):
+    """Yield the Changes that turn the database on conn old into new.
+
+    Both sides are read in term order and merged in one pass, so neither
+    is held in memory; only changed rows have their text read from new.
+    """
+    missing = (None, None, None)
+    old_rows, new_rows = iter_hashes(old), iter_hashes(new)
+    old_row, new_row = next(old_rows, missing), next(new_rows, missing)
+    while old_row[0] is not None or new_row[0] is not None:
+        old_term, old_hash, _ = old_row
+        new_term, new_hash, modified = new_row
+        if new_term is None or (old_term is not None and old_term < new_term):
+            yield Change("remove", old_term, None, None, old_hash, None, None)
+            old_row = next(old_rows, missing)
+            continue
+        if old_term is None or new_term < old_term:
+            op = "add"
+            old_hash = None
+        elif old_hash != new_hash:
+            op = "edit"
+        else:
+            op = None
+        if op is not None:
+            _, definition, source = new.execute(ROW_SQL, (new_term,)).fetchone()
+            yield Change(op, new_term, definition, source, old_hash, new_hash, modified)
+        if op != "add":
+            old_row = next(old_rows, missing)
+        new_row = next(new_rows, missing)
+
+
+def write_delta(changes, output):
+    """Write Changes to an open text file as JSON lines and return how many"""
+    header = {"format": DELTA_FORMAT, "version": DELTA_VERSION}
+    output.write(json.dumps(header) + "\n")
+    count = 0
+    for change in changes:
+        record = change._asdict()
+        for key in ("base", "hash"):
+            if record[key] is not None:
+                record[key] = record[key].hex()
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def read_delta(handle):
+    """Yield the Changes in a delta written by write_delta()"""
+    header = json.loads(handle.readline() or "null")
+    if not isinstance(header, dict) or header.get("format") != DELTA_FORMAT:
+        raise ValueError("The file is not a glossary delta")
+    if header.get("version") != DELTA_VERSION:
+        raise ValueError(f"Unsupported delta version {header.get('version')}")
+    for line in handle:
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if record.get("op") not in OPERATIONS or not record.get("term"):
+            raise ValueError(f"Invalid delta line: {line[:80]}")
+        yield Change(
+            record["op"],
+            record["term"],
+            record.get("definition"),
+            record.get("source"),
+            bytes.fromhex(record["base"]) if record.get("base") else None,
+            bytes.fromhex(record["hash"]) if record.get("hash") else None,
+            record.get("modified"),
+        )
+
+
+def _current_rows(conn, terms, sync):
+    """Return {term: (hash, modified)} for those of terms that exist"""
+    current = {}
+    sql = CURRENT_ROWS_SQL[sync]
+    for start in range(0, len(terms), LOOKUP_CHUNK):
+        chunk = terms[start : start + LOOKUP_CHUNK]
+        rows = conn.execute(sql.format(placeholders=",".join("?" * len(chunk))), chunk)
+        for term, definition, source, modified in rows:
+            current[term] = (row_hash(term, definition, source), modified)
+    return current
+
+
+def _state(present, base):
+    if not present:
+        return "removed"
+    return "edited" if base is not None else "added"
+
+
+def _resolve(change, ours, prefer, summary):
+    """Return True if change should be applied over the row ours"""
+    current, modified = ours or (None, None)
+    if current == change.hash:
+        summary.unchanged += 1
+        return False
+    if current == change.base:
+        return True
+    if prefer == "theirs":
+        applied = True
+    elif prefer == "newer":
+        applied = bool(change.modified and modified and change.modified > modified)
+    else:
+        applied = False
+    theirs = {"add": "added", "edit": "edited", "remove": "removed"}[change.op]
+    summary.conflicts.append(
+        Conflict(change.term, _state(ours is not None, change.base), theirs, applied)
+    )
+    return applied
+
+
+def apply_changes(conn, changes, prefer="ours", search_index=False, progress=None):
+    """Apply Changes to the database on conn and return a PatchSummary.
+
+    A change applies cleanly when the row is still as it was when the
+    change was made, or already as it leaves it. Anything else is a
+    conflict, reported in the summary and resolved by prefer: "ours" keeps
+    the row, "theirs" applies the change and "newer" applies it if it was
+    made after the row's last modification. Changes are read and applied
+    in batches, with the search index triggers suspended for large deltas.
+    Must be called inside a transaction.
+    """
+    if prefer not in CONFLICT_POLICIES:
+        raise ValueError(f"Unknown conflict policy {prefer}")
+    summary = PatchSummary()
+    sync = has_sync(conn)
+    suspended = False
+    changes = iter(changes)
+    while True:
+        batch = list(islice(changes, PATCH_BATCH))
+        if not batch:
+            break
+        if not summary.read and len(batch) == PATCH_BATCH and search_index:
+            suspend_search_index(conn)
+            suspended = True
+        summary.read += len(batch)
+        current = _current_rows(conn, [change.term for change in batch], sync)
+        upserts, removals = [], []
+        for change in batch:
+            ours = current.get(change.term)
+            if not _resolve(change, ours, prefer, summary):
+                continue
+            if change.op == "remove":
+                if ours is not None:
+                    removals.append((change.term,))
+                    summary.removed += 1
+                continue
+            upserts.append((change.term, change.definition, change.source))
+            if ours is None:
+                summary.added += 1
+            else:
+                summary.edited += 1
+        conn.executemany(UPSERT_SQL, upserts)
+        conn.executemany(REMOVE_SQL, removals)
+        if progress is not None:
+            progress(summary)
+    if suspended:
+        build_search_index(conn)
+    return summary
+
+
+def change_log(conn, since=0, limit=-1):
+    """Return (seq, changed, action, term) of the changes logged after seq since"""
+    return conn.execute(CHANGE_LOG_SQL, (since, limit)).fetchall()
@@ -4,8 +4,8 @@ import sys
 import sqlite3
 import csv
 import warnings
-import os
 import base64
+import html
 from PyQt6.QtWidgets import (
     QApplication,
     QWidget,
@@ -23,23 +23,33 @@ from PyQt6.QtWidgets import (
     QFormLayout,
     QMenu,
     QLabel,
+    QCompleter,
+    QCheckBox,
 )
 from PyQt6.QtGui import (
-    QIcon,
     QPixmap,
-    QStandardItemModel,
-    QStandardItem,
     QFocusEvent,
     QKeySequence,
+    QShortcut,
 )
-from PyQt6.QtCore import Qt, QModelIndex
-from pytablericons import TablerIcons, OutlineIcon
+from PyQt6.QtCore import Qt, QModelIndex, QStringListModel
+from .complete import CompletionIndex
+from .models import GlossaryTableModel
+from .core import Glossary, GlossaryError, default_db_path
+from .exporter import FORMATS, FORMAT_NAMES, detect_format
+from .fuzzy import DEFAULT_DISTANCE
+from .highlight import HighlightDelegate, highlight_html
+from .icons import load_icon
+from .workers import CompletionBuilder, RefsBuilder, SearchScheduler, TermLoader
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 __version__ = "1.0.0"
 __appname__ = f"DFIR Glossary v{__version__}"
 __date__ = "2025-04-27"
 __checked__ = False
+__debounce__ = 150
+__completions__ = 10
+__related__ = 12
 __source__ = "https://github.com/digitalsleuth/dfir-glossary"
 __author__ = "Corey Forman (digitalsleuth)"
 __fingerprint__ = """
@@ -258,19 +268,34 @@ class GlossaryApp(QWidget):
     def __init__(self):
         super().__init__()
         self.initUi()
-        self.db_path = os.path.join(self.current_path, "glossary.sqlite")
-        self.load_data()
-        self.app_icon = QIcon(
-            TablerIcons.load(
-                OutlineIcon.VOCABULARY, color="#1644b9", stroke_width=2
-            ).toqpixmap()
+        self.db_path = default_db_path()
+        self.open_database()
+        self.completion_index = CompletionIndex()
+        self.completion_builder = CompletionBuilder(self.glossary.db, self)
+        self.completion_builder.built.connect(self.set_completion_index)
+        self.completion_builder.error.connect(self.loading_failed)
+        self.search_bar.textEdited.connect(self.update_completions)
+        self.refs_builder = RefsBuilder(self.glossary.db, self)
+        self.refs_builder.built.connect(self.store_refs)
+        self.refs_builder.error.connect(self.loading_failed)
+        self.term_loader = TermLoader(self.glossary.db, self)
+        self.term_loader.rows.connect(self.append_terms)
+        self.term_loader.finished.connect(self.loading_finished)
+        self.term_loader.error.connect(self.loading_failed)
+        self.search_scheduler = SearchScheduler(
+            self.glossary.db, __debounce__, self, self.glossary.approximate_ids
         )
+        self.search_scheduler.results.connect(self.show_search_results)
+        self.search_scheduler.highlights.connect(self.model.add_highlights)
+        self.search_scheduler.error.connect(self.search_failed)
+        self.search_bar.textChanged.connect(self.schedule_search)
+        self.app_icon = load_icon("app")
         self.setWindowIcon(self.app_icon)
+        self.load_data()
 
     def initUi(self):
         self.setWindowTitle(__appname__)
         self.setFixedSize(800, 500)
-        self.checked_ids = set()
         screen = QApplication.primaryScreen()
         screen_geometry = screen.geometry()
         self.x = (screen_geometry.width() - self.width()) // 2
@@ -278,85 +303,93 @@ class GlossaryApp(QWidget):
         self.move(self.x, self.y)
         self.search_bar = SearchLineEdit()
         self.search_bar.setPlaceholderText("Search all terms and definitions...")
-        self.search_bar.textChanged.connect(self.search)
         self.clear_search_button = QPushButton()
         self.clear_search_button.clicked.connect(self.clear_search)
         self.clear_search_button.setToolTip("Clear Search")
-        clear_icon = QIcon(
-            TablerIcons.load(
-                OutlineIcon.COPY_X, color="#923232", size=24, stroke_width=2,
-            ).toqpixmap()
+        self.clear_search_button.setIcon(load_icon("clear"))
+        self.fuzzy_checkbox = QCheckBox("Fuzzy")
+        self.fuzzy_checkbox.setToolTip(
+            f"Also show terms within {DEFAULT_DISTANCE} typos of the search, "
+            "after the exact matches"
         )
-        self.clear_search_button.setIcon(clear_icon)
+        self.fuzzy_checkbox.toggled.connect(self.toggle_fuzzy)
         self.about_button = QPushButton()
         self.about_button.clicked.connect(self._about)
         self.about_button.setToolTip("About")
-        about_icon = QIcon(
-            TablerIcons.load(
-                OutlineIcon.QUESTION_MARK, color="#1644b9", stroke_width=2
-            ).toqpixmap()
+        self.about_button.setIcon(load_icon("about"))
+        self.completion_model = QStringListModel(self)
+        self.completer = QCompleter(self.completion_model, self)
+        self.completer.setCompletionMode(
+            QCompleter.CompletionMode.UnfilteredPopupCompletion
         )
-        self.about_button.setIcon(about_icon)
+        self.completer.setWidget(self.search_bar)
+        self.completer.activated[str].connect(self.search_bar.setText)
         search_layout = QHBoxLayout()
         search_layout.addWidget(self.search_bar)
+        search_layout.addWidget(self.fuzzy_checkbox)
         search_layout.addWidget(self.clear_search_button)
         search_layout.addWidget(self.about_button)
         self.table_view = QTableView()
         self.table_view.setSelectionBehavior(QTableView.SelectionBehavior.SelectItems)
         self.table_view.setSelectionMode(QTableView.SelectionMode.ExtendedSelection)
         self.table_view.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
-        self.contextMenu = ContextMenu(
-            self.table_view, self.checked_ids, self.edit_term
-        )
+        self.contextMenu = ContextMenu(self.table_view, self.edit_term)
         self.table_view.customContextMenuRequested.connect(
             self.contextMenu.show_context_menu
         )
         self.table_view.doubleClicked.connect(self.double_click)
         self.definition_display = QTextEdit()
         self.definition_display.setReadOnly(True)
-        self.export_button = QPushButton("Export Selected Terms")
+        self.related_label = QLabel()
+        self.related_label.setWordWrap(True)
+        self.related_label.setTextFormat(Qt.TextFormat.RichText)
+        self.related_label.linkActivated.connect(self.open_related)
+        self.related_label.setVisible(False)
+        self.export_button = QPushButton("Export Terms")
+        export_menu = QMenu(self.export_button)
+        export_menu.addAction("Selected Terms", self.export_selected)
+        export_menu.addAction("Search Results", self.export_search_results)
+        export_menu.addAction("All Terms", self.export_all)
+        self.export_button.setMenu(export_menu)
         self.table_view.verticalHeader().setVisible(False)
         self.add_button = QPushButton()
         self.add_button.clicked.connect(self.add_term)
         self.add_button.setToolTip("Add Term")
-        add_icon = TablerIcons.load(
-            OutlineIcon.LIBRARY_PLUS, color="#2ab33b", size=24, stroke_width=2
-        )
-        self.add_button.setIcon(QIcon(add_icon.toqpixmap()))
+        self.add_button.setIcon(load_icon("add"))
         self.remove_button = QPushButton()
         self.remove_button.clicked.connect(self.remove_term)
         self.remove_button.setToolTip("Remove Selected Terms")
-        remove_icon = TablerIcons.load(
-            OutlineIcon.LIBRARY_MINUS, color="#923232", size=24, stroke_width=2
-        )
-        self.remove_button.setIcon(QIcon(remove_icon.toqpixmap()))
+        self.remove_button.setIcon(load_icon("remove"))
         self.select_deselect_button = QPushButton()
         self.select_deselect_button.clicked.connect(self.select_deselect)
         self.select_deselect_button.setToolTip("Select All")
-        check_icon = TablerIcons.load(
-            OutlineIcon.SELECT_ALL, color="#1644b9", size=24, stroke_width=2
-        )
-        self.pix_check = QIcon(check_icon.toqpixmap())
-        uncheck_icon = TablerIcons.load(
-            OutlineIcon.DESELECT, color="#923232", size=24, stroke_width=2
-        )
-        self.pix_uncheck = QIcon(uncheck_icon.toqpixmap())
+        self.pix_check = load_icon("select_all")
+        self.pix_uncheck = load_icon("deselect_all")
         self.select_deselect_button.setIcon(self.pix_check)
         self.edit_button = QPushButton()
         self.edit_button.clicked.connect(self.edit_term)
         self
-        edit_icon = TablerIcons.load(
-            OutlineIcon.EDIT, color="#833d9a", size=24, stroke_width=2
-        )
-        self.edit_button.setIcon(QIcon(edit_icon.toqpixmap()))
+        self.edit_button.setIcon(load_icon("edit"))
         self.edit_button.setEnabled(False)
         self.edit_button.setToolTip("Edit")
+        self.undo_button = QPushButton()
+        self.undo_button.clicked.connect(self.undo)
+        self.undo_button.setIcon(load_icon("undo"))
+        self.undo_button.setToolTip("Undo")
+        self.redo_button = QPushButton()
+        self.redo_button.clicked.connect(self.redo)
+        self.redo_button.setIcon(load_icon("redo"))
+        self.redo_button.setToolTip("Redo")
+        QShortcut(QKeySequence.StandardKey.Undo, self, self.undo)
+        QShortcut(QKeySequence.StandardKey.Redo, self, self.redo)
         self.term_count = QLabel()
         button_layout = QHBoxLayout()
         button_layout.addWidget(self.add_button)
         button_layout.addWidget(self.remove_button)
         button_layout.addWidget(self.select_deselect_button)
         button_layout.addWidget(self.edit_button)
+        button_layout.addWidget(self.undo_button)
+        button_layout.addWidget(self.redo_button)
         button_layout.addWidget(self.term_count)
         button_layout.addStretch(1)
         button_layout.addWidget(self.export_button)
@@ -365,22 +398,19 @@ class GlossaryApp(QWidget):
         layout.addLayout(search_layout)
         layout.addWidget(self.table_view)
         layout.addWidget(self.definition_display)
+        layout.addWidget(self.related_label)
         layout.addLayout(button_layout)
 
         self.setLayout(layout)
         self.table_view.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
-        self.model = QStandardItemModel()
+        self.model = GlossaryTableModel(self, self.fetch_definitions)
         self.table_view.setModel(self.model)
-        self.model.setSortRole(Qt.ItemDataRole.DisplayRole)
+        self.table_view.setItemDelegate(HighlightDelegate(self.table_view))
 
         self.table_view.setSortingEnabled(True)
+        self.browse_sort = (0, Qt.SortOrder.AscendingOrder)
         self.table_view.clicked.connect(self.display_definition)
-        self.export_button.clicked.connect(self.export_selected)
         self.restore_placeholder()
-        if getattr(sys, "frozen", False):
-            self.current_path = os.path.dirname(sys.executable)
-        else:
-            self.current_path = os.path.dirname(os.path.abspath(__file__))
 
     def _about(self):
         self.about_window = AboutWindow(self)
@@ -422,100 +452,186 @@ class GlossaryApp(QWidget):
         self.search_bar.clear()
         self.restore_placeholder()
 
-    def load_data(self):
-        if not os.path.exists(self.db_path):
+    def open_database(self):
+        try:
+            self.glossary = Glossary(self.db_path)
+            self.editable = self.glossary.db.writable
+            self.contextMenu.editable = self.editable
+            if self.glossary.read_only:
+                self.setWindowTitle(f"{__appname__} (read-only)")
+        except GlossaryError:
             QMessageBox.critical(
                 self,
                 "Database Error",
                 f"The database cannot be found at {self.db_path}.\n\nPlease make sure it exists, and if it does not, you can download an updated copy from https://github.com/digitalsleuth/dfir-glossary",
             )
             sys.exit(1)
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, term, definition, source FROM glossary")
-            data = cursor.fetchall()
-            conn.close()
-            self.model.setHorizontalHeaderLabels(["Term", "Definition", "Source"])
         except sqlite3.Error as e:
             QMessageBox.critical(
                 self, "Database Error", f"Error connecting to database: {e}"
             )
-        for row_index, row_data in enumerate(data):
-            term_id = int(row_data[0]) if row_data[0] is not None else 0
-            term = str(row_data[1]) if row_data[1] is not None else ""
-            definition = str(row_data[2]) if row_data[2] is not None else ""
-            source = str(row_data[3]) if row_data[3] is not None else ""
-            term_item = QStandardItem(term)
-            term_item.setCheckable(True)
-            term_item.setEditable(False)
-            definition_item = QStandardItem(definition)
-            definition_item.setEditable(False)
-            source_item = QStandardItem(source)
-            source_item.setEditable(False)
-            try:
-                self.model.setItem(row_index, 0, term_item)
-                self.model.setItem(row_index, 1, definition_item)
-                self.model.setItem(row_index, 2, source_item)
-                term_item.setData(term_id, Qt.ItemDataRole.UserRole)
-            except (ValueError, TypeError) as e:
-                QMessageBox.critical(
-                    self, "Data Error", f"Error processing row {row_index}: {e}"
-                )
-                return
+            sys.exit(1)
+
+    def fetch_definitions(self, term_ids):
+        return self.glossary.db.definitions(term_ids)
+
+    def load_data(self):
+        self.model.clear()
         self.table_view.horizontalHeader().setSectionResizeMode(
             QHeaderView.ResizeMode.Stretch
         )
-        self.table_view.sortByColumn(0, Qt.SortOrder.AscendingOrder)
-        self.term_count.setText(f"{len(data)} terms loaded")
+        self.table_view.horizontalHeader().setSortIndicator(
+            0, Qt.SortOrder.AscendingOrder
+        )
+        self.add_button.setEnabled(False)
+        self.remove_button.setEnabled(False)
+        self.undo_button.setEnabled(False)
+        self.redo_button.setEnabled(False)
+        self.term_count.setText("Loading terms...")
+        self.completion_builder.cancel()
+        self.refs_builder.cancel()
+        self.term_loader.start()
+
+    def append_terms(self, rows):
+        try:
+            self.model.append_rows(rows)
+        except (ValueError, TypeError) as e:
+            self.term_loader.cancel()
+            QMessageBox.critical(self, "Data Error", f"Error processing rows: {e}")
+            return
+        self.term_count.setText(f"Loading... {len(self.model.ids)} terms")
+
+    def loading_finished(self, total):
+        self.model.finish_loading()
+        self.add_button.setEnabled(self.editable)
+        self.remove_button.setEnabled(self.editable)
+        self.update_history_buttons()
+        text = self.search_bar.text()
+        if text:
+            self.search_scheduler.schedule(text)
+        self.term_count.setText(f"{self.model.visible_count()} terms loaded")
+        self.completion_builder.start()
+        if self.editable and self.glossary.db.refs:
+            self.refs_builder.start(not self.glossary.refs_built())
+
+    def store_refs(self, edges, matcher, generation):
+        try:
+            stored = self.glossary.store_refs(edges, generation, matcher)
+        except (GlossaryError, sqlite3.Error) as exc:
+            QMessageBox.critical(
+                self,
+                "Unable to store cross references",
+                f"Unable to store the related-term links in the database:\n\n{exc}",
+            )
+            return
+        if not stored:
+            self.refs_builder.start(edges is not None)
+            return
+        current = self.table_view.currentIndex()
+        if current.isValid():
+            self.show_related(self.model.term_id(current.row()))
+
+    def set_completion_index(self, index):
+        self.completion_index = index
+
+    def update_completions(self, text):
+        terms = [
+            term for _, term in self.completion_index.complete(text, __completions__)
+        ]
+        self.completion_model.setStringList(terms)
+        if terms:
+            self.completer.complete()
+        else:
+            self.completer.popup().hide()
+
+    def loading_failed(self, message):
+        QMessageBox.critical(
+            self, "Database Error", f"Error connecting to database: {message}"
+        )
+
+    def schedule_search(self, text):
+        if text:
+            self.search_scheduler.schedule(text)
+        else:
+            self.search_scheduler.cancel()
+            self.search(text)
+
+    def toggle_fuzzy(self, checked):
+        self.search_scheduler.fuzzy_distance = DEFAULT_DISTANCE if checked else 0
+        self.schedule_search(self.search_bar.text())
 
     def search(self, text):
-        self.model.setRowCount(0)
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT id, term, definition, source FROM glossary WHERE term LIKE ? OR definition LIKE ?",
-            ("%" + text + "%", "%" + text + "%"),
+        if not text:
+            self.show_all_terms()
+        else:
+            term_ids, highlights = self.glossary.search_matches(text)
+            extra = []
+            if self.search_scheduler.fuzzy_distance:
+                extra = self.glossary.approximate_ids(
+                    text, term_ids, self.search_scheduler.fuzzy_distance
+                )
+            self.show_results(term_ids + extra, highlights, len(extra))
+
+    def show_search_results(self, text, term_ids, highlights, approximate):
+        if text != self.search_bar.text():
+            return
+        self.show_results(term_ids, highlights, approximate)
+
+    def show_results(self, term_ids, highlights, approximate=0):
+        # Results arrive ranked by relevance, so hide the column sort
+        # indicator until the search is cleared or a column is clicked.
+        header = self.table_view.horizontalHeader()
+        if header.sortIndicatorSection() >= 0:
+            self.browse_sort = (
+                header.sortIndicatorSection(),
+                header.sortIndicatorOrder(),
+            )
+            header.setSortIndicator(-1, header.sortIndicatorOrder())
+        self.model.show_ids(term_ids, highlights)
+        count = f"{self.model.visible_count()} terms loaded"
+        if approximate:
+            count += f" ({approximate} approximate)"
+        self.term_count.setText(count)
+        cache = self.glossary.query_cache_stats()
+        self.term_count.setToolTip(
+            f"Search cache: {cache['hits']} hits, {cache['refined']} refined, "
+            f"{cache['misses']} misses ({cache['hit_rate']:.0%}), "
+            f"{cache['bytes'] // 1048576} of {cache['max_bytes'] // 1048576} MiB"
         )
-        data = cursor.fetchall()
-        conn.close()
-        self.term_count.setText(f"{len(data)} terms loaded")
-        for row_index, row_data in enumerate(data):
-            term_item = QStandardItem(row_data[1])
-            term_item.setCheckable(True)
-            term_item.setEditable(False)
-            if row_data[1] in self.checked_ids:
-                term_item.setCheckState(Qt.CheckState.Checked)
-            self.model.setItem(row_index, 0, term_item)
-            definition_item = QStandardItem(row_data[2])
-            definition_item.setEditable(False)
-            self.model.setItem(row_index, 1, definition_item)
-            source_item = QStandardItem(row_data[3])
-            source_item.setEditable(False)
-            self.model.setItem(row_index, 2, source_item)
-            term_item.setData(row_data[0], Qt.ItemDataRole.UserRole)
+
+    def show_all_terms(self):
+        self.model.show_all()
+        header = self.table_view.horizontalHeader()
+        if header.sortIndicatorSection() < 0:
+            header.setSortIndicator(*self.browse_sort)
+        else:
+            self.model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+        self.term_count.setText(f"{self.model.visible_count()} terms loaded")
+
+    def search_failed(self, text, message):
+        QMessageBox.critical(
+            self, "Search Error", f"Unable to search for '{text}':\n\n{message}"
+        )
+
+    def closeEvent(self, event):
+        self.term_loader.shutdown()
+        self.completion_builder.shutdown()
+        self.refs_builder.shutdown()
+        self.search_scheduler.shutdown()
+        self.glossary.close()
+        super().closeEvent(event)
 
     def select_all(self):
         global __checked__
-        for row in range(self.model.rowCount()):
-            item = self.model.item(row, 0)
-            term = item.text()
-            if item:
-                item.setCheckState(Qt.CheckState.Checked)
-                self.checked_ids.add(term)
-                __checked__ = True
+        self.model.set_all_checked(True)
+        __checked__ = True
         self.select_deselect_button.setIcon(self.pix_uncheck)
         self.select_deselect_button.setToolTip("Deselect All")
 
     def deselect_all(self):
         global __checked__
-        for row in range(self.model.rowCount()):
-            item = self.model.item(row, 0)
-            term = item.text()
-            if item:
-                item.setCheckState(Qt.CheckState.Unchecked)
-                self.checked_ids.discard(term)
-                __checked__ = False
+        self.model.set_all_checked(False)
+        __checked__ = False
         self.select_deselect_button.setIcon(self.pix_check)
         self.select_deselect_button.setToolTip("Select All")
 
@@ -529,54 +645,95 @@ class GlossaryApp(QWidget):
         term_index = index.row()
         column = index.column()
         display_text = ""
-        term_item = self.model.item(term_index, 0)
-        term_text = term_item.text()
-        definition_item = self.model.item(term_index, 1)
-        source_item = self.model.item(term_index, 2)
+        term_text, definition_text, source_text = self.model.row_values(term_index)
+        term_spans, definition_spans = self.model.row_highlights(term_index)
+        spans = ()
         if column == 0:
-            display_text = f"{term_item.text()}\n\n{definition_item.text()}\n\n{source_item.text()}"
+            display_text = f"{term_text}\n\n{definition_text}\n\n{source_text}"
+            offset = len(term_text) + 2
+            spans = term_spans + tuple(
+                (start + offset, end + offset) for start, end in definition_spans
+            )
             self.edit_button.setEnabled(False)
         elif column == 1:
-            display_text = definition_item.text()
-            self.edit_button.setEnabled(True)
+            display_text = definition_text
+            spans = definition_spans
+            self.edit_button.setEnabled(self.editable)
         elif column == 2:
-            display_text = source_item.text()
-            self.edit_button.setEnabled(True)
-        if term_item.checkState() == Qt.CheckState.Checked:
-            self.checked_ids.add(term_text)
+            display_text = source_text
+            self.edit_button.setEnabled(self.editable)
+        if spans:
+            self.definition_display.setHtml(highlight_html(display_text, spans))
         else:
-            self.checked_ids.discard(term_text)
-        self.definition_display.setText(display_text)
+            self.definition_display.setText(display_text)
+        self.show_related(self.model.term_id(term_index))
 
-    def export_selected(self):
-        output_file = None
-        exported_terms = []
-        if self.checked_ids:
-            output_file, _ = QFileDialog.getSaveFileName(
-                self,
-                "Select output file",
-                "",
-                "CSV File (*.csv)",
+    def show_related(self, term_id):
+        """List the terms term_id refers to and is referred to by as links"""
+        if not self.glossary.refs_built():
+            self.related_label.setVisible(False)
+            return
+        lines = []
+        for heading, rows in zip(
+            ("References", "Referenced by"), self.glossary.related(term_id, None)
+        ):
+            if not rows:
+                continue
+            links = ", ".join(
+                f'<a href="term:{other_id}">{html.escape(name)}</a>'
+                for other_id, name in rows[:__related__]
             )
+            if len(rows) > __related__:
+                links += f" and {len(rows) - __related__} more"
+            lines.append(f"<b>{heading}:</b> {links}")
+        self.related_label.setText("<br>".join(lines))
+        self.related_label.setVisible(bool(lines))
+
+    def open_related(self, link):
+        """Select the term a cross reference link points at"""
+        term_id = int(link.partition(":")[2])
+        row = self.model.row_of(term_id)
+        if row < 0 and self.search_bar.text():
+            self.clear_search()
+            row = self.model.row_of(term_id)
+        if row < 0:
+            return
+        index = self.model.index(row, 0)
+        self.table_view.setCurrentIndex(index)
+        self.table_view.scrollTo(index)
+        self.display_definition(index)
+
+    def export_selected(self):
+        term_ids = self.model.checked_ids()
+        if term_ids:
+            self.export_terms(term_ids=term_ids)
+
+    def export_search_results(self):
+        if self.model.visible_count():
+            self.export_terms(term_ids=self.model.visible_ids())
+
+    def export_all(self):
+        self.export_terms()
+
+    def export_terms(self, term_ids=None, terms=None):
+        filters = [f"{FORMAT_NAMES[fmt]} (*.{fmt})" for fmt in FORMATS]
+        output_file, selected_filter = QFileDialog.getSaveFileName(
+            self,
+            "Select output file",
+            "",
+            ";;".join(filters),
+        )
         if output_file:
+            fmt = "csv"
+            if selected_filter in filters:
+                fmt = FORMATS[filters.index(selected_filter)]
+            fmt = detect_format(output_file, fmt)
             try:
-                with open(output_file, "w", newline="", encoding="utf-8") as csvfile:
-                    writer = csv.writer(csvfile)
-                    writer.writerow(["Term", "Definition", "Source"])
-                    conn = sqlite3.connect(self.db_path)
-                    cursor = conn.cursor()
-                    for term in self.checked_ids:
-                        cursor.execute(
-                            "SELECT term, definition, source FROM glossary WHERE term = ?",
-                            (term,),
-                        )
-                        result = cursor.fetchone()
-                        exported_terms.append(result)
-                    conn.close()
-                    output = sorted(exported_terms, key=lambda x: x[0].casefold())
-                    for term in output:
-                        writer.writerow(term)
-                QMessageBox.information(self, "Export", "Terms exported successfully!")
+                with open(output_file, "w", newline="", encoding="utf-8") as outfile:
+                    count = self.glossary.export(outfile, fmt, term_ids, terms)
+                QMessageBox.information(
+                    self, "Export", f"{count} terms exported successfully!"
+                )
             except sqlite3.OperationalError as exc:
                 QMessageBox.critical(
                     self,
@@ -588,7 +745,7 @@ class GlossaryApp(QWidget):
                 QMessageBox.critical(
                     self,
                     "File not found",
-                    f"Unable to open or create the selected CSV file:\n\n{exc}",
+                    f"Unable to open or create the selected file:\n\n{exc}",
                 )
             except csv.Error as exc:
                 QMessageBox.critical(
@@ -604,6 +761,8 @@ class GlossaryApp(QWidget):
             return
 
     def add_term(self):
+        if not self.editable:
+            return
         dialog = AddTermDialog(self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             term, definition, source = dialog.get_term_data()
@@ -614,11 +773,7 @@ class GlossaryApp(QWidget):
                     "The 'Term' field cannot be empty.\n\nPlease enter a value in the 'Term' field.\t",
                 )
                 return
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1 from glossary WHERE term = ? LIMIT 1", (term,))
-            exists = cursor.fetchone()
-            if exists:
+            if self.glossary.exists(term):
                 QMessageBox.critical(
                     self,
                     "Term exists",
@@ -626,60 +781,50 @@ class GlossaryApp(QWidget):
                 )
                 return
             try:
-                cursor.execute(
-                    "INSERT INTO glossary (term, definition, source) VALUES (?, ?, ?)",
-                    (term, definition, source),
-                )
-                conn.commit()
-                conn.close()
-                self.load_data()
-            except sqlite3.OperationalError as exc:
+                term_id = self.glossary.add(term, definition, source)
+                row = self.model.insert_term(term_id, term, definition, source)
+                self.completion_index.add(term_id, term)
+                self.completion_builder.add(term_id, term)
+                self.table_view.scrollTo(self.model.index(row, 0))
+                self.term_count.setText(f"{self.model.visible_count()} terms loaded")
+            except (GlossaryError, sqlite3.Error) as exc:
                 QMessageBox.critical(
                     self,
                     "Unable to add term",
-                    f"Unable to add term {term} to the database due to an SQLite3 error:\n\n{exc}",
+                    f"Unable to add term {term} to the database:\n\n{exc}",
                 )
                 return
 
     def remove_term(self):
-        if not self.checked_ids:
+        term_ids = self.model.checked_ids()
+        if not term_ids or not self.editable:
             return
         choice = QMessageBox.warning(
             self,
             "Confirm deletion",
-            f"Are you sure you want to delete {len(self.checked_ids)} terms?",
+            f"Are you sure you want to delete {len(term_ids)} terms?",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
         )
         if choice == QMessageBox.StandardButton.No:
             return
-        checked_rows = []
-        for row in range(self.model.rowCount()):
-            index = self.model.index(row, 0)
-            if (
-                self.model.data(index, Qt.ItemDataRole.CheckStateRole)
-                == Qt.CheckState.Checked
-            ):
-                checked_rows.append(row)
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            for index in reversed(sorted(self.checked_ids)):
-                cursor.execute("DELETE FROM glossary WHERE term = ?", (index,))
-            conn.commit()
-            conn.close()
-        except sqlite3.OperationalError as exc:
+            self.glossary.remove_ids(term_ids)
+        except (GlossaryError, sqlite3.Error) as exc:
             QMessageBox.critical(
                 self,
                 "Unable to remove term",
-                f"Unable to remove the selected terms due to the following SQLite 3 error:\n\n{exc}",
+                f"Unable to remove the selected terms:\n\n{exc}",
             )
             return
-        for row in checked_rows:
-            self.model.removeRow(row)
-        self.checked_ids.clear()
-        self.load_data()
+        self.model.remove_ids(term_ids)
+        self.completion_index.remove_ids(term_ids)
+        self.completion_builder.remove_ids(term_ids)
+        self.term_count.setText(f"{self.model.visible_count()} terms loaded")
+        self.update_history_buttons()
 
     def edit_term(self):
+        if not self.editable:
+            return
         selection_model = self.table_view.selectionModel()
         current_index = selection_model.currentIndex()
         self.selected_column = current_index.column()
@@ -689,44 +834,72 @@ class GlossaryApp(QWidget):
         self.cell_text = self.model.data(current_index, Qt.ItemDataRole.DisplayRole)
         columns = {1: "definition", 2: "source"}
         column = columns[self.selected_column]
-        self.term_item = self.model.item(self.selected_row, 0)
-        self.term_text = self.term_item.text()
+        self.term_text = self.model.term(self.selected_row)
         dialog = EditDialog(self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             text = dialog.get_term_data()
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT 1 from glossary WHERE term = ? LIMIT 1", (self.term_text,)
-            )
-            exists = cursor.fetchone()
-            if exists:
-                sql = f"UPDATE glossary SET {column} = '{text}' WHERE term = '{self.term_text}'"
-                try:
-                    self.model.setData(current_index, text, Qt.ItemDataRole.DisplayRole)
-                    cursor.execute(sql)
-                    conn.commit()
-                    conn.close()
-                    self.load_data()
-                except sqlite3.OperationalError as exc:
-                    self.model.setData(
-                        current_index, self.cell_text, Qt.ItemDataRole.DisplayRole
-                    )
-                    QMessageBox.critical(
-                        self,
-                        f"Unable to change {column}",
-                        f"Unable to change the {column} to '{text}':\n\n{exc}\n\nRestoring {column} to {self.cell_text}",
-                    )
-                    self.load_data()
-                    return
+            term_id = self.model.term_id(self.selected_row)
+            try:
+                self.glossary.edit_id(term_id, **{column: text})
+            except (GlossaryError, sqlite3.Error) as exc:
+                self.model.setData(
+                    current_index, self.cell_text, Qt.ItemDataRole.DisplayRole
+                )
+                self.update_history_buttons()
+                QMessageBox.critical(
+                    self,
+                    f"Unable to change {column}",
+                    f"Unable to change the {column} to '{text}':\n\n{exc}\n\nRestoring {column} to {self.cell_text}",
+                )
+                return
+            self.model.setData(current_index, text, Qt.ItemDataRole.DisplayRole)
+            self.update_history_buttons()
+            if column == "definition":
+                self.show_related(term_id)
+
+    def update_history_buttons(self):
+        self.undo_button.setEnabled(self.glossary.can_undo())
+        self.redo_button.setEnabled(self.glossary.can_redo())
+
+    def undo(self):
+        self.step_history(self.glossary.undo, "undo")
+
+    def redo(self):
+        self.step_history(self.glossary.redo, "redo")
+
+    def step_history(self, step, name):
+        """Undo or redo the latest batch and apply what it changed to the table"""
+        if self.term_loader.loading or not self.editable:
+            return
+        try:
+            change = step()
+        except (GlossaryError, sqlite3.Error) as exc:
+            QMessageBox.critical(self, f"Unable to {name}", str(exc))
+            return
+        if change is not None:
+            self.model.remove_ids(change.removed)
+            self.completion_index.remove_ids(change.removed)
+            self.completion_builder.remove_ids(change.removed)
+            self.model.restore_rows(change.restored)
+            for term_id, term, _, _ in change.restored:
+                self.completion_index.add(term_id, term)
+                self.completion_builder.add(term_id, term)
+            self.model.update_values(change.updated)
+            if self.model.filtered and self.search_bar.text():
+                self.search_scheduler.schedule(self.search_bar.text())
+            self.term_count.setText(f"{self.model.visible_count()} terms loaded")
+            current = self.table_view.currentIndex()
+            if current.isValid():
+                self.display_definition(current)
+        self.update_history_buttons()
 
 
 class ContextMenu:
 
-    def __init__(self, tbl_view, checked_ids, edit_term):
+    def __init__(self, tbl_view, edit_term):
         self.tbl_view = tbl_view
-        self.checked_ids = checked_ids
         self.edit_term = edit_term
+        self.editable = True
 
     def show_context_menu(self, pos):
         context_menu = QMenu(self.tbl_view)
@@ -749,7 +922,7 @@ class ContextMenu:
         edit_event.setShortcut(QKeySequence("Ctrl+E"))
         edit_event.setShortcutVisibleInContextMenu(True)
         edit_event.triggered.connect(self.edit_term)
-        if selected_column == 0:
+        if selected_column == 0 or not self.editable:
             edit_event.setEnabled(False)
         context_menu.exec(self.tbl_view.mapToGlobal(pos))
 
@@ -788,17 +961,9 @@ class ContextMenu:
         selection_model = self.tbl_view.selectionModel()
         selected_indexes = selection_model.selectedIndexes()
         selected_rows = {index.row() for index in selected_indexes}
-        checkbox_column = 0
         model = self.tbl_view.model()
         if model:
-            for row in selected_rows:
-                index = model.index(row, checkbox_column)
-                term = model.index(row, 0).data()
-                model.setData(index, check_state, Qt.ItemDataRole.CheckStateRole)
-                if check_state == Qt.CheckState.Checked:
-                    self.checked_ids.add(term)
-                else:
-                    self.checked_ids.discard(term)
+            model.set_rows_checked(selected_rows, check_state == Qt.CheckState.Checked)
 
 
 class AddTermDialog(QDialog):
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Set-based, streaming export of glossary terms."""
+
+import csv
+import html
+import json
+import os
+
+EXPORT_HEADER = ("Term", "Definition", "Source")
+FORMATS = ("csv", "jsonl", "md", "html")
+FORMAT_NAMES = {
+    "csv": "CSV File",
+    "jsonl": "JSON Lines File",
+    "md": "Markdown File",
+    "html": "HTML File",
+}
+FORMAT_ALIASES = {"markdown": "md", "htm": "html", "json": "jsonl", "ndjson": "jsonl"}
+STAGE_CHUNK = 5000
+
+STAGE_TABLE_SQL = "CREATE TEMP TABLE IF NOT EXISTS export_keys (key PRIMARY KEY)"
+CLEAR_STAGE_SQL = "DELETE FROM temp.export_keys"
+STAGE_SQL = "INSERT OR IGNORE INTO temp.export_keys (key) VALUES (?)"
+EXPORT_ALL_SQL = (
+    "SELECT term, definition, source FROM glossary ORDER BY term COLLATE NOCASE"
+)
+EXPORT_STAGED_SQL = (
+    "SELECT g.term, g.definition, g.source FROM glossary AS g "
+    "JOIN temp.export_keys AS k ON k.key = g.{column} "
+    "ORDER BY g.term COLLATE NOCASE"
+)
+
+
+def _stage(conn, keys):
+    with conn:
+        conn.execute(STAGE_TABLE_SQL)
+        conn.execute(CLEAR_STAGE_SQL)
+        keys = iter(keys)
+        while True:
+            chunk = [(key,) for _, key in zip(range(STAGE_CHUNK), keys)]
+            if not chunk:
+                break
+            conn.executemany(STAGE_SQL, chunk)
+
+
+def iter_export_rows(conn, term_ids=None, terms=None):
+    """Yield (term, definition, source) in term order from a single query.
+
+    With neither term_ids nor terms every term is exported; otherwise the
+    wanted keys are staged in a temp table and joined against glossary, so
+    the number of round trips does not depend on the number of terms.
+    """
+    if term_ids is None and terms is None:
+        yield from conn.execute(EXPORT_ALL_SQL)
+        return
+    if term_ids is not None:
+        column, keys = "id", term_ids
+    else:
+        column, keys = "term", terms
+    _stage(conn, keys)
+    try:
+        yield from conn.execute(EXPORT_STAGED_SQL.format(column=column))
+    finally:
+        with conn:
+            conn.execute(CLEAR_STAGE_SQL)
+
+
+def _text(value):
+    return value if value is not None else ""
+
+
+def write_csv(rows, handle):
+    writer = csv.writer(handle)
+    writer.writerow(EXPORT_HEADER)
+    count = 0
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+    return count
+
+
+def write_jsonl(rows, handle):
+    count = 0
+    for count, (term, definition, source) in enumerate(rows, 1):
+        record = {"term": term, "definition": definition, "source": source}
+        handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return count
+
+
+def _markdown(text):
+    lines = (line.rstrip() for line in _text(text).splitlines())
+    return "  \n".join(line.replace("<", "&lt;") for line in lines if line)
+
+
+def write_markdown(rows, handle):
+    handle.write("# DFIR Glossary\n")
+    count = 0
+    for count, (term, definition, source) in enumerate(rows, 1):
+        handle.write(f"\n## {_markdown(term)}\n\n")
+        if definition:
+            handle.write(f"{_markdown(definition)}\n\n")
+        if source:
+            handle.write(f"*Source:*  \n{_markdown(source)}\n")
+    return count
+
+
+def _html(text):
+    return html.escape(_text(text)).replace("\n", "<br>\n")
+
+
+def write_html(rows, handle):
+    handle.write(
+        '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+        "<title>DFIR Glossary</title>\n</head>\n<body>\n<table>\n<tr>"
+        + "".join(f"<th>{name}</th>" for name in EXPORT_HEADER)
+        + "</tr>\n"
+    )
+    count = 0
+    for count, row in enumerate(rows, 1):
+        handle.write(
+            "<tr>" + "".join(f"<td>{_html(value)}</td>" for value in row) + "</tr>\n"
+        )
+    handle.write("</table>\n</body>\n</html>\n")
+    return count
+
+
+WRITERS = {
+    "csv": write_csv,
+    "jsonl": write_jsonl,
+    "md": write_markdown,
+    "html": write_html,
+}
+
+
+def detect_format(path, default="csv"):
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    extension = FORMAT_ALIASES.get(extension, extension)
+    return extension if extension in FORMATS else default
+
+
+def export_rows(conn, handle, fmt="csv", term_ids=None, terms=None):
+    """Stream terms to an open text file in fmt and return the number written"""
+    return WRITERS[fmt](iter_export_rows(conn, term_ids, terms), handle)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""Typo-tolerant term lookup over a character trigram index of term words."""
+
+import re
+from array import array
+from collections import Counter
+from itertools import chain
+from .annotate import PARENS_RE
+
+WORD_RE = re.compile(r"\w+")
+GRAM_LENGTH = 3
+PAD = "\x00"
+DEFAULT_DISTANCE = 2
+MAX_DISTANCE = 3
+CACHE_NAME = "fuzzy"
+TERMS_SQL = "SELECT id, term FROM glossary"
+
+
+def term_words(term):
+    """Return the casefolded words of a term.
+
+    Parenthesised parts also count run together with their surroundings,
+    so "(EC)DH" contributes "ec", "dh" and "ecdh".
+    """
+    term = (term or "").casefold()
+    words = set(WORD_RE.findall(term))
+    if "(" in term:
+        words.update(WORD_RE.findall(PARENS_RE.sub(r"\1", term)))
+    return words
+
+
+def query_words(text):
+    return WORD_RE.findall(text.casefold())
+
+
+def grams(word):
+    """Return the distinct trigrams of word padded at both ends"""
+    padded = PAD * (GRAM_LENGTH - 1) + word + PAD * (GRAM_LENGTH - 1)
+    return {padded[i : i + GRAM_LENGTH] for i in range(len(padded) - GRAM_LENGTH + 1)}
+
+
+def word_distance(word, distance):
+    """The tolerance a query word of this length can be searched with.
+
+    One edit changes at most GRAM_LENGTH + 1 trigrams, so a word needs more
+    trigrams than that per edit or the filter would let every word through.
+    """
+    return max(0, min(distance, (len(word) + GRAM_LENGTH - 2) // (GRAM_LENGTH + 1)))
+
+
+def edit_distance(a, b, limit):
+    """Return the edit distance between a and b, or limit + 1 if it exceeds limit.
+
+    Insertions, deletions, substitutions and swaps of two adjacent
+    characters each count as one edit. Only a band of width 2 * limit + 1
+    around the diagonal is computed, and the work stops as soon as every
+    cell of a row is over the limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if a == b:
+        return 0
+    over = limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        current[0] = i
+        low = max(1, i - limit)
+        high = min(len(b), i + limit)
+        best = current[0] if low == 1 else over
+        for j in range(low, high + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (
+                previous2 is not None
+                and j > 1
+                and a[i - 1] == b[j - 2]
+                and a[i - 2] == b[j - 1]
+            ):
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = min(value, over)
+            best = min(best, current[j])
+        if best > limit:
+            return over
+        previous2, previous = previous, current
+    return min(previous[len(b)], over)
+
+
+class FuzzyIndex:
+    """Trigram index over the distinct words of the glossary's terms.
+
+    A query is split into words and each word is matched against the
+    vocabulary: words sharing enough trigrams with it are candidates, and
+    only those are compared with edit_distance(). A term matches when it
+    contains a close word for every query word and the edits add up to no
+    more than the requested distance. The vocabulary grows far more slowly
+    than the number of terms, so neither building nor searching compares
+    the query with every row.
+    """
+
+    def __init__(self, rows=()):
+        self.names = dict(rows)
+        word_terms = {}
+        for term_id, term in self.names.items():
+            for word in term_words(term):
+                terms = word_terms.get(word)
+                if terms is None:
+                    word_terms[word] = [term_id]
+                else:
+                    terms.append(term_id)
+        self.words = list(word_terms)
+        self.word_numbers = {word: number for number, word in enumerate(self.words)}
+        self.word_terms = [array("q", terms) for terms in word_terms.values()]
+        postings = {}
+        for number, word in enumerate(self.words):
+            for gram in grams(word):
+                posting = postings.get(gram)
+                if posting is None:
+                    postings[gram] = [number]
+                else:
+                    posting.append(number)
+        self.postings = {
+            gram: array("l", numbers) for gram, numbers in postings.items()
+        }
+
+    @classmethod
+    def for_database(cls, db_path, conn):
+        """Load the index from the index cache, building it if the terms changed"""
+        from .indexcache import content_hash, load_index, save_index
+
+        key = content_hash(conn)
+        index = load_index(db_path, CACHE_NAME, key, cls.from_state)
+        if index is None:
+            index = cls(conn.execute(TERMS_SQL))
+            save_index(db_path, CACHE_NAME, key, index)
+        return index
+
+    def to_state(self):
+        """Return the index as lists and dicts that JSON can hold"""
+        return {
+            "names": list(self.names.items()),
+            "words": self.words,
+            "word_terms": [terms.tolist() for terms in self.word_terms],
+            "postings": {
+                gram: numbers.tolist() for gram, numbers in self.postings.items()
+            },
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild an index from to_state()"""
+        index = cls.__new__(cls)
+        index.names = dict(state["names"])
+        index.words = state["words"]
+        index.word_numbers = {word: number for number, word in enumerate(index.words)}
+        index.word_terms = [array("q", terms) for terms in state["word_terms"]]
+        index.postings = {
+            gram: array("l", numbers) for gram, numbers in state["postings"].items()
+        }
+        if len(index.word_terms) != len(index.words):
+            raise ValueError("inconsistent fuzzy index cache")
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+    def _word_number(self, word):
+        number = self.word_numbers.get(word)
+        if number is None:
+            number = self.word_numbers[word] = len(self.words)
+            self.words.append(word)
+            self.word_terms.append(array("q"))
+            for gram in grams(word):
+                posting = self.postings.get(gram)
+                if posting is None:
+                    posting = self.postings[gram] = array("l")
+                posting.append(number)
+        return number
+
+    def add(self, term_id, term):
+        """Index a term, replacing any earlier name it had"""
+        self.remove(term_id)
+        self.names[term_id] = term
+        for word in term_words(term):
+            self.word_terms[self._word_number(word)].append(term_id)
+
+    def remove(self, term_id):
+        term = self.names.pop(term_id, None)
+        if term is None:
+            return
+        for word in term_words(term):
+            self.word_terms[self.word_numbers[word]].remove(term_id)
+
+    def remove_ids(self, term_ids):
+        """Remove many terms, rewriting each affected word list once"""
+        removed = {}
+        for term_id in term_ids:
+            term = self.names.pop(term_id, None)
+            if term is not None:
+                for word in term_words(term):
+                    removed.setdefault(self.word_numbers[word], set()).add(term_id)
+        for number, gone in removed.items():
+            self.word_terms[number] = array(
+                "q",
+                (term_id for term_id in self.word_terms[number] if term_id not in gone),
+            )
+
+    def similar_words(self, word, distance):
+        """Return {word number: edits} for vocabulary words close to word"""
+        found = {}
+        exact = self.word_numbers.get(word)
+        if exact is not None:
+            found[exact] = 0
+        distance = word_distance(word, distance)
+        if distance < 1:
+            return found
+        word_grams = grams(word)
+        needed = len(word_grams) - (GRAM_LENGTH + 1) * distance
+        postings = [self.postings[gram] for gram in word_grams if gram in self.postings]
+        words = self.words
+        for number, shared in Counter(chain.from_iterable(postings)).items():
+            if shared >= needed and number != exact:
+                edits = edit_distance(word, words[number], distance)
+                if edits <= distance:
+                    found[number] = edits
+        return found
+
+    def search(self, text, distance=DEFAULT_DISTANCE, limit=None):
+        """Return [(edits, term_id)] for terms within distance of text.
+
+        Results are ordered by the number of edits, then by how many words
+        the term has beyond the query, then by term.
+        """
+        distance = min(max(distance, 0), MAX_DISTANCE)
+        words = query_words(text)
+        if not words:
+            return []
+        matches = [self.similar_words(word, distance) for word in words]
+        matches.sort(key=lambda found: sum(len(self.word_terms[n]) for n in found))
+        totals = None
+        for found in matches:
+            best = {}
+            for number, edits in found.items():
+                for term_id in self.word_terms[number]:
+                    if totals is not None and term_id not in totals:
+                        continue
+                    if edits < best.get(term_id, distance + 1):
+                        best[term_id] = edits
+            if totals is None:
+                totals = best
+            else:
+                totals = {
+                    term_id: totals[term_id] + edits
+                    for term_id, edits in best.items()
+                    if totals[term_id] + edits <= distance
+                }
+            if not totals:
+                return []
+        results = []
+        for term_id, edits in totals.items():
+            term = self.names[term_id]
+            extra = len(query_words(term)) - len(words)
+            results.append((edits, extra, term.casefold(), term_id))
+        results.sort()
+        return [(edits, term_id) for edits, _, _, term_id in results[:limit]]
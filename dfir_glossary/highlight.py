@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Mark search matches in the table and the definition display."""
+
+import html
+from PyQt6.QtCore import QPointF
+from PyQt6.QtGui import QColor, QPalette, QTextCharFormat, QTextLayout, QTextOption
+from PyQt6.QtWidgets import QApplication, QStyle, QStyledItemDelegate
+from .models import HIGHLIGHT_ROLE
+
+HIGHLIGHT_COLOR = "#ffe066"
+HIGHLIGHT_TEXT_COLOR = "#000000"
+PAINT_CHARS = 1000
+LINE_SEPARATOR = "\u2028"
+
+
+def highlight_html(text, spans):
+    """Return text as HTML with each (start, end) span marked"""
+    parts = []
+    last = 0
+    for start, end in spans:
+        if start < last:
+            continue
+        parts.append(html.escape(text[last:start]))
+        parts.append(
+            f'<span style="background-color: {HIGHLIGHT_COLOR}; '
+            f'color: {HIGHLIGHT_TEXT_COLOR}">{html.escape(text[start:end])}</span>'
+        )
+        last = end
+    parts.append(html.escape(text[last:]))
+    return "".join(parts).replace("\n", "<br>")
+
+
+class HighlightDelegate(QStyledItemDelegate):
+    """Paint cells with the spans from HIGHLIGHT_ROLE marked.
+
+    The spans were found by the search worker, so painting only lays out
+    the visible text; cells without spans use the default painting.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.highlight = QTextCharFormat()
+        self.highlight.setBackground(QColor(HIGHLIGHT_COLOR))
+        self.highlight.setForeground(QColor(HIGHLIGHT_TEXT_COLOR))
+
+    def paint(self, painter, option, index):
+        spans = index.data(HIGHLIGHT_ROLE)
+        if not spans:
+            super().paint(painter, option, index)
+            return
+        self.initStyleOption(option, index)
+        text = option.text[:PAINT_CHARS].replace("\n", LINE_SEPARATOR)
+        option.text = ""
+        widget = option.widget
+        style = widget.style() if widget else QApplication.style()
+        style.drawControl(
+            QStyle.ControlElement.CE_ItemViewItem, option, painter, widget
+        )
+        rect = style.subElementRect(
+            QStyle.SubElement.SE_ItemViewItemText, option, widget
+        )
+        margin = style.pixelMetric(QStyle.PixelMetric.PM_FocusFrameHMargin) + 1
+        ranges = []
+        for start, end in spans:
+            if start >= len(text):
+                break
+            selection = QTextLayout.FormatRange()
+            selection.start = start
+            selection.length = end - start
+            selection.format = self.highlight
+            ranges.append(selection)
+        layout = QTextLayout(text, option.font)
+        layout.setFormats(ranges)
+        option_text = layout.textOption()
+        option_text.setWrapMode(QTextOption.WrapMode.WrapAtWordBoundaryOrAnywhere)
+        layout.setTextOption(option_text)
+        width = rect.width() - 2 * margin
+        height = 0.0
+        layout.beginLayout()
+        while True:
+            line = layout.createLine()
+            if not line.isValid():
+                break
+            line.setLineWidth(width)
+            if height and height + line.height() > rect.height():
+                line.setNumColumns(0)
+                break
+            line.setPosition(QPointF(0, height))
+            height += line.height()
+        layout.endLayout()
+        selected = option.state & QStyle.StateFlag.State_Selected
+        role = (
+            QPalette.ColorRole.HighlightedText if selected else QPalette.ColorRole.Text
+        )
+        painter.save()
+        painter.setClipRect(rect)
+        painter.setPen(option.palette.color(role))
+        top = rect.top() + max(0.0, (rect.height() - height) / 2)
+        layout.draw(painter, QPointF(rect.left() + margin, top))
+        painter.restore()
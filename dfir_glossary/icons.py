@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Application icons, loaded from prerendered PNG files when available.
+
+Rendering a Tabler icon is cheap, but importing pytablericons (and with it
+Pillow and pygame) is not. Icons are therefore prerendered at build time
+into the icons directory next to this module. When that directory is
+missing, an icon is rendered the first time it is asked for and saved to
+the user cache so later starts skip the import as well.
+"""
+
+import os
+import sys
+from functools import lru_cache
+from PyQt6.QtGui import QIcon
+from .indexcache import user_cache_dir
+
+ICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "icons")
+STROKE_WIDTH = 2
+ICONS = {
+    "app": ("VOCABULARY", "#1644b9", 24),
+    "about": ("QUESTION_MARK", "#1644b9", 24),
+    "clear": ("COPY_X", "#923232", 24),
+    "add": ("LIBRARY_PLUS", "#2ab33b", 24),
+    "remove": ("LIBRARY_MINUS", "#923232", 24),
+    "select_all": ("SELECT_ALL", "#1644b9", 24),
+    "deselect_all": ("DESELECT", "#923232", 24),
+    "edit": ("EDIT", "#833d9a", 24),
+    "undo": ("ARROW_BACK_UP", "#1644b9", 24),
+    "redo": ("ARROW_FORWARD_UP", "#1644b9", 24),
+}
+
+
+def icon_file(name):
+    """File name for an icon, changing whenever its shape, colour or size does"""
+    icon, color, size = ICONS[name]
+    return f"{icon}-{color.lstrip('#')}-{size}.png".lower()
+
+
+def render_icon(name):
+    """Return the icon as a PIL image, importing pytablericons only now"""
+    from pytablericons import OutlineIcon, TablerIcons
+
+    icon, color, size = ICONS[name]
+    return TablerIcons.load(
+        getattr(OutlineIcon, icon), color=color, size=size, stroke_width=STROKE_WIDTH
+    )
+
+
+def prerender_icons(directory=ICON_DIR):
+    """Render every icon to a PNG in directory, for bundling at build time"""
+    os.makedirs(directory, exist_ok=True)
+    for name in ICONS:
+        render_icon(name).save(os.path.join(directory, icon_file(name)), "PNG")
+    return directory
+
+
+@lru_cache(maxsize=None)
+def load_icon(name):
+    """Return the QIcon for name, rendering it only if no PNG exists yet"""
+    filename = icon_file(name)
+    cache_path = os.path.join(user_cache_dir(), "icons", filename)
+    for path in (os.path.join(ICON_DIR, filename), cache_path):
+        if os.path.exists(path):
+            return QIcon(path)
+    image = render_icon(name)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        image.save(cache_path, "PNG")
+        return QIcon(cache_path)
+    except OSError:
+        return QIcon(image.toqpixmap())
+
+
+if __name__ == "__main__":
+    print(prerender_icons(*sys.argv[1:2]))
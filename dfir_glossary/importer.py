@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Streaming bulk import of CSV and JSONL glossaries."""
+
+import csv
+import json
+import os
+from itertools import islice
+from .search import build_search_index, suspend_search_index
+
+CONFLICT_POLICIES = ("skip", "overwrite", "merge")
+FORMATS = ("csv", "jsonl")
+DEFAULT_BATCH_SIZE = 10000
+LOOKUP_CHUNK = 500
+FIELDS = ("term", "definition", "source")
+
+INSERT_SQL = "INSERT INTO glossary (term, definition, source) VALUES (?, ?, ?) "
+UPSERT_SQL = {
+    "skip": INSERT_SQL + "ON CONFLICT(term) DO NOTHING",
+    "overwrite": INSERT_SQL
+    + """ON CONFLICT(term) DO UPDATE SET
+        definition = excluded.definition,
+        source = excluded.source
+    WHERE glossary.definition IS NOT excluded.definition
+        OR glossary.source IS NOT excluded.source""",
+    "merge": INSERT_SQL
+    + """ON CONFLICT(term) DO UPDATE SET
+        definition = CASE
+            WHEN coalesce(glossary.definition, '') = '' THEN excluded.definition
+            ELSE glossary.definition END,
+        source = CASE
+            WHEN coalesce(excluded.source, '') = ''
+                OR instr(coalesce(glossary.source, ''), excluded.source) THEN glossary.source
+            WHEN coalesce(glossary.source, '') = '' THEN excluded.source
+            ELSE glossary.source || char(10) || excluded.source END
+    WHERE (coalesce(glossary.definition, '') = ''
+            AND coalesce(excluded.definition, '') != '')
+        OR (coalesce(excluded.source, '') != ''
+            AND instr(coalesce(glossary.source, ''), excluded.source) = 0)""",
+}
+
+
+class ImportSummary:
+    """Running totals for an import, passed to the progress callback"""
+
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.invalid = 0
+
+    def as_dict(self):
+        return {
+            "read": self.read,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "invalid": self.invalid,
+        }
+
+    def __str__(self):
+        return (
+            f"{self.read} read, {self.inserted} inserted, {self.updated} updated, "
+            f"{self.skipped} skipped, {self.invalid} invalid"
+        )
+
+
+def _normalise(term, definition, source):
+    """Return the row to insert, with an empty term if it cannot be imported"""
+    if not all(
+        value is None or isinstance(value, str) for value in (term, definition, source)
+    ):
+        return "", "", ""
+    term = (term or "").strip()
+    return term, definition or "", source or ""
+
+
+def read_csv(handle):
+    """Yield (term, definition, source) from CSV with a Term,Definition,Source header"""
+    csv.field_size_limit(2**31 - 1)
+    reader = csv.reader(handle)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [name.strip().casefold() for name in header]
+    if "term" not in columns:
+        raise ValueError("CSV input needs a 'Term' column in its header")
+    positions = [columns.index(field) if field in columns else None for field in FIELDS]
+    for record in reader:
+        yield tuple(
+            record[pos] if pos is not None and pos < len(record) else ""
+            for pos in positions
+        )
+
+
+def read_jsonl(handle):
+    """Yield (term, definition, source) from one JSON object per line.
+
+    A line that is not valid JSON, or not an object, raises ValueError with
+    its line number. Fields are passed on as they are, so rows with values
+    other than strings are counted as invalid by import_rows().
+    """
+    for number, line in enumerate(handle, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            raise ValueError(f"Line {number} is not valid JSON: {exc}") from exc
+        if not isinstance(record, dict):
+            raise ValueError(f"Line {number} is not a JSON object")
+        yield tuple(record.get(field) for field in FIELDS)
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl}
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension in ("json", "ndjson"):
+        extension = "jsonl"
+    if extension not in FORMATS:
+        raise ValueError(f"Unable to tell the format of {path}; use csv or jsonl")
+    return extension
+
+
+def _existing_terms(conn, terms):
+    existing = set()
+    terms = list(terms)
+    for start in range(0, len(terms), LOOKUP_CHUNK):
+        chunk = terms[start : start + LOOKUP_CHUNK]
+        placeholders = ",".join("?" * len(chunk))
+        existing.update(
+            row[0]
+            for row in conn.execute(
+                f"SELECT term FROM glossary WHERE term IN ({placeholders})", chunk
+            )
+        )
+    return existing
+
+
+def import_rows(db, rows, policy="skip", batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Import (term, definition, source) rows with one transaction per batch.
+
+    policy decides what happens when a term already exists: "skip" keeps
+    the existing row, "overwrite" replaces its definition and source, and
+    "merge" fills in a missing definition and appends sources that are not
+    already present. Only one batch is held in memory at a time. When the
+    input is larger than one batch the search index triggers are suspended
+    and the index is rebuilt once at the end.
+    """
+    if policy not in CONFLICT_POLICIES:
+        raise ValueError(f"Unknown conflict policy {policy}")
+    sql = UPSERT_SQL[policy]
+    summary = ImportSummary()
+    suspended = False
+    rows = iter(rows)
+    try:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            if not summary.read and len(batch) == batch_size and db.search_index:
+                with db.transaction() as conn:
+                    suspend_search_index(conn)
+                suspended = True
+            summary.read += len(batch)
+            valid = [_normalise(*row) for row in batch]
+            valid = [row for row in valid if row[0]]
+            summary.invalid += len(batch) - len(valid)
+            with db.transaction() as conn:
+                terms = {row[0] for row in valid}
+                new_terms = len(terms - _existing_terms(conn, terms))
+                changed = conn.executemany(sql, valid).rowcount
+            summary.inserted += new_terms
+            summary.updated += changed - new_terms
+            summary.skipped += len(valid) - changed
+            if progress is not None:
+                progress(summary)
+    finally:
+        if suspended:
+            with db.transaction() as conn:
+                build_search_index(conn)
+    return summary
+
+
+def import_file(
+    db, path, fmt=None, policy="skip", batch_size=DEFAULT_BATCH_SIZE, progress=None
+):
+    fmt = fmt or detect_format(path)
+    with open(path, newline="", encoding="utf-8-sig") as handle:
+        return import_rows(db, READERS[fmt](handle), policy, batch_size, progress)
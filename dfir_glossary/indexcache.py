@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""On-disk cache for indexes derived from the glossary table.
+
+Indexes are stored as JSON of their plain state, never pickled, so a cache
+file can at worst hold a wrong index, not run code in whoever opens it.
+"""
+
+import hashlib
+import json
+import os
+import stat
+import sys
+import tempfile
+
+CACHE_VERSION = 2
+HASH_SQL = "SELECT id, term FROM glossary ORDER BY id"
+
+
+def content_hash(conn, sql=HASH_SQL):
+    """Return a hex digest of the rows an index was built from"""
+    digest = hashlib.sha256()
+    for row in conn.execute(sql):
+        digest.update("\x1f".join(str(value) for value in row).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()
+
+
+def user_cache_dir():
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "dfir-glossary")
+
+
+def cache_paths(db_path, name):
+    """Return the sidecar next to the database, then the per-user fallback"""
+    db_path = os.path.abspath(db_path)
+    path_id = hashlib.sha256(db_path.encode("utf-8")).hexdigest()[:12]
+    user_file = f"{os.path.basename(db_path)}-{path_id}.{name}.cache"
+    return [f"{db_path}.{name}.cache", os.path.join(user_cache_dir(), user_file)]
+
+
+def trusted_owners(db_path):
+    """Users whose cache files are read: this user, root and the database's owner"""
+    owners = {os.getuid(), 0}
+    try:
+        owners.add(os.stat(db_path).st_uid)
+    except OSError:
+        pass
+    return owners
+
+
+def is_trusted(cache_file, owners):
+    """Refuse files others could have replaced the index in"""
+    if owners is None:
+        return True
+    status = os.fstat(cache_file.fileno())
+    if status.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        return False
+    return status.st_uid in owners
+
+
+def load_index(db_path, name, key, from_state):
+    """Return from_state(cached state) for key, or None if there is no valid cache.
+
+    from_state rebuilds the index from the plain data its to_state() method
+    returned; anything it rejects with KeyError, TypeError or ValueError
+    counts as no cache.
+    """
+    owners = trusted_owners(db_path) if hasattr(os, "getuid") else None
+    for path in cache_paths(db_path, name):
+        try:
+            with open(path, "rb") as cache_file:
+                if not is_trusted(cache_file, owners):
+                    continue
+                cached = json.load(cache_file)
+            if cached["version"] == CACHE_VERSION and cached["key"] == key:
+                return from_state(cached["index"])
+        except (OSError, KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+def save_index(db_path, name, key, index):
+    """Write index.to_state() to the first writable cache location.
+
+    Returns the path written, or None.
+    """
+    for path in cache_paths(db_path, name):
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            handle, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        except OSError:
+            continue
+        try:
+            cached = {"version": CACHE_VERSION, "key": key, "index": index.to_state()}
+            with os.fdopen(handle, "w", encoding="utf-8") as cache_file:
+                json.dump(cached, cache_file, separators=(",", ":"))
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+            return path
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    return None
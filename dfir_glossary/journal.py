@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""Set-based batch writes to the glossary with an undo/redo journal."""
+
+from collections import namedtuple
+
+MAX_BATCHES = 50
+STAGE_CHUNK = 5000
+JOURNAL_COLUMNS = ("definition", "source")
+
+JOURNAL_TABLES_SQL = (
+    """CREATE TABLE IF NOT EXISTS glossary_journal (
+    batch INTEGER PRIMARY KEY,
+    created TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    action TEXT NOT NULL,
+    description TEXT,
+    undone INTEGER NOT NULL DEFAULT 0
+)""",
+    """CREATE TABLE IF NOT EXISTS glossary_journal_rows (
+    batch INTEGER NOT NULL,
+    term_id INTEGER NOT NULL,
+    term TEXT,
+    definition TEXT,
+    source TEXT,
+    field TEXT,
+    old_value TEXT,
+    new_value TEXT
+)""",
+    "CREATE INDEX IF NOT EXISTS glossary_journal_rows_batch "
+    "ON glossary_journal_rows (batch, term_id)",
+)
+HAS_JOURNAL_SQL = (
+    "SELECT count(*) FROM sqlite_master "
+    "WHERE name IN ('glossary_journal', 'glossary_journal_rows')"
+)
+STAGE_TABLE_SQL = (
+    "CREATE TEMP TABLE IF NOT EXISTS write_stage (id INTEGER PRIMARY KEY, value)"
+)
+CLEAR_STAGE_SQL = "DELETE FROM temp.write_stage"
+STAGE_SQL = "INSERT OR REPLACE INTO temp.write_stage (id, value) VALUES (?, ?)"
+NEW_BATCH_SQL = "INSERT INTO glossary_journal (action, description) VALUES (?, ?)"
+JOURNAL_DELETE_SQL = (
+    "INSERT INTO glossary_journal_rows (batch, term_id, term, definition, source) "
+    "SELECT ?, id, term, definition, source FROM glossary "
+    "WHERE id IN (SELECT id FROM temp.write_stage)"
+)
+DELETE_STAGED_SQL = "DELETE FROM glossary WHERE id IN (SELECT id FROM temp.write_stage)"
+JOURNAL_UPDATE_SQL = (
+    "INSERT INTO glossary_journal_rows (batch, term_id, field, old_value, new_value) "
+    "SELECT ?, g.id, ?, g.{column}, s.value FROM temp.write_stage AS s "
+    "CROSS JOIN glossary AS g ON g.id = s.id"
+)
+UPDATE_STAGED_SQL = (
+    "UPDATE glossary SET {column} = "
+    "(SELECT value FROM temp.write_stage AS s WHERE s.id = glossary.id) "
+    "WHERE id IN (SELECT id FROM temp.write_stage)"
+)
+UNDO_BATCH_SQL = (
+    "SELECT batch, action, description FROM glossary_journal "
+    "WHERE undone = 0 ORDER BY batch DESC LIMIT 1"
+)
+REDO_BATCH_SQL = (
+    "SELECT batch, action, description FROM glossary_journal "
+    "WHERE undone = 1 ORDER BY batch LIMIT 1"
+)
+MARK_BATCH_SQL = "UPDATE glossary_journal SET undone = ? WHERE batch = ?"
+# Restored rows keep their old ids where those are still free. The rest,
+# whose ids were taken by terms added since, are numbered after every other
+# row once the first statement has run.
+RESTORE_SQL = (
+    "INSERT INTO glossary (id, term, definition, source) "
+    "SELECT {id}, j.term, j.definition, j.source FROM glossary_journal_rows AS j "
+    "WHERE j.batch = ? AND {taken} EXISTS (SELECT 1 FROM glossary AS g "
+    "WHERE g.id = j.term_id{other}) ORDER BY j.term_id"
+)
+RESTORE_IDS_SQL = RESTORE_SQL.format(id="j.term_id", taken="NOT", other="")
+RESTORE_NEW_IDS_SQL = RESTORE_SQL.format(
+    id="NULL", taken="", other=" AND g.term != j.term"
+)
+TAKEN_TERMS_SQL = (
+    "SELECT j.term FROM glossary_journal_rows AS j WHERE j.batch = ? AND EXISTS "
+    "(SELECT 1 FROM glossary AS g WHERE g.id = j.term_id AND g.term != j.term)"
+)
+RENUMBER_SQL = (
+    "UPDATE glossary_journal_rows SET term_id = "
+    "(SELECT g.id FROM glossary AS g WHERE g.term = glossary_journal_rows.term) "
+    "WHERE batch = ?"
+)
+BATCH_ROWS_SQL = (
+    "SELECT g.id, g.term, g.definition, g.source FROM glossary AS g "
+    "JOIN glossary_journal_rows AS j ON j.term_id = g.id WHERE j.batch = ?"
+)
+BATCH_IDS_SQL = "SELECT term_id FROM glossary_journal_rows WHERE batch = ?"
+DELETE_BATCH_SQL = (
+    "DELETE FROM glossary WHERE id IN "
+    "(SELECT term_id FROM glossary_journal_rows WHERE batch = ?)"
+)
+BATCH_VALUES_SQL = (
+    "SELECT term_id, field, {value} FROM glossary_journal_rows WHERE batch = ?"
+)
+SET_BATCH_SQL = (
+    "UPDATE glossary SET {column} = (SELECT j.{value} FROM glossary_journal_rows AS j "
+    "WHERE j.batch = :batch AND j.field = :column AND j.term_id = glossary.id) "
+    "WHERE id IN (SELECT term_id FROM glossary_journal_rows "
+    "WHERE batch = :batch AND field = :column)"
+)
+DROP_BATCHES_SQL = {
+    "redo": "SELECT batch FROM glossary_journal WHERE undone = 1",
+    "old": "SELECT batch FROM glossary_journal WHERE undone = 0 "
+    "ORDER BY batch DESC LIMIT -1 OFFSET ?",
+}
+DROP_ROWS_SQL = "DELETE FROM glossary_journal_rows WHERE batch IN ({batches})"
+DROP_JOURNAL_SQL = "DELETE FROM glossary_journal WHERE batch IN ({batches})"
+HAS_BATCH_SQL = "SELECT 1 FROM glossary_journal WHERE undone = ? LIMIT 1"
+
+JournalChange = namedtuple(
+    "JournalChange", ["description", "removed", "restored", "updated", "renumbered"]
+)
+JournalChange.__doc__ = """What undo() or redo() changed, for updating views.
+
+removed is a list of ids, restored a list of (id, term, definition,
+source) rows and updated a list of (id, column, value). renumbered lists
+the ids of restored rows that could not get their old id back.
+"""
+
+
+def create_journal(conn):
+    """Create the journal tables; must be called inside a transaction"""
+    for statement in JOURNAL_TABLES_SQL:
+        conn.execute(statement)
+
+
+def has_journal(conn):
+    return conn.execute(HAS_JOURNAL_SQL).fetchone()[0] == 2
+
+
+def _stage(conn, values):
+    conn.execute(STAGE_TABLE_SQL)
+    conn.execute(CLEAR_STAGE_SQL)
+    values = iter(values)
+    while True:
+        chunk = [pair for _, pair in zip(range(STAGE_CHUNK), values)]
+        if not chunk:
+            break
+        conn.executemany(STAGE_SQL, chunk)
+
+
+def _drop_batches(conn, which, *params):
+    batches = ",".join(
+        str(batch) for batch, in conn.execute(DROP_BATCHES_SQL[which], params)
+    )
+    if batches:
+        conn.execute(DROP_ROWS_SQL.format(batches=batches))
+        conn.execute(DROP_JOURNAL_SQL.format(batches=batches))
+
+
+def _new_batch(conn, action, description):
+    """Start a journal batch, discarding whatever could have been redone"""
+    _drop_batches(conn, "redo")
+    return conn.execute(NEW_BATCH_SQL, (action, description)).lastrowid
+
+
+def _finish_batch(conn):
+    conn.execute(CLEAR_STAGE_SQL)
+    _drop_batches(conn, "old", MAX_BATCHES)
+
+
+def delete_ids(conn, term_ids, description=None):
+    """Delete the rows with these ids as one journal batch and return how many.
+
+    The ids are staged in a temp table, so the deleted rows are copied into
+    the journal and removed with one statement each however many there are.
+    Must be called inside a transaction.
+    """
+    _stage(conn, ((term_id, None) for term_id in term_ids))
+    batch = _new_batch(conn, "delete", description)
+    conn.execute(JOURNAL_DELETE_SQL, (batch,))
+    deleted = conn.execute(DELETE_STAGED_SQL).rowcount
+    _finish_batch(conn)
+    return deleted
+
+
+def update_values(conn, column, values, description=None):
+    """Set column to the value given for each id in {id: value} as one batch.
+
+    The old and new values are journaled with a single INSERT ... SELECT
+    and applied with a single UPDATE. Must be called inside a transaction.
+    """
+    if column not in JOURNAL_COLUMNS:
+        raise ValueError(f"Unable to update the {column} column")
+    _stage(conn, values.items())
+    batch = _new_batch(conn, "update", description)
+    conn.execute(JOURNAL_UPDATE_SQL.format(column=column), (batch, column))
+    updated = conn.execute(UPDATE_STAGED_SQL.format(column=column)).rowcount
+    _finish_batch(conn)
+    return updated
+
+
+def _set_values(conn, batch, value):
+    for column in JOURNAL_COLUMNS:
+        conn.execute(
+            SET_BATCH_SQL.format(column=column, value=value),
+            {"batch": batch, "column": column},
+        )
+    return list(conn.execute(BATCH_VALUES_SQL.format(value=value), (batch,)))
+
+
+def undo(conn):
+    """Revert the latest batch that has not been undone.
+
+    Returns a JournalChange, or None when there is nothing to undo. Deleted
+    rows are restored with their old ids where those are still free; a
+    restored term that has been added again since raises
+    sqlite3.IntegrityError. Must be called inside a transaction.
+    """
+    row = conn.execute(UNDO_BATCH_SQL).fetchone()
+    if row is None:
+        return None
+    batch, action, description = row
+    removed, restored, updated, renumbered = [], [], [], []
+    if action == "delete":
+        conn.execute(RESTORE_IDS_SQL, (batch,))
+        taken = {term for term, in conn.execute(TAKEN_TERMS_SQL, (batch,))}
+        if taken:
+            conn.execute(RESTORE_NEW_IDS_SQL, (batch,))
+            conn.execute(RENUMBER_SQL, (batch,))
+        restored = conn.execute(BATCH_ROWS_SQL, (batch,)).fetchall()
+        renumbered = [row[0] for row in restored if row[1] in taken]
+    else:
+        updated = _set_values(conn, batch, "old_value")
+    conn.execute(MARK_BATCH_SQL, (1, batch))
+    return JournalChange(description, removed, restored, updated, renumbered)
+
+
+def redo(conn):
+    """Apply the earliest undone batch again; see undo()"""
+    row = conn.execute(REDO_BATCH_SQL).fetchone()
+    if row is None:
+        return None
+    batch, action, description = row
+    removed, restored, updated = [], [], []
+    if action == "delete":
+        removed = [term_id for term_id, in conn.execute(BATCH_IDS_SQL, (batch,))]
+        conn.execute(DELETE_BATCH_SQL, (batch,))
+    else:
+        updated = _set_values(conn, batch, "new_value")
+    conn.execute(MARK_BATCH_SQL, (0, batch))
+    return JournalChange(description, removed, restored, updated, [])
+
+
+def can_undo(conn):
+    return conn.execute(HAS_BATCH_SQL, (0,)).fetchone() is not None
+
+
+def can_redo(conn):
+    return conn.execute(HAS_BATCH_SQL, (1,)).fetchone() is not None
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Versioned upgrades of the glossary schema, tracked in PRAGMA user_version."""
+
+import sqlite3
+from . import delta, journal, xref
+
+# Case-insensitive lookups, and exports and listings ordered by term COLLATE
+# NOCASE, walk this index instead of scanning and sorting the table. NOCASE
+# only folds ASCII letters, which covers the terms in the shipped glossary.
+TERM_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS glossary_term_nocase ON glossary (term COLLATE NOCASE)"
+)
+# How many terms cite each distinct source, so listing and counting sources
+# does not group the whole table. glossary.source itself stays free text.
+SOURCE_COUNTS_SQL = """CREATE TABLE IF NOT EXISTS glossary_source_counts (
+    source TEXT PRIMARY KEY,
+    terms INTEGER NOT NULL
+) WITHOUT ROWID"""
+SOURCE_ADD = """INSERT INTO glossary_source_counts (source, terms)
+        SELECT new.source, 1 WHERE coalesce(new.source, '') != ''
+        ON CONFLICT(source) DO UPDATE SET terms = terms + 1;"""
+SOURCE_DROP = """UPDATE glossary_source_counts SET terms = terms - 1
+            WHERE source = old.source;
+        DELETE FROM glossary_source_counts WHERE source = old.source AND terms <= 0;"""
+# One trigger per kind of write, each only firing when a source is involved
+SOURCE_COUNTS_TRIGGERS = {
+    "glossary_source_counts_ai": f"""CREATE TRIGGER IF NOT EXISTS glossary_source_counts_ai
+    AFTER INSERT ON glossary WHEN coalesce(new.source, '') != '' BEGIN
+        {SOURCE_ADD}
+    END""",
+    "glossary_source_counts_ad": f"""CREATE TRIGGER IF NOT EXISTS glossary_source_counts_ad
+    AFTER DELETE ON glossary WHEN coalesce(old.source, '') != '' BEGIN
+        {SOURCE_DROP}
+    END""",
+    "glossary_source_counts_au": f"""CREATE TRIGGER IF NOT EXISTS glossary_source_counts_au
+    AFTER UPDATE OF source ON glossary WHEN old.source IS NOT new.source BEGIN
+        {SOURCE_DROP}
+        {SOURCE_ADD}
+    END""",
+}
+SEED_SOURCE_COUNTS_SQL = (
+    "INSERT INTO glossary_source_counts (source, terms) "
+    "SELECT source, count(*) FROM glossary WHERE coalesce(source, '') != '' "
+    "GROUP BY source"
+)
+# The table and triggers version 3 created under their first name
+OLD_SOURCES_SQL = (
+    "DROP TRIGGER IF EXISTS glossary_sources_ai",
+    "DROP TRIGGER IF EXISTS glossary_sources_ad",
+    "DROP TRIGGER IF EXISTS glossary_sources_au_old",
+    "DROP TRIGGER IF EXISTS glossary_sources_au_new",
+    "DROP TABLE IF EXISTS glossary_sources",
+)
+HAS_OLD_SOURCES_SQL = "SELECT 1 FROM sqlite_master WHERE name = 'glossary_sources'"
+HAS_SOURCE_COUNTS_SQL = (
+    "SELECT 1 FROM sqlite_master WHERE name = 'glossary_source_counts'"
+)
+HAS_TERM_INDEX_SQL = "SELECT 1 FROM sqlite_master WHERE name = 'glossary_term_nocase'"
+
+
+def _add_tables(conn):
+    """The tables and triggers added before the schema was versioned.
+
+    Databases opened by those versions may have some of them already.
+    """
+    journal.create_journal(conn)
+    xref.create_refs(conn)
+    if not delta.has_sync(conn):
+        delta.create_sync(conn)
+
+
+def _add_term_index(conn):
+    conn.execute(TERM_INDEX_SQL)
+
+
+def _add_source_counts(conn):
+    """Keep the number of terms citing each distinct source"""
+    conn.execute(SOURCE_COUNTS_SQL)
+    for statement in SOURCE_COUNTS_TRIGGERS.values():
+        conn.execute(statement)
+    conn.execute(SEED_SOURCE_COUNTS_SQL)
+
+
+def _rename_sources(conn):
+    """Replace the counts version 3 first kept as glossary_sources"""
+    if conn.execute(HAS_OLD_SOURCES_SQL).fetchone() is None:
+        return
+    for statement in OLD_SOURCES_SQL:
+        conn.execute(statement)
+    _add_source_counts(conn)
+
+
+def _analyze(conn):
+    conn.execute("ANALYZE")
+
+
+# Append only: a database at version n has had the first n of these run.
+MIGRATIONS = (
+    ("journal, cross reference and change tracking tables", _add_tables),
+    ("case-insensitive term index", _add_term_index),
+    ("source counts", _add_source_counts),
+    ("query planner statistics", _analyze),
+    ("source counts under their own name, with one update trigger", _rename_sources),
+)
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def has_source_counts(conn):
+    return conn.execute(HAS_SOURCE_COUNTS_SQL).fetchone() is not None
+
+
+def has_term_index(conn):
+    return conn.execute(HAS_TERM_INDEX_SQL).fetchone() is not None
+
+
+def migrate(conn):
+    """Run the migrations a database has not had yet and return its version.
+
+    All of them run in one transaction together with the version bump, so
+    an old database is either fully upgraded or left as it was. Databases
+    from a newer release, and ones that cannot be written, are not touched.
+    """
+    if schema_version(conn) >= LATEST_VERSION:
+        return schema_version(conn)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+    except sqlite3.OperationalError:
+        return schema_version(conn)
+    try:
+        version = schema_version(conn)
+        for _, migration in MIGRATIONS[version:]:
+            migration(conn)
+        conn.execute(f"PRAGMA user_version = {max(version, LATEST_VERSION)}")
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return schema_version(conn)
@@ -0,0 +1,651 @@
+#!/usr/bin/env python3
+"""Qt item models for the glossary table."""
+
+from array import array
+from collections import OrderedDict
+from itertools import compress
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+HEADERS = ("Term", "Definition", "Source")
+COLUMN_NAMES = ("term", "definition", "source")
+HIGHLIGHT_ROLE = Qt.ItemDataRole.UserRole + 1
+FETCH_PAGE = 1000
+DEFINITION_PAGE = 200
+RESIDENT_DEFINITIONS = 5000
+
+
+def _text(value):
+    if value.__class__ is str:
+        return value
+    return str(value) if value is not None else ""
+
+
+def collation_key(text):
+    """The key a column is sorted by: text with case folded away.
+
+    Text that is already folded is its own key, so most sources, which are
+    lower-case URLs, cost no extra memory.
+    """
+    key = text.casefold()
+    return text if key == text else key
+
+
+class _FoldedColumn:
+    """The collation keys of a column without stored keys, folded on access"""
+
+    def __init__(self, values):
+        self.values = values
+
+    def __getitem__(self, pos):
+        return collation_key(self.values[pos])
+
+
+class DefinitionColumn:
+    """The definition column of the store, fetched from the database on demand.
+
+    Behaves like the list it replaces, indexed by store position, but only
+    the RESIDENT_DEFINITIONS most recently used texts are held. A missing
+    text is read with fetch(ids), which returns {id: definition}; fetch()
+    is given whole pages through load() so scrolling costs one query per
+    page rather than one per row. Texts set by an edit are kept like any
+    other and read back from the database once evicted.
+    """
+
+    def __init__(self, ids, fetch, limit=RESIDENT_DEFINITIONS):
+        self.ids = ids
+        self.fetch = fetch
+        self.limit = limit
+        self.count = 0
+        self.texts = OrderedDict()
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, pos):
+        return pos in self.texts
+
+    def __getitem__(self, pos):
+        text = self.texts.get(pos)
+        if text is None:
+            self.load([pos])
+            text = self.texts.get(pos, "")
+        else:
+            self.texts.move_to_end(pos)
+        return text
+
+    def __setitem__(self, pos, text):
+        self._keep(pos, text)
+
+    def _keep(self, pos, text):
+        texts = self.texts
+        texts[pos] = text
+        texts.move_to_end(pos)
+        while len(texts) > self.limit:
+            texts.popitem(last=False)
+
+    def append(self, text):
+        self.extend([text])
+
+    def extend(self, texts):
+        """Grow by one position per text, keeping those already known"""
+        for pos, text in enumerate(texts, self.count):
+            if text is not None:
+                self._keep(pos, text)
+            self.count = pos + 1
+
+    def clear(self):
+        self.count = 0
+        self.texts.clear()
+
+    def load(self, positions):
+        """Fetch the texts of those positions that are not resident"""
+        wanted = {self.ids[pos]: pos for pos in positions if pos not in self.texts}
+        if not wanted:
+            return
+        found = self.fetch(list(wanted))
+        for term_id, pos in wanted.items():
+            self._keep(pos, _text(found.get(term_id)))
+
+    def values(self, positions):
+        """Return the texts of positions in one pass, without keeping them"""
+        positions = list(positions)
+        found = self.fetch([self.ids[pos] for pos in positions])
+        texts = self.texts
+        return [
+            texts[pos] if pos in texts else _text(found.get(self.ids[pos]))
+            for pos in positions
+        ]
+
+
+class GlossaryTableModel(QAbstractTableModel):
+    """Table model backed by a column store of the whole glossary.
+
+    Every glossary row is held once in parallel id/term/definition/source
+    columns with a one byte per row check-state bitset. The visible rows are
+    an index vector into that store, so a search result is just a list of
+    store positions and nothing is copied or wrapped in a Qt item. The
+    bitset is the selection: checked_ids() reads it directly, and checking
+    or unchecking every row replaces it in one operation.
+
+    Added terms are appended to the store and deleted terms are only marked
+    dead in the live bitset, so store positions stay valid until the next
+    load() or clear(). The store can also be filled in batches with
+    append_rows() while the table is already on screen.
+
+    Views see the rows a page at a time through canFetchMore() and
+    fetchMore(), so only the part of a large result scrolled to so far is
+    laid out; visible_count() is the size of the whole result. Given
+    fetch_definitions, a callable returning {id: definition}, the store
+    keeps no definitions of its own and a DefinitionColumn reads those of
+    the rows being shown.
+
+    Sorting reorders the visible rows by collation_key(). The keys of the
+    term and source columns are kept in columns of their own, computed for
+    every row not yet covered the first time the column is sorted and
+    updated by edits; definition keys are folded from the fetched texts
+    whenever that column is sorted.
+    """
+
+    def __init__(self, parent=None, fetch_definitions=None):
+        super().__init__(parent)
+        self.ids = array("q")
+        self.terms = []
+        if fetch_definitions is None:
+            self.definitions = []
+        else:
+            self.definitions = DefinitionColumn(self.ids, fetch_definitions)
+        self.sources = []
+        self.term_keys = []
+        self.source_keys = []
+        self.checked = bytearray()
+        self.live = bytearray()
+        self.positions = {}
+        self.rows = array("q")
+        self.fetched = 0
+        self.sort_column = None
+        self.sort_order = Qt.SortOrder.AscendingOrder
+        self.filtered = False
+        self.highlights = {}
+        self.columns = (self.terms, self.definitions, self.sources)
+        self.keys = (self.term_keys, None, self.source_keys)
+
+    def _reset_store(self):
+        self.ids = array("q")
+        self.terms.clear()
+        self.definitions.clear()
+        if isinstance(self.definitions, DefinitionColumn):
+            self.definitions.ids = self.ids
+        self.sources.clear()
+        self.term_keys.clear()
+        self.source_keys.clear()
+        self.checked = bytearray()
+        self.live = bytearray()
+        self.positions = {}
+        self.rows = array("q")
+        self.fetched = 0
+        self.filtered = False
+        self.highlights = {}
+
+    def _store_rows(self, data):
+        """Append rows to the store, skipping ids it already holds.
+
+        Returns the first new store position.
+        """
+        start = len(self.ids)
+        positions = self.positions
+        data = [row for row in data if row[0] not in positions]
+        if not data:
+            return start
+        ids, terms, definitions, sources = zip(*data)
+        self.ids.extend(int(term_id) if term_id is not None else 0 for term_id in ids)
+        self.terms.extend(map(_text, terms))
+        if isinstance(self.definitions, DefinitionColumn):
+            self.definitions.extend(definitions)
+        else:
+            self.definitions.extend(map(_text, definitions))
+        self.sources.extend(map(_text, sources))
+        positions.update(zip(self.ids[start:], range(start, len(self.ids))))
+        added = len(self.ids) - start
+        self.checked.extend(bytes(added))
+        self.live.extend(b"\x01" * added)
+        return start
+
+    def load(self, data):
+        """Replace the store with (id, term, definition, source) rows and show them all"""
+        self.beginResetModel()
+        self._reset_store()
+        self._store_rows(data)
+        self.rows = array("q", range(len(self.ids)))
+        self._first_page()
+        self.sort_column = None
+        self.endResetModel()
+
+    def clear(self):
+        """Empty the store before rows are streamed in with append_rows()"""
+        self.beginResetModel()
+        self._reset_store()
+        self.sort_column = 0
+        self.sort_order = Qt.SortOrder.AscendingOrder
+        self.endResetModel()
+
+    def append_rows(self, data):
+        """Add a batch of rows that arrive in term order.
+
+        Rows are added to the end of the table unless a search is being
+        shown, in which case they are only stored until show_all(). Views
+        are only told about them while the first page is filling; later
+        ones are fetched as the view scrolls to them.
+        """
+        start = self._store_rows(data)
+        end = len(self.ids)
+        if self.filtered or start == end:
+            return
+        self.rows.extend(range(start, end))
+        if self.fetched < FETCH_PAGE:
+            self._fetch_to(min(len(self.rows), FETCH_PAGE) - 1)
+
+    def _first_page(self):
+        self.fetched = min(len(self.rows), FETCH_PAGE)
+
+    def _fetch_to(self, row):
+        """Show the rows up to and including row to views"""
+        if row < self.fetched:
+            return
+        self.beginInsertRows(QModelIndex(), self.fetched, row)
+        self.fetched = row + 1
+        self.endInsertRows()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.fetched < len(self.rows)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        self._fetch_to(min(len(self.rows), self.fetched + FETCH_PAGE) - 1)
+
+    def visible_count(self):
+        """The number of rows in the table, including those not fetched yet"""
+        return len(self.rows)
+
+    def finish_loading(self):
+        """Put the rows in collation order once they have all arrived.
+
+        They arrive in the database's term order, which only ignores the
+        case of ASCII letters, so sorting by term moves few if any rows.
+        """
+        if self.sort_column is not None:
+            self.sort(self.sort_column, self.sort_order)
+
+    def show_all(self):
+        self.beginResetModel()
+        self.rows = array("q", compress(range(len(self.ids)), self.live))
+        self._first_page()
+        self.sort_column = None
+        self.filtered = False
+        self.highlights = {}
+        self.endResetModel()
+
+    def show_ids(self, term_ids, highlights=None):
+        """Show only the given term ids, in the order given.
+
+        highlights maps ids to the (term spans, definition spans) to mark,
+        available to views through HIGHLIGHT_ROLE.
+        """
+        positions = self.positions
+        self.beginResetModel()
+        self.highlights = highlights or {}
+        self.rows = array(
+            "q", (positions[term_id] for term_id in term_ids if term_id in positions)
+        )
+        self._first_page()
+        self.sort_column = None
+        self.filtered = True
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.fetched
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if (
+            role == Qt.ItemDataRole.DisplayRole
+            and orientation == Qt.Orientation.Horizontal
+        ):
+            return HEADERS[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.column() == 0:
+            flags |= Qt.ItemFlag.ItemIsUserCheckable
+        return flags
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        pos = self.rows[row]
+        column = index.column()
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            if column == 1 and pos not in self.definitions:
+                self._load_definitions(row)
+            return self.columns[column][pos]
+        if column == 0:
+            if role == Qt.ItemDataRole.CheckStateRole:
+                if self.checked[pos]:
+                    return Qt.CheckState.Checked
+                return Qt.CheckState.Unchecked
+            if role == Qt.ItemDataRole.UserRole:
+                return self.ids[pos]
+        if role == HIGHLIGHT_ROLE and column < 2:
+            spans = self.highlights.get(self.ids[pos])
+            return spans[column] if spans else None
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid():
+            return False
+        pos = self.rows[index.row()]
+        column = index.column()
+        if role == Qt.ItemDataRole.CheckStateRole and column == 0:
+            self.checked[pos] = Qt.CheckState(value) == Qt.CheckState.Checked
+        elif role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            self._set_value(pos, column, str(value) if value is not None else "")
+        else:
+            return False
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def _load_definitions(self, row):
+        """Read the definitions of a page of visible rows around row"""
+        if not isinstance(self.definitions, DefinitionColumn):
+            return
+        first = max(0, row - DEFINITION_PAGE // 4)
+        self.definitions.load(self.rows[first : first + DEFINITION_PAGE])
+
+    def removeRows(self, row, count, parent=QModelIndex()):
+        if parent.isValid() or row < 0 or count <= 0 or row + count > self.fetched:
+            return False
+        self.beginRemoveRows(parent, row, row + count - 1)
+        del self.rows[row : row + count]
+        self.fetched -= count
+        self.endRemoveRows()
+        return True
+
+    def _set_value(self, pos, column, text):
+        self.columns[column][pos] = text
+        keys = self.keys[column]
+        if keys is not None and pos < len(keys):
+            keys[pos] = collation_key(text)
+        self._drop_highlight(pos, column)
+
+    def _stored_keys(self, column):
+        """Return the key column of column brought up to date, if it has one"""
+        keys = self.keys[column]
+        if keys is not None and len(keys) < len(self.ids):
+            keys.extend(map(collation_key, self.columns[column][len(keys) :]))
+        return keys
+
+    def _sort_keys(self, rows, column):
+        """Return the collation keys of column, indexable by store position"""
+        keys = self._stored_keys(column)
+        if keys is not None:
+            return keys
+        values = self.columns[column]
+        if isinstance(values, DefinitionColumn):
+            texts = values.values(rows)
+        else:
+            texts = [values[pos] for pos in rows]
+        return dict(zip(rows, map(collation_key, texts)))
+
+    def _sorted_rows(self, rows, column, order):
+        """Return rows sorted by the collation keys of column.
+
+        The sort is stable, so rows with equal keys keep their order.
+        """
+        keys = self._sort_keys(rows, column)
+        reverse = order == Qt.SortOrder.DescendingOrder
+        return sorted(rows, key=keys.__getitem__, reverse=reverse)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        if column < 0:
+            return
+        old_rows = self.rows
+        new_rows = array("q", self._sorted_rows(old_rows, column, order))
+        self.sort_column = column
+        self.sort_order = order
+        if new_rows == old_rows:
+            return
+        self.layoutAboutToBeChanged.emit()
+        self.rows = new_rows
+        new_row_of = {pos: row for row, pos in enumerate(new_rows)}
+        old_indexes = self.persistentIndexList()
+        new_indexes = [
+            self._fetched_index(new_row_of[old_rows[index.row()]], index.column())
+            for index in old_indexes
+        ]
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def _fetched_index(self, row, column):
+        """The index of row, or an invalid one if views have not fetched it"""
+        if row < self.fetched:
+            return self.index(row, column)
+        return QModelIndex()
+
+    def term_id(self, row):
+        return self.ids[self.rows[row]]
+
+    def row_of(self, term_id):
+        """Return the visible row showing term_id, fetching up to it, or -1"""
+        pos = self.positions.get(term_id)
+        if pos is None or not self.live[pos]:
+            return -1
+        try:
+            row = self.rows.index(pos)
+        except ValueError:
+            return -1
+        self._fetch_to(row)
+        return row
+
+    def visible_ids(self):
+        return [self.ids[pos] for pos in self.rows]
+
+    def term(self, row):
+        return self.terms[self.rows[row]]
+
+    def row_values(self, row):
+        """Return the (term, definition, source) text of a visible row"""
+        pos = self.rows[row]
+        return self.terms[pos], self.definitions[pos], self.sources[pos]
+
+    def add_highlights(self, highlights):
+        """Merge spans found after show_ids() and repaint the visible rows"""
+        self.highlights.update(highlights)
+        if self.fetched:
+            self.dataChanged.emit(
+                self.index(0, 0),
+                self.index(self.fetched - 1, 1),
+                [HIGHLIGHT_ROLE],
+            )
+
+    def row_highlights(self, row):
+        """Return the (term spans, definition spans) of a visible row"""
+        return self.highlights.get(self.ids[self.rows[row]], ((), ()))
+
+    def _drop_highlight(self, pos, column):
+        spans = self.highlights.get(self.ids[pos])
+        if spans and column < 2:
+            spans = list(spans)
+            spans[column] = ()
+            self.highlights[self.ids[pos]] = tuple(spans)
+
+    def is_checked(self, row):
+        return bool(self.checked[self.rows[row]])
+
+    def checked_ids(self):
+        """Return the ids of every checked term, visible or not"""
+        return list(compress(self.ids, self.checked))
+
+    def checked_count(self):
+        return self.checked.count(1)
+
+    def _checks_changed(self, first, last):
+        last = min(last, self.fetched - 1)
+        if first > last:
+            return
+        self.dataChanged.emit(
+            self.index(first, 0),
+            self.index(last, 0),
+            [Qt.ItemDataRole.CheckStateRole],
+        )
+
+    def set_all_checked(self, checked):
+        """Set the check state of every visible row with a single dataChanged.
+
+        With every row visible the bitset is replaced wholesale (dead rows
+        stay unchecked); a search result only touches its own rows.
+        """
+        if not self.filtered:
+            self.checked = bytearray(self.live) if checked else bytearray(len(self.ids))
+        else:
+            value = 1 if checked else 0
+            checked_bytes = self.checked
+            for pos in self.rows:
+                checked_bytes[pos] = value
+        if self.rows:
+            self._checks_changed(0, len(self.rows) - 1)
+
+    def set_rows_checked(self, rows, checked):
+        """Set the check state of the given visible rows with a single dataChanged"""
+        rows = [row for row in rows if 0 <= row < self.fetched]
+        if not rows:
+            return
+        value = 1 if checked else 0
+        for row in rows:
+            self.checked[self.rows[row]] = value
+        self._checks_changed(min(rows), max(rows))
+
+    def _insert_row(self, pos):
+        """Return the visible row a new store position belongs at"""
+        if self.sort_column is None:
+            return len(self.rows)
+        keys = self._stored_keys(self.sort_column)
+        if keys is None:
+            keys = _FoldedColumn(self.columns[self.sort_column])
+        key = keys[pos]
+        descending = self.sort_order == Qt.SortOrder.DescendingOrder
+        low, high = 0, len(self.rows)
+        while low < high:
+            mid = (low + high) // 2
+            other = keys[self.rows[mid]]
+            if (other > key) if descending else (other < key):
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def insert_term(self, term_id, term, definition, source):
+        """Append a new term to the store and show it in sorted position"""
+        pos = len(self.ids)
+        self.ids.append(term_id)
+        self.terms.append(term or "")
+        self.definitions.append(definition or "")
+        self.sources.append(source or "")
+        self.checked.append(0)
+        self.live.append(1)
+        self.positions[term_id] = pos
+        row = self._insert_row(pos)
+        if row > self.fetched:
+            self.rows.insert(row, pos)
+            self._fetch_to(row)
+            return row
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.rows.insert(row, pos)
+        self.fetched += 1
+        self.endInsertRows()
+        return row
+
+    def update_term(self, term_id, column, value):
+        """Change one column of a term, signalling only the row that shows it"""
+        pos = self.positions.get(term_id)
+        if pos is None:
+            return
+        self._set_value(pos, column, value or "")
+        try:
+            row = self.rows.index(pos)
+        except ValueError:
+            return
+        if row >= self.fetched:
+            return
+        index = self.index(row, column)
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole])
+
+    def restore_rows(self, data):
+        """Store (id, term, definition, source) rows brought back by an undo.
+
+        Unless a search is being shown they are shown in sorted position
+        with a single reset, however many there are.
+        """
+        start = self._store_rows(data)
+        end = len(self.ids)
+        if self.filtered or start == end:
+            return
+        self.beginResetModel()
+        self.rows.extend(range(start, end))
+        if self.sort_column is not None:
+            self.rows = array(
+                "q", self._sorted_rows(self.rows, self.sort_column, self.sort_order)
+            )
+        self._first_page()
+        self.endResetModel()
+
+    def update_values(self, changes):
+        """Apply (id, column name, value) changes with a single dataChanged"""
+        changed = False
+        for term_id, name, value in changes:
+            pos = self.positions.get(term_id)
+            if pos is None:
+                continue
+            self._set_value(pos, COLUMN_NAMES.index(name), _text(value))
+            changed = True
+        if changed and self.fetched:
+            self.dataChanged.emit(
+                self.index(0, 1),
+                self.index(self.fetched - 1, 2),
+                [Qt.ItemDataRole.DisplayRole],
+            )
+
+    def remove_ids(self, term_ids):
+        """Drop terms from the store and remove their visible rows"""
+        removed = set()
+        for term_id in term_ids:
+            pos = self.positions.pop(term_id, None)
+            if pos is not None:
+                self.live[pos] = 0
+                self.checked[pos] = 0
+                removed.add(pos)
+        if not removed:
+            return
+        rows = self.rows
+        if len(rows) > self.fetched:
+            unfetched = [pos for pos in rows[self.fetched :] if pos not in removed]
+            del rows[self.fetched :]
+            rows.extend(unfetched)
+        visible = [row for row in range(self.fetched) if rows[row] in removed]
+        while visible:
+            last = first = visible.pop()
+            while visible and visible[-1] == first - 1:
+                first = visible.pop()
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.rows[first : last + 1]
+            self.fetched -= last - first + 1
+            self.endRemoveRows()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Memory-bounded LRU cache of search results."""
+
+import sys
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def result_size(result):
+    """Approximate bytes held by a result: its containers and the strings in them"""
+    size = sys.getsizeof(result)
+    for part in result:
+        if part is None:
+            continue
+        size += sys.getsizeof(part)
+        if isinstance(part, list):
+            size += sum(map(sys.getsizeof, part))
+    return size
+
+
+class QueryCache:
+    """Map query keys to results, evicting the least recently used first.
+
+    The budget is in bytes as measured by result_size(), not in entries, so
+    a handful of broad queries cannot pin hundreds of megabytes. A result
+    larger than the whole budget is not stored. invalidate() empties the
+    cache and starts a new generation; put() ignores results computed in an
+    earlier generation, so a search that raced with a write cannot store
+    stale rows. All methods are thread-safe.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.generation = 0
+        self.hits = 0
+        self.refined = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Return the result for key and mark it recently used, or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, result, generation):
+        """Store result unless it is too big or generation is no longer current"""
+        size = result_size(result)
+        with self.lock:
+            if generation != self.generation or size > self.max_bytes:
+                return False
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self.entries[key] = (result, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+            return True
+
+    def record(self, outcome):
+        """Count a lookup as one of "hits", "refined" (from a prefix) or "misses" """
+        with self.lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def invalidate(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.refined + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "refined": self.refined,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.refined) / lookups if lookups else 0.0,
+                "generation": self.generation,
+            }
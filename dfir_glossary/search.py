@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""FTS5 search index for the glossary table."""
+
+import re
+import sqlite3
+from array import array
+from collections import namedtuple
+
+FTS_TABLE = "glossary_fts"
+FTS_TOKENIZER = "trigram"
+TRIGRAM_LENGTH = 3
+TERM_WEIGHT = 10.0
+DEFINITION_WEIGHT = 1.0
+
+FTS_TABLE_SQL = f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    term, definition, content='glossary', content_rowid='id',
+    tokenize='{FTS_TOKENIZER}'
+)"""
+FTS_TRIGGERS = {
+    "glossary_fts_ai": f"""CREATE TRIGGER IF NOT EXISTS glossary_fts_ai
+    AFTER INSERT ON glossary BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, term, definition)
+        VALUES (new.id, new.term, new.definition);
+    END""",
+    "glossary_fts_ad": f"""CREATE TRIGGER IF NOT EXISTS glossary_fts_ad
+    AFTER DELETE ON glossary BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, term, definition)
+        VALUES ('delete', old.id, old.term, old.definition);
+    END""",
+    "glossary_fts_au": f"""CREATE TRIGGER IF NOT EXISTS glossary_fts_au
+    AFTER UPDATE ON glossary BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, term, definition)
+        VALUES ('delete', old.id, old.term, old.definition);
+        INSERT INTO {FTS_TABLE}(rowid, term, definition)
+        VALUES (new.id, new.term, new.definition);
+    END""",
+}
+FTS_REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+MAX_SPANS = 20
+HIGHLIGHT_ROWS = 200
+HIGHLIGHT_CHUNK = 500
+
+TERM_COLUMNS = "glossary.id, glossary.term, glossary.definition, glossary.source"
+ID_COLUMN = "glossary.id"
+TEXT_COLUMNS = "glossary.id, glossary.term, glossary.definition"
+HIGHLIGHT_SQL = "SELECT id, term, definition FROM glossary WHERE id IN ({placeholders})"
+ALL_TERMS_SQL = "SELECT {columns} FROM glossary"
+# Exact term (or exactly one side of "Expansion - ACRONYM"), term prefix,
+# term substring, then definition-only hits. LIKE is case-insensitive, and
+# the definition-only test comes first as it decides most rows.
+TIER_SQL = """CASE
+        WHEN glossary.term NOT LIKE :contains ESCAPE '\\' THEN 3
+        WHEN glossary.term LIKE :exact ESCAPE '\\'
+            OR glossary.term LIKE :expansion ESCAPE '\\'
+            OR glossary.term LIKE :acronym ESCAPE '\\' THEN 0
+        WHEN glossary.term LIKE :prefix ESCAPE '\\' THEN 1
+        ELSE 2 END"""
+EXPANSION_SEPARATOR = " - "
+
+# ids holds every ranked id; terms and definitions are the matching texts,
+# or None when only the ids were fetched.
+SearchRows = namedtuple("SearchRows", ["ids", "terms", "definitions"])
+
+LIKE_SQL = (
+    "SELECT {columns} FROM glossary "
+    "WHERE term LIKE :contains ESCAPE '\\' OR definition LIKE :contains ESCAPE '\\' "
+    f"ORDER BY {TIER_SQL}, glossary.term COLLATE NOCASE"
+)
+MATCH_SQL = (
+    "SELECT {columns} "
+    f"FROM {FTS_TABLE} JOIN glossary ON glossary.id = {FTS_TABLE}.rowid "
+    f"WHERE {FTS_TABLE} MATCH :match "
+    f"ORDER BY {TIER_SQL}, bm25({FTS_TABLE}, {TERM_WEIGHT}, {DEFINITION_WEIGHT}), "
+    "glossary.term COLLATE NOCASE"
+)
+
+
+def has_search_index(conn):
+    """Return True when the FTS table and all of its sync triggers exist"""
+    names = {
+        row[0]
+        for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE name = ? OR name LIKE 'glossary_fts_a_'",
+            (FTS_TABLE,),
+        )
+    }
+    return FTS_TABLE in names and names.issuperset(FTS_TRIGGERS)
+
+
+def build_search_index(conn):
+    """Create the FTS table and triggers if needed and fill the index from glossary"""
+    conn.execute(FTS_TABLE_SQL)
+    for statement in FTS_TRIGGERS.values():
+        conn.execute(statement)
+    conn.execute(FTS_REBUILD_SQL)
+
+
+def suspend_search_index(conn):
+    """Drop the sync triggers ahead of a bulk write.
+
+    The index is stale until build_search_index() is run again, which is
+    much faster for large batches than maintaining it row by row.
+    ensure_search_index() repairs an index left suspended by a crash.
+    """
+    for name in FTS_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def ensure_search_index(conn):
+    """Build the FTS5 shadow index and its sync triggers if they are missing.
+
+    Returns True when the index is available for searching. Databases that
+    are read-only, or SQLite builds without the trigram tokenizer, return
+    False and searches fall back to the LIKE scan.
+    """
+    try:
+        if has_search_index(conn):
+            return True
+        with conn:
+            build_search_index(conn)
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def match_expression(text):
+    """Quote text as a single FTS5 phrase so it matches as a plain substring"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def escape_like(text):
+    """Escape LIKE wildcards so text only matches itself"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _search(conn, columns, text, use_index):
+    if not text:
+        return conn.execute(ALL_TERMS_SQL.format(columns=columns))
+    exact = escape_like(text)
+    params = {
+        "exact": exact,
+        "expansion": f"{exact} - %",
+        "acronym": f"% - {exact}",
+        "prefix": f"{exact}%",
+        "contains": f"%{exact}%",
+    }
+    if use_index and len(text) >= TRIGRAM_LENGTH:
+        params["match"] = match_expression(text)
+        return conn.execute(MATCH_SQL.format(columns=columns), params)
+    return conn.execute(LIKE_SQL.format(columns=columns), params)
+
+
+def search_terms(conn, text, use_index=True):
+    """Return (id, term, definition, source) rows containing text.
+
+    Matching is a case-insensitive substring match on the term or the
+    definition, the same as the original LIKE query. Results are ranked in
+    tiers: an exact term match first, then terms starting with text, then
+    terms containing it, then terms whose definition alone matches. Indexed
+    results are ordered by bm25 within each tier, with term hits weighted
+    above definition hits.
+    """
+    return _search(conn, TERM_COLUMNS, text, use_index).fetchall()
+
+
+def search_ids(conn, text, use_index=True):
+    """Return the ids of the rows search_terms would return, in the same order"""
+    return [row[0] for row in _search(conn, ID_COLUMN, text, use_index)]
+
+
+def match_spans(text, needle, limit=MAX_SPANS):
+    """Return up to limit (start, end) offsets of needle in text, ignoring case.
+
+    needle must already be lower case.
+    """
+    if not text or not needle:
+        return ()
+    folded = text.lower()
+    if len(folded) != len(text):
+        pattern = re.compile(re.escape(needle), re.IGNORECASE)
+        return tuple(
+            match.span() for _, match in zip(range(limit), pattern.finditer(text))
+        )
+    spans = []
+    size = len(needle)
+    start = folded.find(needle)
+    while start >= 0 and len(spans) < limit:
+        spans.append((start, start + size))
+        start = folded.find(needle, start + size)
+    return tuple(spans)
+
+
+def match_highlights(conn, term_ids, text):
+    """Return {id: (term spans, definition spans)} for the given ids"""
+    needle = text.lower()
+    highlights = {}
+    for start in range(0, len(term_ids), HIGHLIGHT_CHUNK):
+        chunk = term_ids[start : start + HIGHLIGHT_CHUNK]
+        sql = HIGHLIGHT_SQL.format(placeholders=",".join("?" * len(chunk)))
+        for term_id, term, definition in conn.execute(sql, chunk):
+            highlights[term_id] = (
+                match_spans(term, needle),
+                match_spans(definition, needle),
+            )
+    return highlights
+
+
+def search_matches(conn, text, use_index=True, limit=HIGHLIGHT_ROWS):
+    """Return (ids, highlights) for a search, ranked as search_ids.
+
+    highlights maps the first limit ids to the (term spans, definition
+    spans) where text occurs, so callers can show the matches without
+    searching the text again. match_highlights() covers the rest.
+    """
+    term_ids = search_ids(conn, text, use_index)
+    return term_ids, match_highlights(conn, term_ids[:limit], text)
+
+
+def term_tier(term, needle):
+    """Python twin of TIER_SQL for a lower-cased term and needle"""
+    if needle not in term:
+        return 3
+    if (
+        term == needle
+        or term.startswith(needle + EXPANSION_SEPARATOR)
+        or term.endswith(EXPANSION_SEPARATOR + needle)
+    ):
+        return 0
+    return 1 if term.startswith(needle) else 2
+
+
+def search_rows(conn, text, use_index=True, with_text=True):
+    """Return SearchRows for a search, ranked as search_ids"""
+    if not with_text:
+        return SearchRows(array("q", search_ids(conn, text, use_index)), None, None)
+    rows = _search(conn, TEXT_COLUMNS, text, use_index).fetchall()
+    if not rows:
+        return SearchRows(array("q"), [], [])
+    term_ids, terms, definitions = zip(*rows)
+    return SearchRows(array("q", term_ids), list(terms), list(definitions))
+
+
+def refine_rows(rows, text):
+    """Narrow the SearchRows of a prefix of text to the rows for text itself.
+
+    Every row containing text also contains its prefix, so the answer is a
+    subset of rows and no query is needed. Rows are re-ranked into the
+    tiers of TIER_SQL; within a tier they keep the prefix's order, which
+    stands in for the bm25 order the database would use. Case is ignored
+    as the trigram index ignores it.
+    """
+    needle = text.lower()
+    tiers = ([], [], [], [])
+    for term_id, term, definition in zip(rows.ids, rows.terms, rows.definitions):
+        lowered = (term or "").lower()
+        if needle in lowered or (definition and needle in definition.lower()):
+            tiers[term_tier(lowered, needle)].append((term_id, term, definition))
+    ranked = [row for tier in tiers for row in tier]
+    if not ranked:
+        return SearchRows(array("q"), [], [])
+    term_ids, terms, definitions = zip(*ranked)
+    return SearchRows(array("q", term_ids), list(terms), list(definitions))
+
+
+def rows_highlights(rows, text, limit=HIGHLIGHT_ROWS):
+    """Return match_highlights for the first limit rows without a query"""
+    needle = text.lower()
+    return {
+        term_id: (match_spans(term, needle), match_spans(definition, needle))
+        for term_id, term, definition in zip(
+            rows.ids[:limit], rows.terms[:limit], rows.definitions[:limit]
+        )
+    }
@@ -0,0 +1,552 @@
+#!/usr/bin/env python3
+"""Local HTTP/JSON access to the glossary for case-management and report tools.
+
+The server is a small HTTP/1.1 implementation on asyncio streams, so it
+needs nothing beyond the standard library. Connections are kept alive and
+any number of them are multiplexed on the event loop; queries run on a
+thread pool, each borrowing one of the database's pooled reader
+connections, so they read through the same search path and query cache
+as the application. Encoded responses are kept in a second QueryCache,
+so repeated lookups are answered without leaving the event loop.
+
+Endpoints:
+
+    GET  /search?q=TEXT[&limit=N][&offset=N][&fuzzy=N]
+    GET  /term/ID
+    POST /annotate[?overlapping=1]   body: text, or JSON {"texts": [...]}
+    GET  /export[?format=csv|jsonl|md|html][&q=TEXT]
+    GET  /stats
+"""
+
+import asyncio
+import ipaddress
+import json
+import sqlite3
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+from .database import MAX_READERS
+from .defaults import DEFAULT_HOST, DEFAULT_PORT
+from .exporter import FORMATS, WRITERS, iter_export_rows
+from .fuzzy import MAX_DISTANCE
+from .querycache import QueryCache
+
+SEARCH_LIMIT = 50
+MAX_SEARCH_LIMIT = 1000
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 16 * 1024 * 1024
+IDLE_TIMEOUT = 30
+BACKLOG = 512
+RESPONSE_CACHE_BYTES = 32 * 1024 * 1024
+MAX_EXPORTS = 2
+EXPORT_CHUNK = 500
+STREAM_BUFFER = 64 * 1024
+STREAM_QUEUE = 4
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+    "md": "text/markdown; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+}
+JSON_TYPE = "application/json; charset=utf-8"
+SERVER_NAME = "dfir-glossary"
+
+Request = namedtuple("Request", ["method", "path", "query", "version", "headers"])
+
+
+class RequestError(Exception):
+    """Answered with status and a JSON error message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class StreamClosed(Exception):
+    """Raised in an export thread when its client has gone away"""
+
+
+def is_local(host):
+    """True for localhost and loopback addresses"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _int_param(query, name, default, minimum=0, maximum=None):
+    value = query.get(name, default)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise RequestError(400, f"{name} must be an integer") from None
+    if value < minimum or (maximum is not None and value > maximum):
+        raise RequestError(400, f"{name} must be between {minimum} and {maximum}")
+    return value
+
+
+def _flag(query, name):
+    return query.get(name, "0").lower() not in ("", "0", "false", "no")
+
+
+def _head(status, headers, keep_alive):
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", f"Server: {SERVER_NAME}"]
+    lines.extend(f"{name}: {value}" for name, value in headers)
+    lines.append("Connection: " + ("keep-alive" if keep_alive else "close"))
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def _json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _encoded(compute, args):
+    return _json(compute(*args))
+
+
+def _term(row, highlights=None):
+    term_id, term, definition, source = row
+    record = {"id": term_id, "term": term, "definition": definition, "source": source}
+    if highlights is not None and term_id in highlights:
+        record["highlights"] = dict(zip(("term", "definition"), highlights[term_id]))
+    return record
+
+
+class _StreamHandle:
+    """Text file handed to an exporter writer on a worker thread.
+
+    Writes are gathered into blocks of about STREAM_BUFFER bytes and put on
+    an asyncio queue for the event loop to send. The queue is bounded, so a
+    slow client holds the writer back instead of the export piling up in
+    memory.
+    """
+
+    def __init__(self, loop, blocks):
+        self.loop = loop
+        self.blocks = blocks
+        self.parts = []
+        self.size = 0
+        self.closed = False
+
+    def write(self, text):
+        if self.closed:
+            raise StreamClosed()
+        data = text.encode()
+        self.parts.append(data)
+        self.size += len(data)
+        if self.size >= STREAM_BUFFER:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self.parts:
+            self._put(b"".join(self.parts))
+            self.parts, self.size = [], 0
+
+    def _put(self, block):
+        if not self.closed:
+            put = self.blocks.put(block)
+            asyncio.run_coroutine_threadsafe(put, self.loop).result()
+
+    def finish(self):
+        """Send what is left followed by the end of stream marker"""
+        try:
+            self.flush()
+        finally:
+            self._put(None)
+
+
+class GlossaryServer:
+    """Serve one Glossary over HTTP on a local address.
+
+    Only loopback addresses are accepted. Writes made to the database by
+    other processes are noticed before each request, and drop every cached
+    result and index.
+    """
+
+    def __init__(
+        self,
+        glossary,
+        host=DEFAULT_HOST,
+        port=DEFAULT_PORT,
+        workers=MAX_READERS,
+        cache_bytes=RESPONSE_CACHE_BYTES,
+    ):
+        if not is_local(host):
+            raise ValueError(f"{host} is not a loopback address")
+        self.glossary = glossary
+        self.db = glossary.db
+        self.host = host
+        self.port = port
+        self.responses = QueryCache(cache_bytes)
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="glossary-query")
+        self.export_executor = ThreadPoolExecutor(
+            MAX_EXPORTS, thread_name_prefix="glossary-export"
+        )
+        self.pending = {}
+        self.matcher = None
+        self.server = None
+        # name: (arguments in the path, {method: handler})
+        self.routes = {
+            "search": (0, {"GET": self.search}),
+            "term": (1, {"GET": self.term}),
+            "annotate": (0, {"POST": self.annotate}),
+            "export": (0, {"GET": self.export}),
+            "stats": (0, {"GET": self.stats}),
+        }
+
+    async def start(self):
+        """Load the term matcher and start listening; returns the bound port"""
+        loop = asyncio.get_running_loop()
+        self.matcher = await loop.run_in_executor(self.executor, self._load_matcher)
+        self.server = await asyncio.start_server(
+            self._serve,
+            self.host,
+            self.port,
+            limit=MAX_HEADER_BYTES,
+            backlog=BACKLOG,
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.executor.shutdown(cancel_futures=True)
+        self.export_executor.shutdown(cancel_futures=True)
+
+    def _load_matcher(self):
+        return self.glossary.matcher
+
+    def _refresh(self):
+        if self.glossary.refresh():
+            self.responses.invalidate()
+            self.matcher = None
+
+    async def _serve(self, reader, writer):
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), IDLE_TIMEOUT
+                    )
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, 431, {"error": "Headers too large"}, False)
+                    break
+                try:
+                    request = self._parse(head)
+                    body = await self._body(request, reader)
+                except RequestError as exc:
+                    await self._send(writer, exc.status, {"error": str(exc)}, False)
+                    break
+                keep_alive = await self._handle(
+                    request, body, writer, self._keep_alive(request)
+                )
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # The server is shutting down; the connection is closed below
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse(head):
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            raise RequestError(400, "Malformed request line") from None
+        if not version.startswith("HTTP/1."):
+            raise RequestError(505, "Only HTTP/1.x is supported")
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        return Request(method, unquote(url.path), query, version, headers)
+
+    @staticmethod
+    def _keep_alive(request):
+        connection = request.headers.get("connection", "").lower()
+        if request.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    async def _body(self, request, reader):
+        if "chunked" in request.headers.get("transfer-encoding", "").lower():
+            raise RequestError(411, "Send the body with a Content-Length")
+        length = _int_param(request.headers, "content-length", 0)
+        if length > MAX_BODY_BYTES:
+            raise RequestError(413, f"The body is limited to {MAX_BODY_BYTES} bytes")
+        return await reader.readexactly(length) if length else b""
+
+    async def _handle(self, request, body, writer, keep_alive):
+        """Answer one request and return whether the connection stays open"""
+        name, *args = request.path.strip("/").split("/")
+        try:
+            if name not in self.routes or len(args) != self.routes[name][0]:
+                raise RequestError(404, f"Nothing is served at {request.path}")
+            handler = self.routes[name][1].get(request.method)
+            if handler is None:
+                raise RequestError(405, f"{request.method} is not allowed here")
+            self._refresh()
+            if handler == self.export:
+                return await self.export(request, writer, keep_alive)
+            status, payload = await handler(request, body, *args)
+        except RequestError as exc:
+            status, payload = exc.status, {"error": str(exc)}
+        except sqlite3.Error as exc:
+            status, payload = 500, {"error": str(exc)}
+        await self._send(writer, status, payload, keep_alive)
+        return keep_alive
+
+    async def _send(self, writer, status, payload, keep_alive):
+        body = payload if isinstance(payload, bytes) else _json(payload)
+        headers = (("Content-Type", JSON_TYPE), ("Content-Length", len(body)))
+        writer.write(_head(status, headers, keep_alive) + body)
+        await writer.drain()
+
+    async def _cached(self, key, compute, *args):
+        """Return the encoded JSON for key, running compute on the pool if needed.
+
+        Requests for a key that is already being computed wait for that
+        result instead of computing it again.
+        """
+        body = self.responses.get(key)
+        if body is not None:
+            self.responses.record("hits")
+            return body[0]
+        pending = self.pending.get(key)
+        if pending is not None:
+            self.responses.record("hits")
+            return await asyncio.shield(pending)
+        self.responses.record("misses")
+        generation = self.responses.generation
+        loop = asyncio.get_running_loop()
+        pending = loop.run_in_executor(self.executor, _encoded, compute, args)
+        self.pending[key] = pending
+        try:
+            body = await asyncio.shield(pending)
+        finally:
+            del self.pending[key]
+        self.responses.put(key, (body,), generation)
+        return body
+
+    async def search(self, request, body):
+        text = request.query.get("q", "")
+        if not text:
+            raise RequestError(400, "q is required")
+        limit = _int_param(request.query, "limit", SEARCH_LIMIT, 1, MAX_SEARCH_LIMIT)
+        offset = _int_param(request.query, "offset", 0)
+        fuzzy = _int_param(request.query, "fuzzy", 0, 0, MAX_DISTANCE)
+        key = ("search", text, limit, offset, fuzzy)
+        return 200, await self._cached(key, self._search, text, limit, offset, fuzzy)
+
+    def _search(self, text, limit, offset, fuzzy):
+        """Rank like GlossaryApp.search and return one page of the results"""
+        with self.db.reader() as conn:
+            term_ids, highlights = self.db.search_matches(text, conn)
+            extra = []
+            if fuzzy:
+                extra = self.glossary.approximate_ids(text, term_ids, fuzzy, conn)
+            ranked = term_ids + extra
+            page = ranked[offset : offset + limit]
+            exact = page[: max(len(term_ids) - offset, 0)]
+            missing = [term_id for term_id in exact if term_id not in highlights]
+            if missing:
+                highlights.update(self.db.match_highlights(missing, text, conn))
+            rows = self.db.rows(page, conn)
+        return {
+            "query": text,
+            "total": len(ranked),
+            "approximate": len(extra),
+            "offset": offset,
+            "results": [_term(row, highlights) for row in rows],
+        }
+
+    async def term(self, request, body, term_id):
+        try:
+            term_id = int(term_id)
+        except ValueError:
+            raise RequestError(400, "The term id must be an integer") from None
+        return 200, await self._cached(("term", term_id), self._term, term_id)
+
+    def _term(self, term_id):
+        with self.db.reader() as conn:
+            rows = self.db.rows([term_id], conn)
+            if not rows:
+                raise RequestError(404, f"No term has the id {term_id}")
+            record = _term(rows[0])
+            if self.db.refs_built(conn):
+                references, referenced_by = self.db.related(term_id, conn=conn)
+                record["references"] = [
+                    dict(zip(("id", "term"), r)) for r in references
+                ]
+                record["referenced_by"] = [
+                    dict(zip(("id", "term"), r)) for r in referenced_by
+                ]
+        return record
+
+    async def annotate(self, request, body):
+        try:
+            text = body.decode()
+        except UnicodeDecodeError:
+            raise RequestError(400, "The body must be UTF-8 text") from None
+        if "json" in request.headers.get("content-type", ""):
+            try:
+                texts = json.loads(text)["texts"]
+            except (ValueError, KeyError, TypeError):
+                raise RequestError(400, 'Send JSON as {"texts": [...]}') from None
+            if not isinstance(texts, list) or not all(
+                isinstance(item, str) for item in texts
+            ):
+                raise RequestError(400, "texts must be a list of strings")
+        else:
+            texts = None
+        overlapping = _flag(request.query, "overlapping")
+        loop = asyncio.get_running_loop()
+        if self.matcher is None:
+            self.matcher = await loop.run_in_executor(self.executor, self._load_matcher)
+        payload = await loop.run_in_executor(
+            self.executor, self._annotate, self.matcher, texts, text, overlapping
+        )
+        return 200, payload
+
+    def _annotate(self, matcher, texts, text, overlapping):
+        results = [
+            matcher.scan(item, overlapping)
+            for item in (texts if texts is not None else [text])
+        ]
+        term_ids = {match.term_id for matches in results for match in matches}
+        with self.db.reader() as conn:
+            names = {row[0]: row[1] for row in self.db.rows(term_ids, conn)}
+        results = [[match._asdict() for match in matches] for matches in results]
+        terms = {str(term_id): names.get(term_id) for term_id in sorted(term_ids)}
+        if texts is None:
+            return {"matches": results[0], "terms": terms}
+        return {"results": results, "terms": terms}
+
+    async def stats(self, request, body):
+        payload = self.glossary.stats()
+        payload["query_cache"] = self.glossary.query_cache_stats()
+        payload["response_cache"] = self.responses.stats()
+        return 200, payload
+
+    async def export(self, request, writer, keep_alive):
+        """Stream an export with chunked transfer encoding.
+
+        The rows are written by the exporter on a worker thread, which waits
+        whenever the client falls behind. HTTP/1.0 clients get the body
+        delimited by closing the connection instead. An export that fails
+        part way is cut off without the final chunk.
+        """
+        fmt = request.query.get("format", "csv")
+        if fmt not in FORMATS:
+            raise RequestError(400, f"format must be one of {', '.join(FORMATS)}")
+        text = request.query.get("q") or None
+        chunked = request.version != "HTTP/1.0"
+        keep_alive = keep_alive and chunked
+        headers = [("Content-Type", CONTENT_TYPES[fmt])]
+        if chunked:
+            headers.append(("Transfer-Encoding", "chunked"))
+        loop = asyncio.get_running_loop()
+        blocks = asyncio.Queue(STREAM_QUEUE)
+        handle = _StreamHandle(loop, blocks)
+        task = loop.run_in_executor(
+            self.export_executor, self._export, handle, fmt, text
+        )
+        started = False
+        try:
+            block = await blocks.get()
+            while block is not None:
+                if not started:
+                    writer.write(_head(200, headers, keep_alive))
+                    started = True
+                writer.write(
+                    b"%x\r\n%s\r\n" % (len(block), block) if chunked else block
+                )
+                await writer.drain()
+                block = await blocks.get()
+            await task
+        except sqlite3.Error:
+            if started:
+                return False
+            raise
+        except BaseException:
+            handle.closed = True
+            await self._abandon(task, blocks)
+            raise
+        if not started:
+            writer.write(_head(200, headers, keep_alive))
+        if chunked:
+            writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        return keep_alive
+
+    @staticmethod
+    async def _abandon(task, blocks):
+        """Discard blocks until an export whose client has gone away stops"""
+        while not task.done():
+            block = asyncio.ensure_future(blocks.get())
+            await asyncio.wait((task, block), return_when=asyncio.FIRST_COMPLETED)
+            block.cancel()
+        if not task.cancelled():
+            task.exception()
+
+    def _export(self, handle, fmt, text):
+        try:
+            with self.db.reader() as conn:
+                if text is None:
+                    rows = iter_export_rows(conn)
+                else:
+                    rows = self._ranked_rows(conn, text)
+                WRITERS[fmt](rows, handle)
+        except StreamClosed:
+            pass
+        finally:
+            handle.finish()
+
+    def _ranked_rows(self, conn, text):
+        """Yield (term, definition, source) of the search results, best first"""
+        term_ids = self.db.search_rows(text, conn).ids.tolist()
+        for start in range(0, len(term_ids), EXPORT_CHUNK):
+            for _, term, definition, source in self.db.rows(
+                term_ids[start : start + EXPORT_CHUNK], conn
+            ):
+                yield term, definition, source
+
+
+def serve(glossary, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+    """Run a GlossaryServer until interrupted.
+
+    ready, if given, is called with the bound port once it is listening.
+    """
+    server = GlossaryServer(glossary, host, port)
+
+    async def run():
+        bound = await server.start()
+        if ready is not None:
+            ready(bound)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""Background workers that keep database access off the GUI thread."""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from .annotate import TermMatcher
+from .complete import CompletionIndex
+from .search import HIGHLIGHT_CHUNK, HIGHLIGHT_ROWS
+
+DEFAULT_DEBOUNCE_MS = 150
+FIRST_LOAD_BATCH = 500
+LOAD_BATCH = 5000
+
+
+class SearchSignals(QObject):
+    finished = pyqtSignal(int, str, list, dict, int)
+    highlighted = pyqtSignal(int, dict)
+    failed = pyqtSignal(int, str, str)
+
+
+class LoadSignals(QObject):
+    rows = pyqtSignal(int, list)
+    finished = pyqtSignal(int, int)
+    failed = pyqtSignal(int, str)
+
+
+class CompletionSignals(QObject):
+    built = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+
+class RefsSignals(QObject):
+    built = pyqtSignal(int, object, object)
+    failed = pyqtSignal(int, str)
+
+
+class ReaderTask(QRunnable):
+    """A pool task that borrows a reader connection and can be interrupted"""
+
+    def __init__(self, generation, db, signals):
+        super().__init__()
+        self.generation = generation
+        self.db = db
+        self.signals = signals
+        self.cancelled = False
+        self.conn = None
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def reader(self):
+        with self.db.reader() as conn:
+            with self.lock:
+                self.conn = conn
+            try:
+                yield conn
+            finally:
+                with self.lock:
+                    self.conn = None
+
+    def cancel(self):
+        """Mark the task stale and interrupt its query if one is running"""
+        self.cancelled = True
+        with self.lock:
+            if self.conn is not None:
+                self.conn.interrupt()
+
+
+class SearchTask(ReaderTask):
+    """Run one search on a pool thread, reporting back through SearchSignals.
+
+    The ranked ids and the highlights of the first rows are reported as soon
+    as they are known; highlights for the remaining rows follow in chunks
+    until the task is cancelled. With a fuzzy distance, the ids of terms
+    within that many typos are appended after the exact matches.
+    """
+
+    def __init__(self, generation, text, db, signals, approximate=None, distance=0):
+        super().__init__(generation, db, signals)
+        self.text = text
+        self.approximate = approximate
+        self.distance = distance
+
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            with self.reader() as conn:
+                term_ids, highlights = self.db.search_matches(self.text, conn)
+                extra = []
+                if self.distance and self.approximate is not None:
+                    if self.cancelled:
+                        return
+                    extra = self.approximate(self.text, term_ids, self.distance, conn)
+                if self.cancelled:
+                    return
+                self.signals.finished.emit(
+                    self.generation, self.text, term_ids + extra, highlights, len(extra)
+                )
+                for start in range(HIGHLIGHT_ROWS, len(term_ids), HIGHLIGHT_CHUNK):
+                    if self.cancelled:
+                        return
+                    chunk = term_ids[start : start + HIGHLIGHT_CHUNK]
+                    highlights = self.db.match_highlights(chunk, self.text, conn)
+                    self.signals.highlighted.emit(self.generation, highlights)
+        except sqlite3.Error as exc:
+            if not self.cancelled:
+                self.signals.failed.emit(self.generation, self.text, str(exc))
+
+
+class SearchScheduler(QObject):
+    """Debounce search requests and run only the latest one on a worker thread.
+
+    Every call to schedule() supersedes the previous request: a pending
+    request is dropped before it starts, a running one is interrupted, and
+    results from anything but the latest generation are discarded. Setting
+    fuzzy_distance above zero has approximate(text, ids, distance, conn)
+    add typo-tolerant matches; results reports how many of the ids it added.
+    """
+
+    results = pyqtSignal(str, list, dict, int)
+    highlights = pyqtSignal(dict)
+    error = pyqtSignal(str, str)
+
+    def __init__(self, db, interval=DEFAULT_DEBOUNCE_MS, parent=None, approximate=None):
+        super().__init__(parent)
+        self.db = db
+        self.approximate = approximate
+        self.fuzzy_distance = 0
+        self.generation = 0
+        self.pending_text = ""
+        self.task = None
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self.signals = SearchSignals(self)
+        self.signals.finished.connect(self._finished)
+        self.signals.highlighted.connect(self._highlighted)
+        self.signals.failed.connect(self._failed)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._start)
+        self.set_interval(interval)
+
+    def set_interval(self, interval):
+        self.timer.setInterval(max(0, int(interval)))
+
+    def schedule(self, text):
+        """Search for text, at once if the query cache can answer it.
+
+        Results the cache holds, or can narrow down from the results of a
+        prefix as the user types on, are shown without waiting for the
+        debounce or querying the database. Fuzzy searches always run on the
+        pool.
+        """
+        self.cancel()
+        if not self.fuzzy_distance:
+            matches = self.db.cached_matches(text)
+            if matches is not None:
+                self.results.emit(text, *matches, 0)
+                return
+        self.pending_text = text
+        self.timer.start()
+
+    def cancel(self):
+        """Drop the pending request and interrupt any running search"""
+        self.generation += 1
+        self.timer.stop()
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def _start(self):
+        self.task = SearchTask(
+            self.generation,
+            self.pending_text,
+            self.db,
+            self.signals,
+            self.approximate,
+            self.fuzzy_distance,
+        )
+        self.pool.start(self.task)
+
+    def _finished(self, generation, text, term_ids, highlights, approximate):
+        if generation != self.generation:
+            return
+        self.results.emit(text, term_ids, highlights, approximate)
+
+    def _highlighted(self, generation, highlights):
+        if generation == self.generation:
+            self.highlights.emit(highlights)
+
+    def _failed(self, generation, text, message):
+        if generation != self.generation:
+            return
+        self.task = None
+        self.error.emit(text, message)
+
+    def shutdown(self):
+        self.cancel()
+        self.pool.waitForDone()
+
+
+class LoadTask(ReaderTask):
+    """Read every glossary row in term order and hand it over in batches.
+
+    Definitions are left out; the table fetches them for the rows on screen.
+    """
+
+    def run(self):
+        if self.cancelled:
+            return
+        total = 0
+        try:
+            with self.reader() as conn:
+                batches = self.db.iter_terms(
+                    FIRST_LOAD_BATCH, LOAD_BATCH, conn, definitions=False
+                )
+                for batch in batches:
+                    if self.cancelled:
+                        return
+                    total += len(batch)
+                    self.signals.rows.emit(self.generation, batch)
+        except sqlite3.Error as exc:
+            if not self.cancelled:
+                self.signals.failed.emit(self.generation, str(exc))
+            return
+        if not self.cancelled:
+            self.signals.finished.emit(self.generation, total)
+
+
+class TermLoader(QObject):
+    """Stream the whole glossary to the GUI thread without blocking it.
+
+    The first batch is small so the table fills as soon as the window is
+    shown; the rest follow in larger batches. Starting a new load or
+    cancelling drops anything still arriving from an earlier one.
+    """
+
+    rows = pyqtSignal(list)
+    finished = pyqtSignal(int)
+    error = pyqtSignal(str)
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.generation = 0
+        self.task = None
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = LoadSignals(self)
+        self.signals.rows.connect(self._rows)
+        self.signals.finished.connect(self._finished)
+        self.signals.failed.connect(self._failed)
+
+    @property
+    def loading(self):
+        return self.task is not None
+
+    def start(self):
+        self.cancel()
+        self.task = LoadTask(self.generation, self.db, self.signals)
+        self.pool.start(self.task)
+
+    def cancel(self):
+        self.generation += 1
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def _rows(self, generation, rows):
+        if generation == self.generation:
+            self.rows.emit(rows)
+
+    def _finished(self, generation, total):
+        if generation != self.generation:
+            return
+        self.task = None
+        self.finished.emit(total)
+
+    def _failed(self, generation, message):
+        if generation != self.generation:
+            return
+        self.task = None
+        self.error.emit(message)
+
+    def shutdown(self):
+        self.cancel()
+        self.pool.waitForDone()
+
+
+class CompletionTask(ReaderTask):
+    """Build a CompletionIndex over every term name"""
+
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            with self.reader() as conn:
+                rows = self.db.term_names(conn)
+        except sqlite3.Error as exc:
+            if not self.cancelled:
+                self.signals.failed.emit(self.generation, str(exc))
+            return
+        if self.cancelled:
+            return
+        index = CompletionIndex(rows)
+        if not self.cancelled:
+            self.signals.built.emit(self.generation, index)
+
+
+class CompletionBuilder(QObject):
+    """Build the search bar's completion index on a worker thread.
+
+    The index reflects the database as it was when start() was called.
+    Terms added or removed while it is being built are recorded with add()
+    and remove() and applied to the new index before it is handed over, so
+    callers can treat it as current.
+    """
+
+    built = pyqtSignal(object)
+    error = pyqtSignal(str)
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.generation = 0
+        self.task = None
+        self.changes = []
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = CompletionSignals(self)
+        self.signals.built.connect(self._built)
+        self.signals.failed.connect(self._failed)
+
+    @property
+    def building(self):
+        return self.task is not None
+
+    def start(self):
+        self.cancel()
+        self.task = CompletionTask(self.generation, self.db, self.signals)
+        self.pool.start(self.task)
+
+    def cancel(self):
+        self.generation += 1
+        self.changes.clear()
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def add(self, term_id, term):
+        if self.building:
+            self.changes.append((term_id, term))
+
+    def remove_ids(self, term_ids):
+        if self.building:
+            self.changes.extend((term_id, None) for term_id in term_ids)
+
+    def _built(self, generation, index):
+        if generation != self.generation:
+            return
+        self.task = None
+        for term_id, term in self.changes:
+            if term is None:
+                index.remove(term_id)
+            else:
+                index.add(term_id, term)
+        self.changes.clear()
+        self.built.emit(index)
+
+    def _failed(self, generation, message):
+        if generation != self.generation:
+            return
+        self.task = None
+        self.changes.clear()
+        self.error.emit(message)
+
+    def shutdown(self):
+        self.cancel()
+        self.pool.waitForDone()
+
+
+class RefsTask(ReaderTask):
+    """Load the TermMatcher and, with scan, find the terms each definition mentions"""
+
+    def __init__(self, generation, db, signals, scan=True):
+        super().__init__(generation, db, signals)
+        self.scan = scan
+
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            with self.reader() as conn:
+                matcher = TermMatcher.for_database(self.db.path, conn)
+                edges = None
+                if self.scan:
+                    edges = self.db.compute_refs(matcher, conn, lambda: self.cancelled)
+        except sqlite3.Error as exc:
+            if not self.cancelled:
+                self.signals.failed.emit(self.generation, str(exc))
+            return
+        if not self.cancelled:
+            self.signals.built.emit(self.generation, edges, matcher)
+
+
+class RefsBuilder(QObject):
+    """Compute the glossary's cross references on a worker thread.
+
+    built carries the edges, the TermMatcher they were found with and the
+    database's query_cache generation when start() was called; storing
+    them with Glossary.store_refs() fails if anything was written since,
+    in which case the build should be started again. Started without scan
+    only the matcher is loaded, which keeps the first add or edit after
+    start-up from having to wait for it, and the edges are None.
+    """
+
+    built = pyqtSignal(object, object, int)
+    error = pyqtSignal(str)
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.generation = 0
+        self.db_generation = 0
+        self.task = None
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = RefsSignals(self)
+        self.signals.built.connect(self._built)
+        self.signals.failed.connect(self._failed)
+
+    @property
+    def building(self):
+        return self.task is not None
+
+    def start(self, scan=True):
+        self.cancel()
+        self.db_generation = self.db.query_cache.generation
+        self.task = RefsTask(self.generation, self.db, self.signals, scan)
+        self.pool.start(self.task)
+
+    def cancel(self):
+        self.generation += 1
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def _built(self, generation, edges, matcher):
+        if generation != self.generation:
+            return
+        self.task = None
+        self.built.emit(edges, matcher, self.db_generation)
+
+    def _failed(self, generation, message):
+        if generation != self.generation:
+            return
+        self.task = None
+        self.error.emit(message)
+
+    def shutdown(self):
+        self.cancel()
+        self.pool.waitForDone()
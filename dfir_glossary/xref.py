@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Cross references between glossary terms, precomputed into an edge table."""
+
+from .annotate import TermMatcher, term_variants
+from .search import FTS_TABLE, TRIGRAM_LENGTH, escape_like, match_expression
+
+EDGE_CHUNK = 5000
+RELATED_LIMIT = 50
+
+REFS_TABLES_SQL = (
+    """CREATE TABLE IF NOT EXISTS glossary_refs (
+    term_id INTEGER NOT NULL,
+    ref_id INTEGER NOT NULL,
+    PRIMARY KEY (term_id, ref_id)
+) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS glossary_refs_ref ON glossary_refs (ref_id, term_id)",
+    "CREATE TABLE IF NOT EXISTS glossary_meta (key TEXT PRIMARY KEY, value TEXT)",
+)
+HAS_REFS_SQL = (
+    "SELECT count(*) FROM sqlite_master "
+    "WHERE name IN ('glossary_refs', 'glossary_meta')"
+)
+REFS_STATE_SQL = "SELECT value FROM glossary_meta WHERE key = 'refs'"
+SET_STATE_SQL = "INSERT OR REPLACE INTO glossary_meta (key, value) VALUES ('refs', ?)"
+DEFINITIONS_SQL = (
+    "SELECT id, definition FROM glossary "
+    "WHERE definition IS NOT NULL AND definition != ''"
+)
+TERM_SQL = "SELECT term, definition FROM glossary WHERE id = ?"
+CLEAR_REFS_SQL = "DELETE FROM glossary_refs"
+INSERT_REF_SQL = "INSERT OR IGNORE INTO glossary_refs (term_id, ref_id) VALUES (?, ?)"
+DROP_OUTGOING_SQL = "DELETE FROM glossary_refs WHERE term_id = ?"
+DROP_INCOMING_SQL = "DELETE FROM glossary_refs WHERE ref_id = ?"
+FTS_MENTIONS_SQL = (
+    f"SELECT glossary.id, glossary.definition FROM {FTS_TABLE} "
+    f"JOIN glossary ON glossary.id = {FTS_TABLE}.rowid "
+    f"WHERE {FTS_TABLE} MATCH ?"
+)
+LIKE_MENTIONS_SQL = (
+    "SELECT id, definition FROM glossary WHERE definition LIKE ? ESCAPE '\\'"
+)
+# Deleted terms are left in the table, so an undo restores their edges with
+# them; joining glossary hides them in the meantime.
+REFERENCES_SQL = (
+    "SELECT g.id, g.term FROM glossary_refs AS r "
+    "JOIN glossary AS g ON g.id = r.ref_id WHERE r.term_id = ? "
+    "ORDER BY g.term COLLATE NOCASE LIMIT ?"
+)
+REFERENCED_BY_SQL = (
+    "SELECT g.id, g.term FROM glossary_refs AS r "
+    "JOIN glossary AS g ON g.id = r.term_id WHERE r.ref_id = ? "
+    "ORDER BY g.term COLLATE NOCASE LIMIT ?"
+)
+
+BUILT = "built"
+STALE = "stale"
+
+
+def create_refs(conn):
+    """Create the edge table; must be called inside a transaction"""
+    for statement in REFS_TABLES_SQL:
+        conn.execute(statement)
+
+
+def has_refs(conn):
+    return conn.execute(HAS_REFS_SQL).fetchone()[0] == 2
+
+
+def refs_built(conn):
+    """True when every definition has been scanned since the last bulk change"""
+    row = conn.execute(REFS_STATE_SQL).fetchone()
+    return row is not None and row[0] == BUILT
+
+
+def mark_stale(conn):
+    conn.execute(SET_STATE_SQL, (STALE,))
+
+
+def compute_refs(conn, matcher, cancelled=None):
+    """Return [(term_id, ref_id)] for every term mentioned in a definition.
+
+    Every definition is scanned once with the TermMatcher, which finds the
+    mentions of all terms in a single pass over its tokens. cancelled is
+    polled between definitions; when it returns True None is returned.
+    """
+    edges = []
+    for term_id, definition in conn.execute(DEFINITIONS_SQL):
+        if cancelled is not None and cancelled():
+            return None
+        edges.extend(
+            (term_id, ref_id)
+            for ref_id in matcher.mentions(definition)
+            if ref_id != term_id
+        )
+    return edges
+
+
+def store_refs(conn, edges):
+    """Replace the edge table with edges and mark it built.
+
+    Must be called inside a transaction.
+    """
+    conn.execute(CLEAR_REFS_SQL)
+    for start in range(0, len(edges), EDGE_CHUNK):
+        conn.executemany(INSERT_REF_SQL, edges[start : start + EDGE_CHUNK])
+    conn.execute(SET_STATE_SQL, (BUILT,))
+
+
+def set_references(conn, matcher, rows):
+    """Recompute the outgoing edges of each (id, definition) in rows.
+
+    Must be called inside a transaction.
+    """
+    for term_id, definition in rows:
+        conn.execute(DROP_OUTGOING_SQL, (term_id,))
+        conn.executemany(
+            INSERT_REF_SQL,
+            (
+                (term_id, ref_id)
+                for ref_id in matcher.mentions(definition or "")
+                if ref_id != term_id
+            ),
+        )
+
+
+def mentioning_rows(conn, term, use_index):
+    """Return (id, definition) of the rows whose definition may mention term.
+
+    Each name of the term is looked up in the FTS index when it is long
+    enough for trigrams, and with LIKE otherwise, so only candidate rows
+    are read rather than every definition.
+    """
+    rows = {}
+    for variant in term_variants(term):
+        if use_index and len(variant) >= TRIGRAM_LENGTH:
+            query = f"definition : {match_expression(variant)}"
+            found = conn.execute(FTS_MENTIONS_SQL, (query,))
+        else:
+            found = conn.execute(LIKE_MENTIONS_SQL, (f"%{escape_like(variant)}%",))
+        rows.update(found)
+    return rows.items()
+
+
+def add_term_refs(conn, matcher, term_id, term, definition, use_index):
+    """Give a new term the edges to and from it.
+
+    Edges left behind by a deleted term that had the same id are dropped
+    first. matcher must already match the new term. Must be called inside
+    a transaction.
+    """
+    conn.execute(DROP_INCOMING_SQL, (term_id,))
+    set_references(conn, matcher, [(term_id, definition)])
+    single = TermMatcher([(term_id, term)])
+    conn.executemany(
+        INSERT_REF_SQL,
+        (
+            (other_id, term_id)
+            for other_id, other_definition in mentioning_rows(conn, term, use_index)
+            if other_id != term_id and term_id in single.mentions(other_definition)
+        ),
+    )
+
+
+def scan_related(conn, matcher, term_id, use_index):
+    """Return (ids the term refers to, ids referring to it) without the edge table.
+
+    The term's own definition is scanned with matcher, and so are the
+    definitions mentioning_rows() finds for it, so a single term is answered
+    without computing every edge.
+    """
+    row = conn.execute(TERM_SQL, (term_id,)).fetchone()
+    if row is None:
+        return set(), set()
+    term, definition = row
+    references = set(matcher.mentions(definition or "")) - {term_id}
+    referenced_by = {
+        other_id
+        for other_id, other_definition in mentioning_rows(conn, term, use_index)
+        if other_id != term_id and term_id in matcher.mentions(other_definition)
+    }
+    return references, referenced_by
+
+
+def related(conn, term_id, limit=RELATED_LIMIT):
+    """Return ([(id, term)] the term refers to, [(id, term)] referring to it).
+
+    Each list is sorted by term and holds at most limit rows, or all of
+    them when limit is None.
+    """
+    if limit is None:
+        limit = -1
+    return (
+        conn.execute(REFERENCES_SQL, (term_id, limit)).fetchall(),
+        conn.execute(REFERENCED_BY_SQL, (term_id, limit)).fetchall(),
+    )
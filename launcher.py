@@ -0,0 +1,6 @@
+#!/usr/bin/env python3
+
+from dfir_glossary.dfir_glossary import main
+
+if __name__ == "__main__":
+    main()
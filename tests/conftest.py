@@ -0,0 +1,52 @@
+import sqlite3
+import pytest
+
+SCHEMA_SQL = """CREATE TABLE IF NOT EXISTS "glossary" (
+	"id"	INTEGER NOT NULL UNIQUE,
+	"term"	TEXT NOT NULL UNIQUE,
+	"definition"	TEXT,
+	"source"	TEXT,
+	PRIMARY KEY("id")
+)"""
+INSERT_SQL = "INSERT INTO glossary (term, definition, source) VALUES (?, ?, ?)"
+
+TERMS = [
+    (
+        "Kerberos",
+        "An authentication protocol using tickets issued by a KDC.",
+        "RFC 4120",
+    ),
+    ("KDC - Key Distribution Center", "Issues Kerberos tickets.", "RFC 4120"),
+    ("Authentication", "Verifying the identity of a user or process.", "NIST"),
+    ("Authentication protocol", "A protocol for authentication.", "NIST"),
+    ("Hash", "The output of a hash algorithm.", "NIST"),
+    ("Hash algorithm", "Maps data of any size to a fixed size digest.", "NIST"),
+    ("SHA-256", "A hash algorithm with a 256-bit digest.", "FIPS 180-4"),
+    ("DH - Diffie-Hellman", "A key agreement method.", "NIST"),
+    ("(EC)DH - (Elliptic Curve) Diffie-Hellman", "", "NIST"),
+    ("Timeline", "Events in the order they happened.", ""),
+    ("Super timeline", "A timeline built from many artifacts.", ""),
+    ("Registry", "The Windows configuration database.", "Microsoft"),
+    ("Registry hive", "A file holding part of the Registry.", "Microsoft"),
+    ("50% rule", "Half of the samples, not a wildcard.", ""),
+    ("Snake_case", "Words joined with an underscore.", ""),
+]
+
+
+def create_glossary(path, rows=TERMS):
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(SCHEMA_SQL)
+        conn.executemany(INSERT_SQL, rows)
+        conn.commit()
+    finally:
+        conn.close()
+    return str(path)
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """A glossary database in its shipped form: the glossary table alone"""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.delenv("DFIR_GLOSSARY_READ_ONLY", raising=False)
+    return create_glossary(tmp_path / "glossary.sqlite")
@@ -0,0 +1,89 @@
+"""Tests for the one-pass term matcher."""
+
+import pytest
+
+from dfir_glossary.annotate import TermMatcher, term_variants
+from dfir_glossary.core import Glossary
+
+from conftest import TERMS
+
+NAMES = [row[0] for row in TERMS]
+ROWS = list(enumerate(NAMES))
+ID = {name: term_id for term_id, name in ROWS}
+
+
+@pytest.fixture
+def matcher():
+    return TermMatcher(ROWS)
+
+
+def found(matcher, text, **kwargs):
+    return [
+        (match.text, NAMES[match.term_id]) for match in matcher.scan(text, **kwargs)
+    ]
+
+
+def test_term_variants():
+    assert term_variants("(EC)DH - (Elliptic Curve) Diffie-Hellman") == {
+        "(EC)DH - (Elliptic Curve) Diffie-Hellman",
+        "ECDH - Elliptic Curve Diffie-Hellman",
+        "(EC)DH",
+        "ECDH",
+        "(Elliptic Curve) Diffie-Hellman",
+        "Elliptic Curve Diffie-Hellman",
+    }
+    assert term_variants("X") == set()
+
+
+def test_longest_match_wins(matcher):
+    assert found(matcher, "A Super timeline uses a hash algorithm.") == [
+        ("Super timeline", "Super timeline"),
+        ("hash algorithm", "Hash algorithm"),
+    ]
+    overlapping = found(matcher, "Super timeline", overlapping=True)
+    assert ("timeline", "Timeline") in overlapping
+
+
+def test_matches_fall_on_token_boundaries(matcher):
+    assert found(matcher, "Hashes and timelines, registryhive") == []
+    assert found(matcher, "SHA-256.") == [("SHA-256", "SHA-256")]
+
+
+def test_acronyms_keep_their_case(matcher):
+    assert found(matcher, "DH and dh") == [("DH", "DH - Diffie-Hellman")]
+    assert found(matcher, "kdc or KDC") == [("KDC", "KDC - Key Distribution Center")]
+    assert found(matcher, "elliptic curve diffie-hellman") == [
+        (
+            "elliptic curve diffie-hellman",
+            "(EC)DH - (Elliptic Curve) Diffie-Hellman",
+        )
+    ]
+
+
+def test_walk_finds_the_same_matches(matcher):
+    text = " ".join(NAMES) + " super TIMELINE ECDH (EC)DH kdc KDC"
+    assert matcher.scan(text, walk=True) == matcher.scan(text)
+    assert matcher.scan(text, overlapping=True, walk=True) == matcher.scan(
+        text, overlapping=True
+    )
+
+
+def test_add_and_remove_in_place(matcher):
+    text = "Prefetch files and the Registry hive"
+    matcher.add(99, "Prefetch")
+    matcher.remove_ids([ID["Registry hive"]])
+    assert [(m.text, m.term_id) for m in matcher.scan(text)] == [
+        ("Prefetch", 99),
+        ("Registry", ID["Registry"]),
+    ]
+    assert matcher.mentions(text) == {99, ID["Registry"]}
+    assert TermMatcher.from_state(matcher.to_state()).scan(text) == matcher.scan(text)
+
+
+def test_glossary_annotate_follows_writes(db_path):
+    with Glossary(db_path) as glossary:
+        assert glossary.annotate("Prefetch") == []
+        term_id = glossary.add("Prefetch")
+        assert [m.term_id for m in glossary.annotate("Prefetch")] == [term_id]
+        glossary.remove_ids([term_id])
+        assert glossary.annotate("Prefetch") == []
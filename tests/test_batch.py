@@ -0,0 +1,130 @@
+"""Tests for chunked batch annotation."""
+
+import csv
+import io
+import json
+import random
+
+import pytest
+
+from dfir_glossary import batch
+from dfir_glossary.annotate import TermMatcher
+
+from conftest import TERMS
+
+NAMES = [row[0] for row in TERMS]
+FILLER = ["the", "user", "ran", "a", "tool", "on", "host", "-", "(", ")", "x"]
+
+
+@pytest.fixture
+def matcher():
+    return TermMatcher(list(enumerate(NAMES)))
+
+
+def sample_text(seed, words=2000):
+    generator = random.Random(seed)
+    parts = []
+    for _ in range(words):
+        parts.append(generator.choice(NAMES if generator.random() < 0.3 else FILLER))
+        parts.append(generator.choice([" ", "  ", "\n", ", ", ""]))
+    return "".join(parts)
+
+
+def whole_scan(matcher, text, max_locations=batch.DEFAULT_MAX_LOCATIONS):
+    hits = {}
+    for match in matcher.scan(text):
+        entry = hits.setdefault(match.term_id, [0, []])
+        entry[0] += 1
+        if len(entry[1]) < max_locations:
+            entry[1].append(match.start)
+    return hits
+
+
+@pytest.mark.parametrize("chunk", [7, 50, 333, 4096])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_chunked_scan_matches_whole_file_scan(matcher, monkeypatch, chunk, seed):
+    monkeypatch.setattr(batch, "CHUNK_CHARS", chunk)
+    monkeypatch.setattr(batch, "OVERLAP_CHARS", 64)
+    text = sample_text(seed)
+    expected = whole_scan(matcher, text)
+    assert expected
+    assert batch.scan_stream(matcher, io.StringIO(text)) == expected
+
+
+def test_terms_straddling_every_boundary(matcher, monkeypatch):
+    monkeypatch.setattr(batch, "OVERLAP_CHARS", 64)
+    text = " ".join(NAMES * 4)
+    expected = whole_scan(matcher, text)
+    for chunk in range(1, 60):
+        monkeypatch.setattr(batch, "CHUNK_CHARS", chunk)
+        assert batch.scan_stream(matcher, io.StringIO(text)) == expected, chunk
+
+
+def test_text_without_whitespace(matcher, monkeypatch):
+    monkeypatch.setattr(batch, "CHUNK_CHARS", 16)
+    monkeypatch.setattr(batch, "OVERLAP_CHARS", 64)
+    text = ",".join(["Kerberos", "x" * 300, "SHA-256", "y" * 200, "Registry"])
+    expected = whole_scan(matcher, text)
+    assert batch.scan_stream(matcher, io.StringIO(text)) == expected
+
+
+def test_max_locations_caps_offsets_not_counts(matcher, monkeypatch):
+    monkeypatch.setattr(batch, "CHUNK_CHARS", 50)
+    monkeypatch.setattr(batch, "OVERLAP_CHARS", 64)
+    text = "Kerberos " * 30
+    hits = batch.scan_stream(matcher, io.StringIO(text), max_locations=5)
+    assert hits == {NAMES.index("Kerberos"): [30, [0, 9, 18, 27, 36]]}
+
+
+def test_annotate_files(matcher, tmp_path):
+    paths = []
+    for seed in range(3):
+        path = tmp_path / f"{seed}.txt"
+        path.write_text(sample_text(seed, 200), encoding="utf-8")
+        paths.append(str(path))
+    missing = str(tmp_path / "missing.txt")
+    results = {
+        path: (hits, error)
+        for path, hits, error in batch.annotate_files(
+            matcher, paths + [missing], processes=1
+        )
+    }
+    for path in paths:
+        with open(path, encoding="utf-8") as handle:
+            assert results[path] == (whole_scan(matcher, handle.read()), None)
+    assert results[missing][0] == {}
+    assert results[missing][1]
+
+
+def test_csv_and_jsonl_indexes_agree(matcher):
+    results = [
+        ("a.txt", whole_scan(matcher, sample_text(1, 200)), None),
+        ("empty.txt", {}, None),
+        ("gone.txt", {}, "No such file"),
+    ]
+    names = dict(enumerate(NAMES))
+    jsonl, table = io.StringIO(), io.StringIO()
+    totals = batch.write_index(results, jsonl, names, "jsonl")
+    assert batch.write_index(results, table, names, "csv") == totals
+    assert totals == (3, sum(count for count, _ in results[0][1].values()))
+
+    records = [json.loads(line) for line in jsonl.getvalue().splitlines()]
+    rows = list(csv.DictReader(io.StringIO(table.getvalue())))
+    assert [record["file"] for record in records] == ["a.txt", "empty.txt", "gone.txt"]
+    assert records[2]["error"] == "No such file"
+    from_jsonl = [
+        (record["file"], str(term["term_id"]), term["term"], str(term["count"]))
+        for record in records
+        for term in record["terms"]
+    ]
+    from_csv = [
+        (row["file"], row["term_id"], row["term"], row["count"])
+        for row in rows
+        if row["term_id"]
+    ]
+    assert from_csv == from_jsonl
+    empty = [row for row in rows if not row["term_id"]]
+    assert [(row["file"], row["error"]) for row in empty] == [
+        ("empty.txt", ""),
+        ("gone.txt", "No such file"),
+    ]
@@ -0,0 +1,63 @@
+import hashlib
+import os
+import subprocess
+import sys
+import pytest
+from dfir_glossary import cli
+
+
+def digest(path):
+    with open(path, "rb") as handle:
+        return hashlib.sha256(handle.read()).hexdigest()
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        ["stats"],
+        ["search", "kerberos"],
+        ["get", "Kerberos"],
+        ["related", "Kerberos"],
+        ["sources"],
+        ["changes"],
+        ["export", "-f", "jsonl"],
+    ],
+)
+def test_read_commands_leave_the_database_unchanged(db_path, command):
+    before = digest(db_path)
+    assert cli.main(["--db", db_path, *command]) == 0
+    assert digest(db_path) == before
+
+
+def test_related_without_cross_references_scans_definitions(db_path, capsys):
+    assert cli.main(["--db", db_path, "related", "Kerberos", "--json"]) == 0
+    scanned = capsys.readouterr().out
+    assert cli.main(["--db", db_path, "build-index"]) == 0
+    capsys.readouterr()
+    assert cli.main(["--db", db_path, "related", "Kerberos", "--json"]) == 0
+    assert capsys.readouterr().out == scanned
+
+
+def test_write_commands_upgrade_the_database(db_path, capsys):
+    assert cli.main(["--db", db_path, "build-index"]) == 0
+    assert cli.main(["--db", db_path, "stats", "--json"]) == 0
+    stats = capsys.readouterr().out
+    assert '"search_index": true' in stats
+    assert '"schema_version": 0' not in stats
+
+
+def test_lookups_do_not_load_the_heavy_modules():
+    code = (
+        "import sys, dfir_glossary.cli; "
+        "print(sorted(set(sys.modules) & {"
+        "'asyncio', 'multiprocessing', 'tempfile', 'dfir_glossary.server', "
+        "'dfir_glossary.indexcache'}))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,64 @@
+"""Tests for the prefix completion index."""
+
+from dfir_glossary.complete import CompletionIndex, word_keys
+
+from conftest import TERMS
+
+ROWS = list(enumerate(row[0] for row in TERMS))
+ECDH = "(EC)DH - (Elliptic Curve) Diffie-Hellman"
+
+
+def names(index, prefix, limit=10):
+    return [term for _, term in index.complete(prefix, limit)]
+
+
+def test_later_words_of_expansions_complete():
+    index = CompletionIndex(ROWS)
+    for prefix in ("DH", "Curve", "diffie", "Elliptic", "(EC"):
+        assert ECDH in names(index, prefix)
+
+
+def test_hyphenated_words_stay_whole():
+    assert "hellman" not in word_keys(ECDH)
+    assert "diffie-hellman" in word_keys(ECDH)
+    assert ECDH not in names(CompletionIndex(ROWS), "hellman")
+
+
+def test_plain_terms_have_no_word_keys():
+    assert word_keys("Super timeline") == set()
+    assert "Super timeline" not in names(CompletionIndex(ROWS), "timeline")
+
+
+def test_whole_names_come_before_word_matches():
+    index = CompletionIndex(ROWS)
+    found = names(index, "DH")
+    assert found.index("DH - Diffie-Hellman") < found.index(ECDH)
+    assert names(index, "DH", limit=1) == ["DH - Diffie-Hellman"]
+
+
+def test_add_and_remove_keep_both_tiers():
+    index = CompletionIndex(ROWS)
+    index.add(100, "ECC - Elliptic Curve Cryptography")
+    assert "ECC - Elliptic Curve Cryptography" in names(index, "cryptography")
+    index.update(100, "ECC - Elliptic curve crypto")
+    assert "ECC - Elliptic curve crypto" in names(index, "crypto")
+    assert names(index, "cryptography") == []
+    index.remove(100)
+    assert names(index, "crypto") == []
+    assert names(index, "curve") == [ECDH]
+
+
+def test_bulk_remove_matches_single_removes():
+    rows = [(n, f"T{n} - Word{n} Shared") for n in range(300)]
+    bulk = CompletionIndex(rows)
+    single = CompletionIndex(rows)
+    gone = range(0, 300, 2)
+    bulk.remove_ids(gone)
+    for term_id in gone:
+        single.remove(term_id)
+    assert len(bulk) == len(single) == 150
+    for bulk_tier, single_tier in zip(bulk.tiers, single.tiers):
+        assert bulk_tier.keys == single_tier.keys
+        assert list(bulk_tier.ids) == list(single_tier.ids)
+    assert names(bulk, "shared", limit=500) == names(single, "shared", limit=500)
+    assert len(names(bulk, "shared", limit=500)) == 150
@@ -0,0 +1,91 @@
+"""Tests for the persistent, pooled database layer."""
+
+import sqlite3
+import threading
+
+import pytest
+
+from dfir_glossary.database import GlossaryDatabase
+
+from conftest import INSERT_SQL, TERMS
+
+
+@pytest.fixture
+def db(db_path):
+    db = GlossaryDatabase(db_path, max_readers=2)
+    yield db
+    db.close()
+
+
+def count(conn):
+    return conn.execute("SELECT count(*) FROM glossary").fetchone()[0]
+
+
+def test_readers_are_reused_and_query_only(db):
+    with db.reader() as first:
+        assert count(first) == len(TERMS)
+        with pytest.raises(sqlite3.OperationalError):
+            first.execute(INSERT_SQL, ("Prefetch", "", ""))
+    with db.reader() as second:
+        assert second is first
+    assert len(db.all_readers) == 1
+
+
+def test_readers_are_bounded(db):
+    holding = threading.Event()
+    release = threading.Event()
+    borrowed = []
+
+    def hold():
+        with db.reader() as conn:
+            borrowed.append(conn)
+            holding.set()
+            release.wait(5)
+
+    threads = [threading.Thread(target=hold) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+        holding.wait(5)
+        holding.clear()
+    assert not db.reader_slots.acquire(timeout=0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len({id(conn) for conn in borrowed}) == 2
+    assert db.reader_slots.acquire(timeout=1)
+    db.reader_slots.release()
+
+
+def test_transactions_nest_and_roll_back(db):
+    with pytest.raises(RuntimeError):
+        with db.transaction() as conn:
+            conn.execute(INSERT_SQL, ("Prefetch", "", ""))
+            with db.transaction() as inner:
+                assert inner is conn
+                inner.execute(INSERT_SQL, ("Shellbags", "", ""))
+            raise RuntimeError
+    assert count(db.conn) == len(TERMS)
+    with db.transaction() as conn:
+        conn.execute(INSERT_SQL, ("Prefetch", "", ""))
+    with db.reader() as conn:
+        assert count(conn) == len(TERMS) + 1
+
+
+def test_commits_invalidate_the_query_cache(db):
+    generation = db.query_cache.generation
+    with db.transaction():
+        pass
+    assert db.query_cache.generation == generation + 1
+
+
+def test_read_only_databases_refuse_transactions(db_path):
+    db = GlossaryDatabase(db_path, read_only=True)
+    try:
+        assert not db.writable
+        with pytest.raises(sqlite3.OperationalError):
+            with db.transaction():
+                pass
+        with db.reader() as conn:
+            assert count(conn) == len(TERMS)
+    finally:
+        db.close()
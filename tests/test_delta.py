@@ -0,0 +1,146 @@
+"""Tests for diff, patch and three-way merge between glossaries."""
+
+import io
+import shutil
+
+import pytest
+
+from dfir_glossary import delta
+from dfir_glossary.core import Glossary
+
+from conftest import TERMS
+
+
+def rows(path):
+    with Glossary(path, read_only=True) as glossary:
+        return sorted(t[1:] for t in glossary.all_terms())
+
+
+@pytest.fixture
+def copies(db_path, tmp_path):
+    """Return a function copying the base glossary to a new name"""
+
+    def copy(name):
+        return shutil.copy(db_path, tmp_path / f"{name}.sqlite")
+
+    return copy
+
+
+def change_theirs(path):
+    with Glossary(path) as glossary:
+        glossary.add("Prefetch", "Windows application launch traces.", "Microsoft")
+        glossary.edit("Kerberos", definition="Ticket based network authentication.")
+        glossary.remove(["Hash"])
+
+
+def test_diff_and_patch_round_trip(db_path, copies):
+    theirs = copies("theirs")
+    change_theirs(theirs)
+    output = io.StringIO()
+    with Glossary(db_path) as glossary:
+        assert glossary.diff(theirs, output) == 3
+    changes = list(delta.read_delta(io.StringIO(output.getvalue())))
+    assert sorted((c.op, c.term) for c in changes) == [
+        ("add", "Prefetch"),
+        ("edit", "Kerberos"),
+        ("remove", "Hash"),
+    ]
+
+    patch = copies("patched")
+    path = patch.with_suffix(".delta")
+    path.write_text(output.getvalue(), encoding="utf-8")
+    with Glossary(patch) as glossary:
+        summary = glossary.patch(path)
+        assert (summary.added, summary.edited, summary.removed) == (1, 1, 1)
+        assert summary.conflicts == []
+        assert glossary.search("Ticket based")[0].term == "Kerberos"
+        assert glossary.search("Prefetch")[0].term == "Prefetch"
+        summary = glossary.patch(path)
+        assert summary.unchanged == 3
+        assert summary.conflicts == []
+    assert rows(patch) == rows(theirs)
+
+
+def test_identical_glossaries_have_an_empty_diff(db_path, copies):
+    output = io.StringIO()
+    with Glossary(db_path) as glossary:
+        assert glossary.diff(copies("same"), output) == 0
+    assert output.getvalue().count("\n") == 1
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        '{"format": "something else"}\n',
+        f'{{"format": "{delta.DELTA_FORMAT}", "version": 99}}\n',
+        f'{{"format": "{delta.DELTA_FORMAT}", "version": 1}}\n{{"op": "drop"}}\n',
+    ],
+)
+def test_read_delta_rejects_other_files(text):
+    with pytest.raises(ValueError):
+        list(delta.read_delta(io.StringIO(text)))
+
+
+@pytest.mark.parametrize(
+    "prefer, definition, applied",
+    [
+        ("ours", "Our definition.", False),
+        ("theirs", "Ticket based network authentication.", True),
+    ],
+)
+def test_merge_resolves_conflicts(db_path, copies, prefer, definition, applied):
+    base, theirs = copies("base"), copies("theirs")
+    change_theirs(theirs)
+    with Glossary(db_path) as glossary:
+        glossary.edit("Kerberos", definition="Our definition.")
+        glossary.edit("Timeline", source="Ours")
+        summary = glossary.merge(base, theirs, prefer)
+        assert summary.conflicts == [
+            delta.Conflict("Kerberos", "edited", "edited", applied)
+        ]
+        assert (summary.added, summary.removed) == (1, 1)
+        assert glossary.lookup("Kerberos").definition == definition
+        assert glossary.lookup("Timeline").source == "Ours"
+        assert glossary.lookup("Prefetch") is not None
+        assert glossary.lookup("Hash") is None
+
+
+def test_removing_a_term_edited_here_is_a_conflict(db_path, copies):
+    base, theirs = copies("base"), copies("theirs")
+    change_theirs(theirs)
+    with Glossary(db_path) as glossary:
+        glossary.edit("Hash", source="Kept")
+        summary = glossary.merge(base, theirs)
+        assert [(c.term, c.ours, c.theirs) for c in summary.conflicts] == [
+            ("Hash", "edited", "removed")
+        ]
+        assert glossary.lookup("Hash").source == "Kept"
+
+
+def test_batched_patches_rebuild_the_search_index(db_path, copies, monkeypatch):
+    monkeypatch.setattr(delta, "PATCH_BATCH", 2)
+    theirs = copies("theirs")
+    with Glossary(theirs) as glossary:
+        for number in range(5):
+            glossary.add(f"Artifact {number}", f"Evidence item number {number}")
+    with Glossary(db_path) as glossary:
+        summary = glossary.merge(copies("base"), theirs)
+        assert summary.added == 5
+        assert len(glossary.search("Evidence item")) == 5
+        assert len(glossary.all_terms()) == len(TERMS) + 5
+
+
+def test_change_log_records_writes(db_path):
+    with Glossary(db_path) as glossary:
+        glossary.add("Prefetch")
+        glossary.edit("Kerberos", source="MIT")
+        glossary.remove(["Hash"])
+        log = glossary.change_log()
+    assert [(action, term) for _, _, action, term in log][-3:] == [
+        ("add", "Prefetch"),
+        ("edit", "Kerberos"),
+        ("remove", "Hash"),
+    ]
+    with Glossary(db_path) as glossary:
+        assert glossary.change_log(since=log[-2][0]) == log[-1:]
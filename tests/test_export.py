@@ -0,0 +1,94 @@
+"""Tests for streaming exports."""
+
+import csv
+import io
+import json
+
+import pytest
+
+from dfir_glossary import exporter
+from dfir_glossary.core import Glossary
+
+from conftest import TERMS, create_glossary
+
+ALL = sorted(TERMS)
+
+
+@pytest.fixture
+def glossary(db_path):
+    with Glossary(db_path, read_only=True) as glossary:
+        yield glossary
+
+
+def export(glossary, fmt, **kwargs):
+    output = io.StringIO()
+    count = glossary.export(output, fmt, **kwargs)
+    return count, output.getvalue()
+
+
+def as_rows(rows):
+    return [tuple(value or "" for value in row) for row in rows]
+
+
+def test_csv_lists_every_term_in_order(glossary):
+    count, text = export(glossary, "csv")
+    rows = list(csv.reader(io.StringIO(text)))
+    assert count == len(TERMS)
+    assert tuple(rows[0]) == exporter.EXPORT_HEADER
+    assert as_rows(rows[1:]) == as_rows(ALL)
+
+
+def test_jsonl_keeps_multiline_definitions(glossary):
+    count, text = export(glossary, "jsonl")
+    records = [json.loads(line) for line in text.splitlines()]
+    assert count == len(records) == len(TERMS)
+    assert as_rows(tuple(r.values()) for r in records) == as_rows(ALL)
+
+
+@pytest.mark.parametrize("chunk", [2, exporter.STAGE_CHUNK])
+def test_selected_ids_and_terms(glossary, monkeypatch, chunk):
+    monkeypatch.setattr(exporter, "STAGE_CHUNK", chunk)
+    wanted = ["Registry", "Hash", "Kerberos", "SHA-256", "Missing"]
+    ids = [glossary.lookup(term).id for term in wanted[:-1]]
+    by_id = export(glossary, "jsonl", term_ids=ids + ids[:1])
+    by_term = export(glossary, "jsonl", terms=wanted)
+    assert by_id == by_term
+    assert by_id[0] == 4
+    names = [json.loads(line)["term"] for line in by_id[1].splitlines()]
+    assert names == sorted(wanted[:-1])
+
+
+def test_an_export_that_is_not_finished_leaves_nothing_staged(glossary):
+    rows = exporter.iter_export_rows(glossary.db.conn, terms=["Hash", "Kerberos"])
+    next(rows)
+    rows.close()
+    assert export(glossary, "csv")[0] == len(TERMS)
+
+
+def test_markup_is_escaped(tmp_path):
+    path = create_glossary(
+        tmp_path / "markup.sqlite", [("<b>Bold</b>", "One\nTwo & <i>", None)]
+    )
+    with Glossary(path, read_only=True) as glossary:
+        _, page = export(glossary, "html")
+        _, markdown = export(glossary, "md")
+    assert "<td>&lt;b&gt;Bold&lt;/b&gt;</td>" in page
+    assert "One<br>\nTwo &amp; &lt;i&gt;" in page
+    assert "## &lt;b>Bold&lt;/b>" in markdown
+    assert "One  \nTwo & &lt;i>" in markdown
+    assert "Source" not in markdown
+
+
+@pytest.mark.parametrize(
+    "path, fmt",
+    [
+        ("out.CSV", "csv"),
+        ("out.markdown", "md"),
+        ("out.htm", "html"),
+        ("out.ndjson", "jsonl"),
+        ("out.txt", "csv"),
+        ("out", "csv"),
+    ],
+)
+def test_detect_format(path, fmt):
+    assert exporter.detect_format(path) == fmt
@@ -0,0 +1,90 @@
+"""Tests for typo-tolerant search."""
+
+import random
+
+import pytest
+
+from dfir_glossary.core import Glossary
+from dfir_glossary.fuzzy import FuzzyIndex, edit_distance, word_distance
+
+from conftest import TERMS
+
+NAMES = [row[0] for row in TERMS]
+
+
+def restricted_distance(a, b):
+    """Edit distance with adjacent swaps, over the whole table"""
+    table = [
+        [i + j if not i * j else 0 for j in range(len(b) + 1)]
+        for i in range(len(a) + 1)
+    ]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            table[i][j] = min(
+                table[i - 1][j] + 1,
+                table[i][j - 1] + 1,
+                table[i - 1][j - 1] + (a[i - 1] != b[j - 1]),
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                table[i][j] = min(table[i][j], table[i - 2][j - 2] + 1)
+    return table[len(a)][len(b)]
+
+
+def test_banded_edit_distance_matches_the_full_table():
+    generator = random.Random(4)
+    for _ in range(2000):
+        a = "".join(generator.choices("abc", k=generator.randint(0, 7)))
+        b = "".join(generator.choices("abc", k=generator.randint(0, 7)))
+        limit = generator.randint(0, 3)
+        assert edit_distance(a, b, limit) == min(restricted_distance(a, b), limit + 1)
+
+
+@pytest.fixture
+def index():
+    return FuzzyIndex(enumerate(NAMES))
+
+
+def names(index, text, distance=2):
+    return [(edits, NAMES[term_id]) for edits, term_id in index.search(text, distance)]
+
+
+def test_typos_find_the_term(index):
+    assert names(index, "kerbreos") == [(1, "Kerberos")]
+    assert names(index, "registyr hvie") == [(2, "Registry hive")]
+    assert names(index, "kerbreos", distance=0) == []
+
+
+def test_closest_and_shortest_terms_come_first(index):
+    assert names(index, "timelne") == [(1, "Timeline"), (1, "Super timeline")]
+    assert names(index, "diffie hellmann")[0] == (1, "DH - Diffie-Hellman")
+
+
+def test_short_words_must_match_exactly(index):
+    assert word_distance("dh", 2) == 0
+    assert names(index, "dx") == []
+    assert [name for _, name in names(index, "dh")] == [
+        "DH - Diffie-Hellman",
+        "(EC)DH - (Elliptic Curve) Diffie-Hellman",
+    ]
+
+
+def test_add_and_remove_in_place(index):
+    index.add(99, "Prefetch")
+    assert index.search("prefecth") == [(1, 99)]
+    index.remove_ids([99, NAMES.index("Kerberos")])
+    assert index.search("prefecth") == []
+    assert index.search("kerbreos") == []
+    rebuilt = FuzzyIndex.from_state(index.to_state())
+    assert rebuilt.search("timelne") == index.search("timelne")
+
+
+def test_fuzzy_results_follow_exact_ones(db_path):
+    with Glossary(db_path) as glossary:
+        glossary.add("Hasp", "A hardware dongle.")
+        exact = [term.term for term in glossary.search("hash")]
+        both = [term.term for term in glossary.search("hash", fuzzy=1)]
+        assert both == exact + ["Hasp"]
+        assert glossary.search("timelnie", fuzzy=2)[0].term == "Timeline"
+        term_id = glossary.add("Prefetch")
+        assert glossary.approximate_ids("prefecth", []) == [term_id]
+        assert glossary.approximate_ids("prefecth", [term_id]) == []
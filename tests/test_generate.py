@@ -0,0 +1,52 @@
+"""Tests for the synthetic glossary generator used by the benchmarks."""
+
+import sqlite3
+
+import pytest
+
+from benchmarks.generate import database_path, generate, parse_size, size_label
+from dfir_glossary.core import Glossary
+
+WORDS = ["artifact", "evidence", "registry", "timeline", "kernel", "memory", "hash"]
+
+
+@pytest.mark.parametrize(
+    "text, count", [("10k", 10_000), ("1M", 1_000_000), ("2.5k", 2500), ("750", 750)]
+)
+def test_parse_size(text, count):
+    assert parse_size(text) == count
+
+
+def test_size_labels_name_the_files():
+    assert size_label(100_000) == "100k"
+    assert size_label(1234) == "1234"
+    assert database_path(10_000, "data").endswith("glossary-10k.sqlite")
+
+
+def rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT term, definition, source FROM glossary").fetchall()
+    finally:
+        conn.close()
+
+
+def test_generation_is_reproducible(tmp_path):
+    first = generate(str(tmp_path / "a.sqlite"), 500, seed=3, words=WORDS)
+    second = generate(str(tmp_path / "b.sqlite"), 500, seed=3, words=WORDS)
+    other = generate(str(tmp_path / "c.sqlite"), 500, seed=4, words=WORDS)
+    assert rows(first) == rows(second)
+    assert rows(first) != rows(other)
+
+
+def test_generated_glossaries_look_like_the_shipped_one(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    path = generate(str(tmp_path / "g.sqlite"), 2000, words=WORDS)
+    found = rows(path)
+    assert len(found) == len({term for term, _, _ in found}) == 2000
+    empty = sum(not definition for _, definition, _ in found)
+    assert 0.3 < empty / len(found) < 0.7
+    assert any(" - " in term for term, _, _ in found)
+    with Glossary(path, read_only=True) as glossary:
+        assert glossary.stats()["search_index"]
+        assert glossary.search("evidence")
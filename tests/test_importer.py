@@ -0,0 +1,94 @@
+import io
+import json
+import pytest
+from dfir_glossary import cli
+from dfir_glossary.core import Glossary
+from dfir_glossary.importer import read_csv, read_jsonl
+
+
+def write_jsonl(tmp_path, records):
+    path = tmp_path / "terms.jsonl"
+    path.write_text(
+        "".join(
+            (record if isinstance(record, str) else json.dumps(record)) + "\n"
+            for record in records
+        ),
+        encoding="utf-8",
+    )
+    return str(path)
+
+
+def test_read_jsonl_rejects_lines_that_are_not_objects():
+    handle = io.StringIO('{"term": "A"}\n\n[1, 2]\n')
+    with pytest.raises(ValueError, match="Line 3 is not a JSON object"):
+        list(read_jsonl(handle))
+
+
+def test_read_jsonl_reports_the_line_of_invalid_json():
+    handle = io.StringIO('{"term": "A"}\n{"term": \n')
+    with pytest.raises(ValueError, match="Line 2 is not valid JSON"):
+        list(read_jsonl(handle))
+
+
+def test_read_csv_needs_a_term_column():
+    with pytest.raises(ValueError):
+        list(read_csv(io.StringIO("Name,Definition\nA,B\n")))
+
+
+def test_fields_that_are_not_strings_are_invalid(db_path, tmp_path):
+    path = write_jsonl(
+        tmp_path,
+        [
+            {"term": 123},
+            {"term": "Numbered", "definition": 5},
+            {"term": ["list"]},
+            {"term": "Plain", "definition": None, "source": "here"},
+            {"term": "   "},
+        ],
+    )
+    with Glossary(db_path) as glossary:
+        summary = glossary.import_file(path)
+        assert summary.as_dict() == {
+            "read": 5,
+            "inserted": 1,
+            "updated": 0,
+            "skipped": 0,
+            "invalid": 4,
+        }
+        assert glossary.lookup("Plain").source == "here"
+        assert glossary.lookup("Numbered") is None
+
+
+def test_cli_reports_a_non_object_line_without_a_traceback(db_path, tmp_path, capsys):
+    path = write_jsonl(tmp_path, [{"term": "Fine"}, "[1, 2]"])
+    assert cli.main(["--db", db_path, "import", path, "-q"]) == 1
+    assert "Line 2 is not a JSON object" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize(
+    "policy, definition, source",
+    [
+        ("skip", "Events in the order they happened.", ""),
+        ("overwrite", "New text", "New source"),
+        ("merge", "Events in the order they happened.", "New source"),
+    ],
+)
+def test_conflict_policies(db_path, tmp_path, policy, definition, source):
+    path = write_jsonl(
+        tmp_path,
+        [{"term": "Timeline", "definition": "New text", "source": "New source"}],
+    )
+    with Glossary(db_path) as glossary:
+        glossary.import_file(path, policy=policy)
+        term = glossary.lookup("Timeline")
+    assert (term.definition, term.source) == (definition, source)
+
+
+def test_batches_larger_than_one_rebuild_the_search_index(db_path, tmp_path):
+    path = write_jsonl(
+        tmp_path, [{"term": f"Imported {number}"} for number in range(25)]
+    )
+    with Glossary(db_path) as glossary:
+        summary = glossary.import_file(path, batch_size=10)
+        assert summary.inserted == 25
+        assert len(glossary.search("imported")) == 25
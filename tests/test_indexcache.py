@@ -0,0 +1,65 @@
+"""Tests for the JSON index sidecars."""
+
+import json
+import os
+
+import pytest
+
+from dfir_glossary import indexcache
+from dfir_glossary.annotate import TermMatcher
+from dfir_glossary.fuzzy import FuzzyIndex
+
+from conftest import TERMS
+
+ROWS = list(enumerate(row[0] for row in TERMS))
+TEXT = "Kerberos asks the KDC - Key Distribution Center; SHA-256 is a Hash algorithm."
+
+
+def test_matcher_round_trip(db_path):
+    matcher = TermMatcher(ROWS)
+    matcher.remove_ids([ROWS[0][0]])
+    path = indexcache.save_index(db_path, "terms", "key", matcher)
+    assert path == f"{db_path}.terms.cache"
+    loaded = indexcache.load_index(db_path, "terms", "key", TermMatcher.from_state)
+    assert loaded.scan(TEXT) == matcher.scan(TEXT)
+    assert loaded.scan(TEXT, overlapping=True) == matcher.scan(TEXT, overlapping=True)
+
+
+def test_fuzzy_round_trip(db_path):
+    index = FuzzyIndex(ROWS)
+    indexcache.save_index(db_path, "fuzzy", "key", index)
+    loaded = indexcache.load_index(db_path, "fuzzy", "key", FuzzyIndex.from_state)
+    for text in ("kerberso", "registyr", "timelne"):
+        assert loaded.search(text) == index.search(text)
+
+
+def test_other_keys_are_not_loaded(db_path):
+    indexcache.save_index(db_path, "terms", "key", TermMatcher(ROWS))
+    assert (
+        indexcache.load_index(db_path, "terms", "other", TermMatcher.from_state) is None
+    )
+
+
+def test_inconsistent_state_counts_as_no_cache(db_path):
+    state = TermMatcher(ROWS).to_state()
+    state["exacts"].pop()
+    path = indexcache.cache_paths(db_path, "terms")[0]
+    with open(path, "w", encoding="utf-8") as cache_file:
+        json.dump(
+            {"version": indexcache.CACHE_VERSION, "key": "k", "index": state},
+            cache_file,
+        )
+    with pytest.raises(ValueError):
+        TermMatcher.from_state(state)
+    assert indexcache.load_index(db_path, "terms", "k", TermMatcher.from_state) is None
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+def test_writable_by_others_is_refused(db_path):
+    path = indexcache.save_index(db_path, "terms", "key", TermMatcher(ROWS))
+    os.chmod(path, 0o664)
+    assert (
+        indexcache.load_index(db_path, "terms", "key", TermMatcher.from_state) is None
+    )
+    os.chmod(path, 0o644)
+    assert indexcache.load_index(db_path, "terms", "key", TermMatcher.from_state)
@@ -0,0 +1,115 @@
+"""Tests for undoable deletes and edits."""
+
+import pytest
+
+from dfir_glossary import journal
+from dfir_glossary.core import Glossary, GlossaryError
+
+from conftest import TERMS
+
+
+@pytest.fixture
+def glossary(db_path):
+    with Glossary(db_path) as glossary:
+        yield glossary
+
+
+def snapshot(glossary):
+    return sorted(glossary.all_terms())
+
+
+def term_id(glossary, term):
+    return glossary.lookup(term).id
+
+
+def test_undo_and_redo_a_delete(glossary):
+    before = snapshot(glossary)
+    gone = [term_id(glossary, "Kerberos"), term_id(glossary, "Hash")]
+    assert glossary.remove_ids(gone) == 2
+    after = snapshot(glossary)
+    assert len(after) == len(TERMS) - 2
+
+    change = glossary.undo()
+    assert sorted(row[0] for row in change.restored) == sorted(gone)
+    assert change.renumbered == []
+    assert snapshot(glossary) == before
+    assert [t.term for t in glossary.search("Kerberos")][0] == "Kerberos"
+
+    change = glossary.redo()
+    assert sorted(change.removed) == sorted(gone)
+    assert snapshot(glossary) == after
+    assert not glossary.can_redo()
+
+
+def test_undo_and_redo_an_edit(glossary):
+    kerberos = term_id(glossary, "Kerberos")
+    old = glossary.get(kerberos)
+    glossary.edit_id(kerberos, definition="Ticket based authentication")
+    glossary.edit_id(kerberos, source="MIT")
+
+    assert glossary.undo().updated == [(kerberos, "source", old.source)]
+    assert glossary.undo().updated == [(kerberos, "definition", old.definition)]
+    assert glossary.get(kerberos) == old
+    assert not glossary.can_undo()
+
+    glossary.redo()
+    assert glossary.get(kerberos).definition == "Ticket based authentication"
+    assert glossary.search("Ticket based")[0].id == kerberos
+    assert glossary.get(kerberos).source == old.source
+
+
+def test_a_new_write_drops_the_redo_history(glossary):
+    glossary.remove_ids([term_id(glossary, "Hash")])
+    glossary.undo()
+    assert glossary.can_redo()
+    glossary.edit_id(term_id(glossary, "Hash"), source="New")
+    assert not glossary.can_redo()
+    assert glossary.redo() is None
+
+
+def test_restored_rows_whose_id_was_taken_are_renumbered(glossary):
+    last = max(term.id for term in glossary.all_terms())
+    name = glossary.get(last).term
+    glossary.remove_ids([last])
+    assert glossary.add("Newcomer") == last
+
+    change = glossary.undo()
+    assert change.renumbered == [glossary.lookup(name).id]
+    assert glossary.lookup(name).id != last
+    assert glossary.get(last).term == "Newcomer"
+
+    glossary.redo()
+    assert glossary.lookup(name) is None
+    assert glossary.get(last).term == "Newcomer"
+
+
+def test_undoing_a_delete_of_a_term_added_again_fails(glossary):
+    glossary.remove_ids([term_id(glossary, "Kerberos")])
+    glossary.add("Kerberos", "Again")
+    with pytest.raises(GlossaryError):
+        glossary.undo()
+    assert glossary.lookup("Kerberos").definition == "Again"
+    assert glossary.can_undo()
+
+
+def test_history_is_bounded_and_survives_reopening(db_path, monkeypatch):
+    monkeypatch.setattr(journal, "MAX_BATCHES", 3)
+    with Glossary(db_path) as glossary:
+        kerberos = term_id(glossary, "Kerberos")
+        for number in range(5):
+            glossary.edit_id(kerberos, source=f"v{number}")
+    with Glossary(db_path) as glossary:
+        steps = 0
+        while glossary.undo() is not None:
+            steps += 1
+        assert steps == 3
+        assert glossary.get(kerberos).source == "v1"
+
+
+def test_read_only_glossaries_refuse_undo(db_path):
+    with Glossary(db_path) as glossary:
+        glossary.remove_ids([term_id(glossary, "Hash")])
+    with Glossary(db_path, read_only=True) as glossary:
+        assert not glossary.can_undo()
+        with pytest.raises(GlossaryError):
+            glossary.undo()
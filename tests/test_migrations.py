@@ -0,0 +1,87 @@
+import sqlite3
+import pytest
+from dfir_glossary import migrations
+
+COUNTS_SQL = "SELECT source, terms FROM glossary_source_counts ORDER BY source"
+GROUPED_SQL = (
+    "SELECT source, count(*) FROM glossary WHERE coalesce(source, '') != '' "
+    "GROUP BY source ORDER BY source"
+)
+# What version 3 created before the counts were renamed
+OLD_SOURCES = (
+    "CREATE TABLE glossary_sources (source TEXT PRIMARY KEY, terms INTEGER NOT NULL)",
+    "CREATE TRIGGER glossary_sources_ai AFTER INSERT ON glossary BEGIN SELECT 1; END",
+    "CREATE TRIGGER glossary_sources_au_old AFTER UPDATE ON glossary BEGIN "
+    "SELECT 1; END",
+    "INSERT INTO glossary_sources VALUES ('stale', 99)",
+)
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    yield conn
+    conn.close()
+
+
+def names(conn, kind):
+    return {
+        row[0]
+        for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = ?", (kind,)
+        )
+    }
+
+
+def test_shipped_database_is_upgraded_to_the_latest_version(conn):
+    assert migrations.migrate(conn) == migrations.LATEST_VERSION
+    assert migrations.has_term_index(conn)
+    assert migrations.has_source_counts(conn)
+    assert "glossary_sources" not in names(conn, "table")
+    assert conn.execute(COUNTS_SQL).fetchall() == conn.execute(GROUPED_SQL).fetchall()
+
+
+def test_source_counts_follow_every_write(conn):
+    migrations.migrate(conn)
+    conn.execute("INSERT INTO glossary (term, source) VALUES ('New', 'NIST')")
+    conn.execute("INSERT INTO glossary (term, source) VALUES ('Unsourced', '')")
+    conn.execute("UPDATE glossary SET source = 'Vendor' WHERE term = 'Hash'")
+    conn.execute("UPDATE glossary SET source = NULL WHERE term = 'Registry'")
+    conn.execute("UPDATE glossary SET source = 'Elsewhere' WHERE term = 'Timeline'")
+    conn.execute("DELETE FROM glossary WHERE term LIKE 'Kerberos%' OR term LIKE 'KDC%'")
+    assert conn.execute(COUNTS_SQL).fetchall() == conn.execute(GROUPED_SQL).fetchall()
+    assert ("RFC 4120",) not in conn.execute(
+        "SELECT source FROM glossary_source_counts"
+    )
+
+
+def test_old_sources_table_is_replaced(conn):
+    for statement in OLD_SOURCES:
+        conn.execute(statement)
+    conn.execute("PRAGMA user_version = 4")
+    assert migrations.migrate(conn) == migrations.LATEST_VERSION
+    assert "glossary_sources" not in names(conn, "table")
+    assert not {"glossary_sources_ai", "glossary_sources_au_old"} & names(
+        conn, "trigger"
+    )
+    assert conn.execute(COUNTS_SQL).fetchall() == conn.execute(GROUPED_SQL).fetchall()
+
+
+def test_a_failing_migration_leaves_the_database_as_it_was(conn, monkeypatch):
+    def fail(conn):
+        raise sqlite3.OperationalError("broken migration")
+
+    monkeypatch.setattr(
+        migrations, "MIGRATIONS", migrations.MIGRATIONS[:2] + (("broken", fail),)
+    )
+    monkeypatch.setattr(migrations, "LATEST_VERSION", 3)
+    with pytest.raises(sqlite3.OperationalError):
+        migrations.migrate(conn)
+    assert migrations.schema_version(conn) == 0
+    assert names(conn, "table") == {"glossary"}
+
+
+def test_newer_databases_are_not_touched(conn):
+    conn.execute(f"PRAGMA user_version = {migrations.LATEST_VERSION + 1}")
+    assert migrations.migrate(conn) == migrations.LATEST_VERSION + 1
+    assert names(conn, "table") == {"glossary"}
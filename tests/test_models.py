@@ -0,0 +1,195 @@
+"""Tests for the column-store table model."""
+
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from PyQt6.QtCore import QPersistentModelIndex, Qt
+
+from dfir_glossary import models
+from dfir_glossary.models import DefinitionColumn, GlossaryTableModel, collation_key
+
+from conftest import TERMS
+
+ROWS = [(term_id, *row) for term_id, row in enumerate(TERMS, 1)]
+DISPLAY = Qt.ItemDataRole.DisplayRole
+
+
+@pytest.fixture
+def model():
+    model = GlossaryTableModel()
+    model.load(ROWS)
+    return model
+
+
+def column(model, number=0):
+    return [model.data(model.index(row, number)) for row in range(model.rowCount())]
+
+
+def test_rows_are_served_from_the_store(model):
+    assert model.rowCount() == len(TERMS)
+    assert model.columnCount() == 3
+    assert model.row_values(0) == TERMS[0]
+    first = model.index(0, 0)
+    assert model.data(first, Qt.ItemDataRole.UserRole) == 1
+    assert model.data(first, Qt.ItemDataRole.CheckStateRole) == Qt.CheckState.Unchecked
+    assert model.data(model.index(0, 2), Qt.ItemDataRole.ToolTipRole) == TERMS[0][2]
+    assert model.flags(first) & Qt.ItemFlag.ItemIsUserCheckable
+    assert not model.flags(model.index(0, 1)) & Qt.ItemFlag.ItemIsUserCheckable
+
+
+def test_edits_apply_in_place(model):
+    changed = []
+    model.dataChanged.connect(lambda first, last, roles: changed.append(first.row()))
+    assert model.setData(model.index(2, 1), "New definition", DISPLAY)
+    model.update_term(ROWS[3][0], 2, "New source")
+    model.update_values([(ROWS[4][0], "definition", None)])
+    assert model.row_values(2)[1] == "New definition"
+    assert model.row_values(3)[2] == "New source"
+    assert model.row_values(4)[1] == ""
+    assert changed == [2, 3, 0]
+
+
+def test_removed_terms_leave_every_view(model):
+    gone = [ROWS[1][0], ROWS[5][0]]
+    model.remove_ids(gone)
+    assert model.rowCount() == len(TERMS) - 2
+    assert not set(gone) & set(model.visible_ids())
+    model.show_ids([row[0] for row in ROWS])
+    assert model.rowCount() == len(TERMS) - 2
+    model.show_all()
+    assert model.rowCount() == len(TERMS) - 2
+    assert model.row_of(gone[0]) == -1
+
+
+def test_inserted_and_restored_rows(model):
+    model.sort(0)
+    row = model.insert_term(100, "Carving", "", "")
+    assert column(model)[row] == "Carving"
+    assert column(model) == sorted(column(model), key=str.casefold)
+    model.remove_ids([ROWS[0][0]])
+    model.restore_rows([ROWS[0]])
+    assert column(model) == sorted(column(model), key=str.casefold)
+    assert model.visible_count() == len(TERMS) + 1
+
+
+def test_checking_every_row_sets_the_bitset_at_once(model):
+    signals = []
+    model.dataChanged.connect(lambda *args: signals.append(args))
+    model.set_all_checked(True)
+    assert len(signals) == 1
+    assert model.checked_ids() == [row[0] for row in ROWS]
+    model.remove_ids([ROWS[0][0]])
+    assert ROWS[0][0] not in model.checked_ids()
+    model.set_all_checked(False)
+    assert model.checked_count() == 0
+
+
+def test_checks_in_a_search_only_touch_its_rows(model):
+    model.set_rows_checked([0], True)
+    model.show_ids([ROWS[2][0], ROWS[3][0]])
+    model.set_all_checked(True)
+    assert model.checked_ids() == [ROWS[0][0], ROWS[2][0], ROWS[3][0]]
+    model.set_all_checked(False)
+    model.show_all()
+    assert model.checked_ids() == [ROWS[0][0]]
+    assert model.is_checked(0)
+    state = Qt.CheckState.Checked.value
+    assert model.setData(model.index(1, 0), state, Qt.ItemDataRole.CheckStateRole)
+    assert model.checked_count() == 2
+
+
+def test_views_fetch_a_page_at_a_time(monkeypatch):
+    monkeypatch.setattr(models, "FETCH_PAGE", 4)
+    model = GlossaryTableModel()
+    model.load(ROWS)
+    assert model.rowCount() == 4
+    assert model.visible_count() == len(TERMS)
+    while model.canFetchMore():
+        model.fetchMore()
+    assert model.rowCount() == len(TERMS)
+    model.show_ids([row[0] for row in ROWS[::-1]])
+    assert model.rowCount() == 4
+    assert model.row_of(ROWS[0][0]) == len(TERMS) - 1
+    assert model.rowCount() == len(TERMS)
+
+
+def test_definitions_are_fetched_by_page_and_evicted(monkeypatch):
+    monkeypatch.setattr(models, "DEFINITION_PAGE", 4)
+    definitions = {row[0]: row[2] for row in ROWS}
+    calls = []
+
+    def fetch(term_ids):
+        calls.append(term_ids)
+        return {term_id: definitions[term_id] for term_id in term_ids}
+
+    model = GlossaryTableModel(fetch_definitions=fetch)
+    model.definitions.limit = 6
+    model.load([(term_id, term, None, source) for term_id, term, _, source in ROWS])
+    assert calls == []
+    assert column(model, 1) == [row[2] or "" for row in ROWS]
+    assert all(len(term_ids) <= 4 for term_ids in calls)
+    assert len(calls) < len(ROWS)
+    assert len(model.definitions.texts) == 6
+    model.setData(model.index(0, 1), "Edited", DISPLAY)
+    definitions[ROWS[0][0]] = "Edited"
+    model.sort(1)
+    assert column(model, 1) == sorted(column(model, 1), key=str.casefold)
+
+
+def test_definition_column_keeps_the_latest_texts():
+    texts = DefinitionColumn([1, 2, 3], lambda ids: {i: f"d{i}" for i in ids}, 2)
+    texts.extend([None, "two", None])
+    assert len(texts) == 3
+    assert 0 not in texts and 1 in texts
+    assert texts[0] == "d1"
+    assert texts.values([0, 1, 2]) == ["d1", "two", "d3"]
+    texts[2] = "three"
+    assert list(texts.texts) == [0, 2]
+
+
+def test_collation_keys_fold_case():
+    text = "http://example.org"
+    assert collation_key(text) is text
+    assert collation_key("Straße") == "strasse"
+
+
+@pytest.mark.parametrize("number", [0, 2])
+def test_sorting_follows_collation_keys(model, number):
+    expected = sorted(column(model, number), key=str.casefold)
+    model.sort(number)
+    assert column(model, number) == expected
+    model.sort(number, Qt.SortOrder.DescendingOrder)
+    assert column(model, number) == sorted(expected, key=str.casefold, reverse=True)
+
+
+def test_sorting_is_stable_and_keeps_persistent_indexes(model):
+    model.sort(0)
+    by_term = column(model, 0)
+    model.sort(2)
+    terms, sources = column(model, 0), column(model, 2)
+    assert sources == sorted(sources, key=str.casefold)
+    for source in set(sources):
+        same = [term for term, other in zip(terms, sources) if other == source]
+        assert same == [term for term in by_term if term in same]
+    kept = QPersistentModelIndex(model.index(terms.index("Kerberos"), 0))
+    model.sort(0, Qt.SortOrder.DescendingOrder)
+    assert model.data(model.index(kept.row(), 0)) == "Kerberos"
+
+
+def test_edits_update_the_sort_keys(model):
+    model.sort(0)
+    model.update_term(ROWS[0][0], 0, "!first")
+    model.sort(0)
+    assert column(model)[0] == "!first"
+
+
+def test_the_store_holds_each_row_once():
+    model = GlossaryTableModel()
+    model.load([(1, "Hash", None, None), (2, "Timeline", "", "NIST")])
+    model.append_rows([(2, "Timeline", "", "NIST"), (3, "Registry", "Hive", None)])
+    assert model.headerData(0, Qt.Orientation.Horizontal) == "Term"
+    assert list(model.ids) == [1, 2, 3]
+    assert model.row_values(0) == ("Hash", "", "")
+    assert len(model.checked) == len(model.live) == 3
+    assert model.visible_ids() == [1, 2, 3]
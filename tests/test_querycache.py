@@ -0,0 +1,68 @@
+"""Tests for the search result cache."""
+
+import sqlite3
+
+import pytest
+
+from dfir_glossary.core import Glossary
+from dfir_glossary.querycache import QueryCache, result_size
+
+from conftest import INSERT_SQL
+
+
+def test_least_recently_used_results_are_evicted():
+    sizes = {key: result_size((key * 10,)) for key in "abc"}
+    cache = QueryCache(sizes["a"] + sizes["b"])
+    for key in "ab":
+        assert cache.put(key, (key * 10,), 0)
+    assert cache.get("a") == ("a" * 10,)
+    cache.put("c", ("c" * 10,), 0)
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert cache.stats()["evictions"] == 1
+    assert cache.bytes == sizes["a"] + sizes["c"]
+
+
+def test_oversized_and_stale_results_are_not_stored():
+    cache = QueryCache(100)
+    assert not cache.put("big", ("x" * 200,), 0)
+    generation = cache.generation
+    cache.invalidate()
+    assert not cache.put("old", ("x",), generation)
+    assert cache.put("new", ("x",), cache.generation)
+    assert len(cache) == 1
+
+
+@pytest.fixture
+def glossary(db_path):
+    with Glossary(db_path) as glossary:
+        yield glossary
+
+
+def test_repeated_and_refined_queries_match_fresh_ones(glossary):
+    queries = ["has", "hash", "hash a", "hash al", "auth", "authentication p"]
+    cached = [glossary.search_matches(text) for text in queries]
+    stats = glossary.query_cache_stats()
+    assert stats["refined"] == 4
+    assert stats["misses"] == 2
+    assert glossary.search_matches("hash") == cached[1]
+    assert glossary.query_cache_stats()["hits"] == 1
+    for text, (term_ids, _) in zip(queries, cached):
+        assert glossary.db.search_ids(text) == term_ids, text
+
+
+def test_writes_invalidate_cached_results(glossary):
+    assert glossary.search("prefetch") == []
+    glossary.add("Prefetch")
+    assert [term.term for term in glossary.search("prefetch")] == ["Prefetch"]
+
+
+def test_writes_from_other_connections_are_noticed(db_path, glossary):
+    assert glossary.search("prefetch") == []
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute(INSERT_SQL, ("Prefetch", "", ""))
+    conn.close()
+    assert glossary.refresh()
+    assert not glossary.refresh()
+    assert [term.term for term in glossary.search("prefetch")] == ["Prefetch"]
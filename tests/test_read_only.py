@@ -0,0 +1,59 @@
+"""Tests for read-only, shared deployments."""
+
+import hashlib
+import os
+
+import pytest
+
+from dfir_glossary import indexcache
+from dfir_glossary.core import Glossary, GlossaryError
+
+
+def digest(path):
+    with open(path, "rb") as handle:
+        return hashlib.sha256(handle.read()).hexdigest()
+
+
+def deploy(db_path):
+    with Glossary(db_path) as glossary:
+        written = glossary.build_indexes()
+    os.chmod(db_path, 0o444)
+    return written
+
+
+def test_writes_are_refused(db_path):
+    with Glossary(db_path, read_only=True) as glossary:
+        for write in (
+            lambda: glossary.add("Prefetch"),
+            lambda: glossary.edit("Kerberos", source="MIT"),
+            lambda: glossary.remove(["Hash"]),
+            lambda: glossary.undo(),
+            lambda: glossary.build_refs(),
+            lambda: glossary.build_indexes(),
+        ):
+            with pytest.raises(GlossaryError):
+                write()
+
+
+@pytest.mark.parametrize("value, read_only", [("1", True), ("0", False), ("", False)])
+def test_the_environment_picks_the_mode(db_path, monkeypatch, value, read_only):
+    monkeypatch.setenv("DFIR_GLOSSARY_READ_ONLY", value)
+    with Glossary(db_path) as glossary:
+        assert glossary.read_only is read_only
+
+
+def test_deployed_databases_are_answered_from_sidecars(db_path, monkeypatch):
+    written = deploy(db_path)
+    assert all(path == f"{db_path}.{name}.cache" for name, path in written.items())
+    before = digest(db_path)
+    files = sorted(os.listdir(os.path.dirname(db_path)))
+    monkeypatch.setattr(indexcache, "save_index", pytest.fail)
+    with Glossary(db_path, read_only=True) as glossary:
+        stats = glossary.stats()
+        assert stats["search_index"] and stats["cross_references"]
+        assert glossary.search("kerberos")[0].term == "Kerberos"
+        assert glossary.annotate("the KDC")[0].text == "KDC"
+        assert glossary.search_fuzzy("kerbreos")
+        assert glossary.related(glossary.lookup("Kerberos").id)[0]
+    assert digest(db_path) == before
+    assert sorted(os.listdir(os.path.dirname(db_path))) == files
@@ -0,0 +1,107 @@
+import sqlite3
+import pytest
+from dfir_glossary.search import (
+    ensure_search_index,
+    match_spans,
+    rows_highlights,
+    search_ids,
+    search_matches,
+    search_rows,
+    term_tier,
+)
+
+QUERIES = ["hash", "Hash algorithm", "ker", "registry", "diffie", "tion", "50%", "_"]
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        ensure_search_index(conn)
+    yield conn
+    conn.close()
+
+
+def tiers(conn, term_ids, text):
+    names = dict(conn.execute("SELECT id, lower(term) FROM glossary"))
+    return [term_tier(names[term_id], text.lower()) for term_id in term_ids]
+
+
+@pytest.mark.parametrize("text", QUERIES)
+def test_index_and_like_scan_find_the_same_rows(conn, text):
+    indexed = search_ids(conn, text, use_index=True)
+    scanned = search_ids(conn, text, use_index=False)
+    assert sorted(indexed) == sorted(scanned)
+    assert tiers(conn, indexed, text) == tiers(conn, scanned, text)
+
+
+@pytest.mark.parametrize("text", QUERIES)
+def test_results_are_ranked_in_tiers(conn, text):
+    found = tiers(conn, search_ids(conn, text), text)
+    assert found == sorted(found)
+
+
+@pytest.mark.parametrize("text, term", [("%", "50% rule"), ("_", "Snake_case")])
+def test_like_wildcards_match_literally(conn, text, term):
+    for use_index in (True, False):
+        found = search_ids(conn, text, use_index)
+        names = [
+            conn.execute(
+                "SELECT term FROM glossary WHERE id = ?", (term_id,)
+            ).fetchone()[0]
+            for term_id in found
+        ]
+        assert names == [term]
+
+
+def test_exact_term_ranks_first(conn):
+    first = search_ids(conn, "hash")[0]
+    assert conn.execute(
+        "SELECT term FROM glossary WHERE id = ?", (first,)
+    ).fetchone() == ("Hash",)
+
+
+@pytest.mark.parametrize(
+    "term, needle, tier",
+    [
+        ("hash", "hash", 0),
+        ("dh - diffie-hellman", "dh", 0),
+        ("dh - diffie-hellman", "diffie-hellman", 0),
+        ("hash algorithm", "hash", 1),
+        ("sha-256", "256", 2),
+        ("kerberos", "hash", 3),
+    ],
+)
+def test_term_tier(term, needle, tier):
+    assert term_tier(term, needle) == tier
+
+
+def test_match_spans():
+    assert match_spans("Hash of a HASH", "hash") == ((0, 4), (10, 14))
+    assert match_spans("aaaa", "aa") == ((0, 2), (2, 4))
+    assert match_spans("İstanbul hash", "hash") == ((9, 13),)
+    assert match_spans("x" * 50, "x", limit=3) == ((0, 1), (1, 2), (2, 3))
+    assert match_spans(None, "x") == ()
+
+
+@pytest.mark.parametrize("text", QUERIES)
+def test_highlights_mark_every_match(conn, text):
+    term_ids, highlights = search_matches(conn, text)
+    assert set(highlights) == set(term_ids)
+    needle = text.lower()
+    for term_id, (term_spans, definition_spans) in highlights.items():
+        term, definition = conn.execute(
+            "SELECT term, definition FROM glossary WHERE id = ?", (term_id,)
+        ).fetchone()
+        assert term_spans or definition_spans
+        for value, spans in ((term, term_spans), (definition, definition_spans)):
+            assert all(value[start:end].lower() == needle for start, end in spans)
+    assert rows_highlights(search_rows(conn, text), text) == highlights
+
+
+def test_highlight_html_escapes_around_spans():
+    highlight = pytest.importorskip("dfir_glossary.highlight")
+    html = highlight.highlight_html("<a> & hash\nHash", [(6, 10), (7, 9), (11, 15)])
+    assert html.count("<span") == 2
+    assert html.startswith("&lt;a&gt; &amp; <span")
+    assert ">hash</span><br><span" in html
@@ -0,0 +1,122 @@
+"""Tests for the local HTTP/JSON server."""
+
+import asyncio
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+import pytest
+
+from dfir_glossary.core import Glossary
+from dfir_glossary.server import GlossaryServer
+
+from conftest import TERMS
+
+
+@pytest.fixture
+def server(db_path):
+    with Glossary(db_path) as glossary:
+        loop = asyncio.new_event_loop()
+        server = GlossaryServer(glossary, port=0)
+        port = loop.run_until_complete(server.start())
+        thread = threading.Thread(target=loop.run_forever)
+        thread.start()
+        try:
+            yield f"http://127.0.0.1:{port}"
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            server.close()
+            loop.close()
+
+
+def get(url, data=None, headers=None):
+    with urlopen(Request(url, data, headers or {}), timeout=10) as response:
+        return response.status, response.headers, response.read()
+
+
+def get_json(url, data=None, headers=None):
+    status, _, body = get(url, data, headers)
+    return status, json.loads(body)
+
+
+def test_search_ranks_the_exact_term_first(server):
+    status, payload = get_json(f"{server}/search?q=hash")
+    assert status == 200
+    assert payload["results"][0]["term"] == "Hash"
+    assert payload["total"] == len(payload["results"]) > 1
+
+
+def test_search_pages(server):
+    _, whole = get_json(f"{server}/search?q=hash")
+    _, page = get_json(f"{server}/search?q=hash&limit=1&offset=1")
+    assert page["total"] == whole["total"]
+    assert page["results"] == whole["results"][1:2]
+
+
+def test_term_by_id(server):
+    _, payload = get_json(f"{server}/search?q=Kerberos")
+    term = payload["results"][0]
+    status, record = get_json(f"{server}/term/{term['id']}")
+    assert status == 200
+    assert record["term"] == "Kerberos"
+    assert record["source"] == "RFC 4120"
+
+
+@pytest.mark.parametrize(
+    "path, status",
+    [
+        ("/term/99999", 404),
+        ("/term/abc", 400),
+        ("/search", 400),
+        ("/nothing", 404),
+        ("/export?format=pdf", 400),
+    ],
+)
+def test_errors_are_json(server, path, status):
+    with pytest.raises(HTTPError) as info:
+        get(server + path)
+    assert info.value.code == status
+    assert "error" in json.loads(info.value.read())
+
+
+def test_annotate(server):
+    status, payload = get_json(
+        f"{server}/annotate",
+        json.dumps({"texts": ["Kerberos uses a KDC", "nothing here"]}).encode(),
+        {"Content-Type": "application/json"},
+    )
+    assert status == 200
+    assert len(payload["results"]) == 2
+    assert payload["results"][1] == []
+    assert "Kerberos" in payload["terms"].values()
+
+
+def test_stats(server):
+    status, payload = get_json(f"{server}/stats")
+    assert status == 200
+    assert payload["terms"] == len(TERMS)
+    assert "response_cache" in payload
+
+
+def test_export_streams_every_term(server):
+    status, headers, body = get(f"{server}/export?format=jsonl")
+    assert status == 200
+    assert headers["Transfer-Encoding"] == "chunked"
+    terms = {json.loads(line)["term"] for line in body.decode().splitlines()}
+    assert terms == {row[0] for row in TERMS}
+
+
+def test_export_of_a_search_is_ranked(server):
+    _, _, body = get(f"{server}/export?format=jsonl&q={quote('hash')}")
+    terms = [json.loads(line)["term"] for line in body.decode().splitlines()]
+    _, payload = get_json(f"{server}/search?q=hash")
+    assert terms == [result["term"] for result in payload["results"]]
+
+
+def test_only_loopback_addresses(db_path):
+    with Glossary(db_path) as glossary:
+        with pytest.raises(ValueError):
+            GlossaryServer(glossary, host="0.0.0.0")
@@ -0,0 +1,154 @@
+"""Tests for the background search and loading workers."""
+
+import time
+
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from PyQt6.QtCore import QCoreApplication
+
+from dfir_glossary import workers
+from dfir_glossary.core import Glossary
+from dfir_glossary.workers import (
+    CompletionBuilder,
+    RefsBuilder,
+    SearchScheduler,
+    TermLoader,
+)
+
+from conftest import TERMS
+
+TIMEOUT = 10
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def glossary(app, db_path):
+    with Glossary(db_path) as glossary:
+        yield glossary
+
+
+def wait_for(app, condition):
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        app.processEvents()
+        time.sleep(0.001)
+
+
+def collect(signal):
+    received = []
+    signal.connect(lambda *args: received.append(args))
+    return received
+
+
+@pytest.fixture
+def scheduler(glossary):
+    scheduler = SearchScheduler(glossary.db, 0, approximate=glossary.approximate_ids)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def test_only_the_latest_search_is_reported(app, glossary, scheduler):
+    results = collect(scheduler.results)
+    for text in ("k", "ke", "ker", "kerb"):
+        scheduler.schedule(text)
+    wait_for(app, lambda: results)
+    scheduler.pool.waitForDone()
+    app.processEvents()
+    assert [text for text, *_ in results] == ["kerb"]
+    assert results[0][1] == glossary.search_ids("kerb")
+
+
+def test_cached_searches_are_answered_at_once(app, glossary, scheduler):
+    results = collect(scheduler.results)
+    scheduler.schedule("hash")
+    wait_for(app, lambda: results)
+    scheduler.schedule("hash a")
+    assert len(results) == 2
+    assert results[1][1] == glossary.search_ids("hash a")
+
+
+def test_fuzzy_matches_are_appended(app, glossary, scheduler):
+    results = collect(scheduler.results)
+    scheduler.fuzzy_distance = 2
+    scheduler.schedule("kerbreos")
+    wait_for(app, lambda: results)
+    _, term_ids, _, approximate = results[0]
+    assert approximate == 1
+    assert term_ids == [glossary.lookup("Kerberos").id]
+
+
+def test_cancelled_searches_report_nothing(app, scheduler):
+    results = collect(scheduler.results)
+    scheduler.set_interval(50)
+    scheduler.schedule("kerberos")
+    scheduler.cancel()
+    time.sleep(0.1)
+    app.processEvents()
+    assert results == []
+
+
+def test_rows_stream_in_small_then_larger_batches(app, glossary, monkeypatch):
+    monkeypatch.setattr(workers, "FIRST_LOAD_BATCH", 2)
+    monkeypatch.setattr(workers, "LOAD_BATCH", 5)
+    loader = TermLoader(glossary.db)
+    batches, finished = collect(loader.rows), collect(loader.finished)
+    loader.start()
+    assert loader.loading
+    wait_for(app, lambda: finished)
+    loader.shutdown()
+    assert [len(batch) for batch, in batches] == [2, 5, 5, 3]
+    rows = [row for batch, in batches for row in batch]
+    assert finished == [(len(TERMS),)]
+    assert [row[1] for row in rows] == sorted((row[0] for row in TERMS), key=str.lower)
+    assert all(row[2] is None for row in rows)
+    assert not loader.loading
+
+
+def test_a_restarted_load_drops_the_earlier_one(app, glossary):
+    loader = TermLoader(glossary.db)
+    batches, finished = collect(loader.rows), collect(loader.finished)
+    loader.start()
+    loader.start()
+    wait_for(app, lambda: finished)
+    loader.shutdown()
+    app.processEvents()
+    assert finished == [(len(TERMS),)]
+    assert sum(len(batch) for batch, in batches) == len(TERMS)
+
+
+def test_completion_index_includes_changes_made_while_building(app, glossary):
+    builder = CompletionBuilder(glossary.db)
+    built = collect(builder.built)
+    builder.start()
+    term_id = glossary.add("Prefetch")
+    builder.add(term_id, "Prefetch")
+    builder.remove_ids([glossary.lookup("Kerberos").id])
+    wait_for(app, lambda: built)
+    builder.shutdown()
+    (index,) = built[0]
+    assert index.complete("pref") == [(term_id, "Prefetch")]
+    assert index.complete("kerb") == []
+
+
+def test_refs_are_built_off_the_gui_thread(app, glossary):
+    builder = RefsBuilder(glossary.db)
+    built = collect(builder.built)
+    builder.start()
+    wait_for(app, lambda: built)
+    builder.shutdown()
+    edges, matcher, generation = built[0]
+    assert glossary.store_refs(edges, generation, matcher)
+    assert glossary.refs_built()
+    builder.start()
+    glossary.add("Prefetch")
+    wait_for(app, lambda: len(built) == 2)
+    builder.shutdown()
+    edges, matcher, generation = built[1]
+    assert not glossary.store_refs(edges, generation, matcher)
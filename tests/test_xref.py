@@ -0,0 +1,70 @@
+"""Tests for the related-terms graph."""
+
+import pytest
+
+from dfir_glossary.core import Glossary
+
+
+@pytest.fixture
+def glossary(db_path):
+    with Glossary(db_path) as glossary:
+        yield glossary
+
+
+def related(glossary, term):
+    references, referenced_by = glossary.related(glossary.lookup(term).id)
+    return [name for _, name in references], [name for _, name in referenced_by]
+
+
+def everything(glossary):
+    return {term.term: related(glossary, term.term) for term in glossary.all_terms()}
+
+
+def test_definitions_link_the_terms_they_mention(glossary):
+    glossary.build_refs()
+    assert related(glossary, "Kerberos") == (
+        ["Authentication protocol", "KDC - Key Distribution Center"],
+        ["KDC - Key Distribution Center"],
+    )
+    assert related(glossary, "Hash algorithm") == ([], ["Hash", "SHA-256"])
+
+
+def test_scanning_without_the_graph_gives_the_same_links(glossary):
+    assert not glossary.refs_built()
+    scanned = everything(glossary)
+    glossary.build_refs()
+    assert glossary.refs_built()
+    assert everything(glossary) == scanned
+
+
+def test_the_graph_follows_writes(db_path, glossary):
+    glossary.build_refs()
+    term_id = glossary.add("Ticket", "Proof of identity issued by a KDC.")
+    glossary.edit("Kerberos", definition="Uses a Ticket from the KDC.")
+    glossary.remove(["Hash"])
+    kept = everything(glossary)
+    assert related(glossary, "Kerberos")[0] == [
+        "KDC - Key Distribution Center",
+        "Ticket",
+    ]
+    assert glossary.related(term_id)[1] == [
+        (glossary.lookup("Kerberos").id, "Kerberos")
+    ]
+    with Glossary(db_path) as fresh:
+        fresh.build_refs()
+        assert everything(fresh) == kept
+
+
+def test_undo_restores_links(glossary):
+    glossary.build_refs()
+    before = everything(glossary)
+    glossary.remove(["KDC - Key Distribution Center"])
+    assert related(glossary, "Kerberos")[1] == []
+    glossary.undo()
+    assert everything(glossary) == before
+
+
+def test_limit(glossary):
+    glossary.build_refs()
+    term_id = glossary.lookup("Hash algorithm").id
+    assert glossary.related(term_id, limit=1)[1] == glossary.related(term_id)[1][:1]